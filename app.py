@@ -1,16 +1,17 @@
-from flask import Flask, redirect, request, session, url_for, render_template, jsonify, send_file, flash
+from flask import Flask, redirect, request, session, url_for, render_template, jsonify, send_file, flash, abort
 import os
 import json
 import datetime
 import polyline
 import pandas as pd
-import numpy as np
 import matplotlib
 # Utiliser le backend Agg (non-interactif) pour éviter les problèmes de thread
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from io import BytesIO
-import base64
+import hashlib
+import secrets
+import tempfile
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 
@@ -19,6 +20,11 @@ load_dotenv()
 
 # Importer les modules PeakFlow
 from peakflow.models.data_manager import DataManager
+from peakflow.models.athletes import AthleteRegistry
+from peakflow.models.training_load import TrainingLoadEngine, TIMESERIES_METRICS, timeseries_payload
+from peakflow.models.squad import align_efforts, squad_loads, risk_ranking, ACWR_LOW, ACWR_HIGH
+from peakflow.utils.chart_cache import ChartCache
+from peakflow.api.strava import StravaAPI
 
 # Initialiser l'application Flask
 app = Flask(__name__)
@@ -32,17 +38,136 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # Créer le dossier d'upload s'il n'existe pas
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Initialiser le gestionnaire de données
+# Initialiser le gestionnaire de données (utilisé lorsqu'aucun athlète n'est sélectionné)
 data_manager = DataManager(csv_file="data/activities_with_details.csv")
 
+# Données des athlètes, une partition (dossier) par athlète
+athlete_registry = AthleteRegistry(base_dir=os.environ.get("PEAKFLOW_ATHLETES_DIR", "data/athletes"))
+
+# Mode multi-athlète : chaque session n'accède qu'aux données de l'athlète Strava connecté
+# (sinon, application locale mono-utilisateur sur le fichier de data_manager)
+MULTI_ATHLETE = os.environ.get("PEAKFLOW_MULTI_ATHLETE") == "1"
+
+# Choix libre de l'athlète de la session par /athlete/<id>, réservé au développement
+DEV_ATHLETE_SWITCH = os.environ.get("PEAKFLOW_DEV_ATHLETE_SWITCH") == "1"
+
+# Athlètes (identifiants Strava) autorisés à consulter le classement de l'équipe
+COACH_IDS = {athlete_id.strip() for athlete_id in os.environ.get("PEAKFLOW_COACH_IDS", "").split(",")
+             if athlete_id.strip()}
+
+# Moteur de charge d'entraînement par défaut : ses paramètres s'appliquent aux athlètes qui
+# n'en ont pas enregistré (voir get_training_engine)
+training_load_engine = TrainingLoadEngine(
+    tau_fitness=float(os.environ.get("PEAKFLOW_TAU_FITNESS", 45)),
+    tau_fatigue=float(os.environ.get("PEAKFLOW_TAU_FATIGUE", 15))
+)
+
+# Cache des graphiques rendus (niveau disque optionnel)
+chart_cache = ChartCache(data_manager.cache, disk_dir=os.environ.get("PEAKFLOW_CHART_CACHE_DIR"))
+
+# Colonnes affichées dans le tableau des activités
+TABLE_COLUMNS = ["activity_id", "start_date_local", "type", "distance", "moving_time", "suffer_score"]
+
+# Périodes sélectionnables dans le tableau de bord
+VALID_PERIODS = ['7d', '1m', '3m', '6m', '1y', 'all']
+
+# Nombre de jours couverts par chaque période relative à aujourd'hui
+PERIOD_DAYS = {'7d': 7, '1m': 30, '3m': 90, '6m': 180, '1y': 365}
+
+# Colonnes nécessaires au calcul de la charge d'entraînement
+TRAINING_COLUMNS = ["start_date_local"] + [f"zone_{z}" for z in range(1, 6)]
+
+def get_data_manager():
+    """Retourne le gestionnaire de données de l'athlète connecté (celui par défaut en mode
+    mono-utilisateur) ; en mode multi-athlète, une session non connectée est redirigée
+    vers la connexion Strava."""
+    if not MULTI_ATHLETE:
+        return data_manager
+    athlete_id = session.get("athlete_id")
+    if not athlete_id or not AthleteRegistry.is_valid_id(athlete_id):
+        abort(redirect(url_for("login")))
+    return athlete_registry.get(athlete_id)
+
+def get_training_engine(dm):
+    """Retourne le moteur de charge configuré avec les paramètres enregistrés de l'athlète
+    (DataManager.load_settings), ceux de training_load_engine à défaut."""
+    settings = dm.load_settings()
+    return TrainingLoadEngine(
+        acwr_mode=training_load_engine.acwr_mode,
+        tau_fitness=settings.get("tau_fitness", training_load_engine.tau_fitness),
+        tau_fatigue=settings.get("tau_fatigue", training_load_engine.tau_fatigue),
+        weight_scheme=settings.get("weight_scheme", training_load_engine.weight_scheme)
+    )
+
 def allowed_file(filename):
     """Vérifie si l'extension du fichier est autorisée."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def activity_records(activities_df):
+    """Convertit un DataFrame d'activités typé en dictionnaires pour les templates."""
+    records = []
+    for activity in activities_df.to_dict("records"):
+        start_date = activity.get("start_date_local")
+        activity["start_date_local"] = start_date.strftime("%Y-%m-%dT%H:%M:%S") if not pd.isna(start_date) else ""
+        suffer_score = activity.get("suffer_score")
+        if suffer_score is None or pd.isna(suffer_score):
+            activity["suffer_score"] = "N/A"
+        elif float(suffer_score).is_integer():
+            activity["suffer_score"] = int(suffer_score)
+        records.append(activity)
+    return records
+
+@app.route("/login")
+def login():
+    """Connexion par Strava (mode multi-athlète) : redirige vers l'autorisation Strava."""
+    if not MULTI_ATHLETE:
+        return redirect(url_for("index"))
+    session["oauth_state"] = secrets.token_urlsafe(16)
+    return redirect(StravaAPI(token_file=None).get_authorization_url(state=session["oauth_state"]))
+
+@app.route("/callback")
+def strava_callback():
+    """Retour d'autorisation Strava : l'athlète de la session est celui du token obtenu."""
+    if not MULTI_ATHLETE:
+        return redirect(url_for("index"))
+    state = session.pop("oauth_state", None)
+    code = request.args.get("code")
+    if not code or not state or not secrets.compare_digest(state, request.args.get("state", "")):
+        return "Autorisation Strava invalide.", 400
+    
+    tokens = StravaAPI(token_file=None).exchange_code_for_token(code)
+    athlete_id = str((tokens or {}).get("athlete", {}).get("id", ""))
+    if not AthleteRegistry.is_valid_id(athlete_id):
+        return "Échec de la connexion Strava.", 502
+    
+    # Tokens conservés dans la partition de l'athlète
+    token_file = athlete_registry.token_file(athlete_id)
+    os.makedirs(os.path.dirname(token_file), exist_ok=True)
+    StravaAPI(token_file=token_file).save_tokens_to_file(tokens)
+    session.clear()
+    session["athlete_id"] = athlete_id
+    return redirect(url_for("index"))
+
+@app.route("/logout")
+def logout():
+    """Déconnecter l'athlète de la session."""
+    session.clear()
+    return redirect(url_for("index"))
+
+@app.route("/athlete/<athlete_id>")
+def select_athlete(athlete_id):
+    """Choisir l'athlète de la session sans connexion (développement seulement,
+    PEAKFLOW_DEV_ATHLETE_SWITCH=1)."""
+    if not (MULTI_ATHLETE and DEV_ATHLETE_SWITCH) or not AthleteRegistry.is_valid_id(athlete_id):
+        abort(404)
+    session["athlete_id"] = athlete_id
+    return redirect(url_for("index"))
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     """Page d'accueil avec téléchargement de CSV et analyse combinés."""
-    activities_data = data_manager.load_from_csv()
+    dm = get_data_manager()
+    activities_df = dm.load_activities(columns=TABLE_COLUMNS)
     upload_success = None
     
     if request.method == "POST":
@@ -50,7 +175,7 @@ def index():
         if 'file' not in request.files:
             upload_success = False
             return render_template("unified.html", 
-                                  activities=activities_data, 
+                                  activities=activity_records(activities_df), 
                                   upload_success=upload_success,
                                   error_message="Aucun fichier n'a été fourni")
             
@@ -60,31 +185,51 @@ def index():
         if file.filename == '':
             upload_success = False
             return render_template("unified.html", 
-                                  activities=activities_data, 
+                                  activities=activity_records(activities_df), 
                                   upload_success=upload_success,
                                   error_message="Aucun fichier n'a été sélectionné")
             
         # Vérifier si le fichier est autorisé
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            # Nom unique : deux envois simultanés du même fichier ne s'écrasent pas
+            fd, filepath = tempfile.mkstemp(suffix=f"_{secure_filename(file.filename)}",
+                                            dir=app.config['UPLOAD_FOLDER'])
+            os.close(fd)
             file.save(filepath)
             
-            # Charger les données depuis le fichier téléchargé
-            activities_data = data_manager.load_from_csv(csv_file=filepath)
+            try:
+                if request.form.get('mode') == 'append' and not activities_df.empty:
+                    # Ajouter les nouvelles activités et mettre à jour les séries à partir du premier jour touché
+                    # (sous le verrou : aucune autre écriture entre la lecture des séries et l'import)
+                    with dm.lock:
+                        previous_series = load_training_series(dm)
+                        new_activities = dm.import_csv(filepath, append=True)
+                        if not new_activities.empty:
+                            engine = get_training_engine(dm)
+                            dm.put_derived(engine.cache_key(), engine.update(previous_series, new_activities))
+                else:
+                    # Importer le fichier téléchargé par blocs à la place des données existantes
+                    dm.import_csv(filepath)
+            except ValueError as e:
+                return render_template("unified.html", 
+                                      activities=activity_records(activities_df), 
+                                      upload_success=False,
+                                      error_message=f"Fichier CSV invalide : {e}")
+            finally:
+                os.remove(filepath)
             upload_success = True
             
             return redirect(url_for("dashboard"))
         else:
             upload_success = False
             return render_template("unified.html", 
-                                  activities=activities_data, 
+                                  activities=activity_records(activities_df), 
                                   upload_success=upload_success,
                                   error_message="Type de fichier non autorisé. Seuls les fichiers CSV sont acceptés.")
     
     # Si aucune donnée chargée et première visite sur la page
-    if not activities_data:
-        return render_template("unified.html", activities=activities_data, show_upload=True)
+    if activities_df.empty:
+        return render_template("unified.html", activities=[], show_upload=True)
     
     # Méthode GET - Rediriger vers le tableau de bord si des données existent
     return redirect(url_for("dashboard"))
@@ -92,90 +237,34 @@ def index():
 @app.route("/download")
 def download():
     """Télécharger le fichier CSV des activités."""
-    if os.path.exists(data_manager.csv_file):
-        return send_file(data_manager.csv_file, as_attachment=True)
+    dm = get_data_manager()
+    if os.path.exists(dm.csv_file):
+        return send_file(dm.csv_file, as_attachment=True)
     else:
         return "Aucun fichier disponible pour le téléchargement.", 404
 
-def process_activities_data(activities_data):
-    """Traite les données d'activités pour l'analyse."""
-    # Convertir les données d'activités en DataFrame
-    df = pd.DataFrame(activities_data)
-    df['start_date_local'] = pd.to_datetime(df['start_date_local'])
-    df['date'] = df['start_date_local'].dt.date
-    
-    # Calculer le score d'effort relatif pour chaque activité
-    zone_weights = {1: 1, 2: 2, 3: 3, 4: 4, 5: 5}
-    
-    def calculate_relative_effort(row):
-        return sum((int(row.get(f'zone_{zone}', 0))/60) * np.exp(weight) for zone, weight in zone_weights.items())
-    
-    df['relative_effort'] = df.apply(calculate_relative_effort, axis=1)
-    
-    # Agréger par jour
-    daily_effort = df.groupby('date')['relative_effort'].sum().reset_index()
-    
-    # Générer toutes les dates
-    date_range = pd.date_range(start=daily_effort['date'].min(), end=daily_effort['date'].max())
-    df_full = pd.DataFrame({'date': date_range.date})
-    
-    # Fusionner avec les efforts quotidiens
-    df_full = df_full.merge(daily_effort, on='date', how='left')
-    df_full['relative_effort'] = df_full['relative_effort'].fillna(0)
-    
-    return df_full
-
-def filter_data_by_period(df_full, period):
-    """Filtre les données en fonction de la période sélectionnée."""
-    today = pd.Timestamp.now().date()
-    
-    if period == '7d':
-        # Derniers 7 jours
-        start_date = today - pd.Timedelta(days=7)
-    elif period == '1m':
-        # Dernier mois
-        start_date = today - pd.Timedelta(days=30)
-    elif period == '3m':
-        # Derniers 3 mois
-        start_date = today - pd.Timedelta(days=90)
-    elif period == '6m':
-        # Derniers 6 mois
-        start_date = today - pd.Timedelta(days=180)
-    elif period == '1y':
-        # Dernière année
-        start_date = today - pd.Timedelta(days=365)
-    else:
+def filter_data_by_period(df_full, period, today=None):
+    """Filtre les données en fonction de la période sélectionnée.
+    
+    Args:
+        df_full: Séries quotidiennes à filtrer.
+        period: Période sélectionnée ('7d', '1m', '3m', '6m', '1y' ou 'all').
+        today: Optionnel, date de référence (aujourd'hui par défaut).
+    """
+    if today is None:
+        today = pd.Timestamp.now().date()
+    
+    if period not in PERIOD_DAYS:
         # Toutes les données
         return df_full
     
+    start_date = today - pd.Timedelta(days=PERIOD_DAYS[period])
     return df_full[df_full['date'] >= start_date]
 
-def generate_acwr_chart(activities_data, period='all'):
-    """Génère le graphique d'évolution du ratio ACWR."""
-    df_full = process_activities_data(activities_data)
-    
-    # Calcul de la charge aiguë (7 jours)
-    charge_aigue = []
-    for i in range(len(df_full)):
-        last_7_days = df_full.iloc[max(0, i-6):i+1]
-        ca = (last_7_days["relative_effort"].sum()/7)
-        charge_aigue.append(ca)
-    df_full["Charge_aigue"] = charge_aigue
-    
-    # Calcul de la charge chronique (28 jours)
-    charge_chronique = []
-    for i in range(len(df_full)):
-        last_28_days = df_full.iloc[max(0, i-27):i+1]
-        cc = (last_28_days["relative_effort"].sum()/28)
-        charge_chronique.append(cc)
-    df_full["Charge_chronique"] = charge_chronique
-    
-    # Calcul du ratio ACWR
-    df_full['Ratio_AC'] = df_full['Charge_aigue'] / df_full['Charge_chronique'].replace(0, np.nan)
-    df_full['Ratio_AC'] = df_full['Ratio_AC'].fillna(0)
-    
+def generate_acwr_chart(df_full, period='all', today=None, fmt='png'):
+    """Génère le graphique d'évolution du ratio ACWR (image PNG ou SVG)."""
     # Filtrer par période
-    filtered_df = filter_data_by_period(df_full, period)
+    filtered_df = filter_data_by_period(df_full, period, today=today)
     
     # Création du graphique
     plt.figure(figsize=(10, 5))
@@ -194,53 +283,17 @@ def generate_acwr_chart(activities_data, period='all'):
     plt.grid()
     plt.tight_layout()
     
-    # Convertir le graphique en image base64
+    # Convertir le graphique en image (PNG ou SVG)
     img = BytesIO()
-    plt.savefig(img, format='png')
+    plt.savefig(img, format=fmt)
     img.seek(0)
     plt.close()
-    return base64.b64encode(img.getvalue()).decode('utf-8')
-
-def generate_fitness_fatigue_chart(activities_data, period='all'):
-    """Génère le graphique d'évolution de la fatigue, forme et performance."""
-    df_full = process_activities_data(activities_data)
-    
-    # Fonctions pour calculer la fatigue et la fitness
-    def fatigue(fatigue_pre, effort):
-        tau = 15
-        fatigue_post = (effort + np.exp(-1/tau)*fatigue_pre)
-        return fatigue_post
-
-    def fitness(fitness_pre, effort):
-        tau = 45
-        fitness_post = effort + (np.exp(-1/tau)) * fitness_pre
-        return fitness_post
-    
-    # Calcul des courbes
-    courbe_fatigue = [0]
-    courbe_fitness = [0]
-    courbe_performance = [0]
-    courbe_forme = [0]
-    
-    for i in range(len(df_full) - 1):
-        effort = df_full.iloc[i + 1]["relative_effort"]
-        instant_fatigue = fatigue(courbe_fatigue[-1], effort)
-        instant_fitness = fitness(courbe_fitness[-1], effort)
-        instant_performance = (instant_fitness - instant_fatigue)/2
-        instant_forme = instant_fitness - 2*instant_fatigue
-        
-        courbe_fatigue.append(instant_fatigue)
-        courbe_fitness.append(instant_fitness)
-        courbe_performance.append(instant_performance)
-        courbe_forme.append(instant_forme)
-    
-    # Ajouter les courbes au DataFrame
-    df_full['fatigue'] = courbe_fatigue
-    df_full['forme'] = courbe_forme
-    df_full['performance'] = courbe_performance
-    
+    return img.getvalue()
+
+def generate_fitness_fatigue_chart(df_full, period='all', today=None, fmt='png'):
+    """Génère le graphique d'évolution de la fatigue, forme et performance (image PNG ou SVG)."""
     # Filtrer par période
-    filtered_df = filter_data_by_period(df_full, period)
+    filtered_df = filter_data_by_period(df_full, period, today=today)
     
     # Création du graphique
     plt.figure(figsize=(10, 5))
@@ -259,59 +312,17 @@ def generate_fitness_fatigue_chart(activities_data, period='all'):
     plt.grid()
     plt.tight_layout()
     
-    # Convertir le graphique en image base64
+    # Convertir le graphique en image (PNG ou SVG)
     img = BytesIO()
-    plt.savefig(img, format='png')
+    plt.savefig(img, format=fmt)
     img.seek(0)
     plt.close()
-    return base64.b64encode(img.getvalue()).decode('utf-8')
-
-def generate_fatigue_performance_ratio_chart(activities_data, period='all'):
-    """Génère le graphique du rapport entre fatigue et performance."""
-    df_full = process_activities_data(activities_data)
-    
-    # Fonctions pour calculer la fatigue et la fitness
-    def fatigue(fatigue_pre, effort):
-        tau = 15
-        fatigue_post = (effort + np.exp(-1/tau)*fatigue_pre)
-        return fatigue_post
-
-    def fitness(fitness_pre, effort):
-        tau = 45
-        fitness_post = effort + (np.exp(-1/tau)) * fitness_pre
-        return fitness_post
-    
-    # Calcul des courbes
-    courbe_fatigue = [0]
-    courbe_fitness = [0]
-    courbe_performance = [0]
-    courbe_rapport = [0]
-    
-    for i in range(len(df_full) - 1):
-        effort = df_full.iloc[i + 1]["relative_effort"]
-        instant_fatigue = fatigue(courbe_fatigue[-1], effort)
-        instant_fitness = fitness(courbe_fitness[-1], effort)
-        instant_performance = (instant_fitness - instant_fatigue)/2
-        
-        # Gérer les cas de division par zéro ou de performance négative
-        if instant_performance > 0.001:  # Seuil minimal pour éviter la division par des valeurs proches de zéro
-            rapport = (instant_fatigue/instant_performance)*100
-            # Limiter les valeurs extrêmes
-            rapport = min(rapport, 200)
-        else:
-            # Valeur par défaut pour les cas problématiques
-            rapport = 150
-        
-        courbe_fatigue.append(instant_fatigue)
-        courbe_fitness.append(instant_fitness)
-        courbe_performance.append(instant_performance)
-        courbe_rapport.append(rapport)
-    
-    # Ajouter le rapport au DataFrame
-    df_full['rapport'] = courbe_rapport
-    
+    return img.getvalue()
+
+def generate_fatigue_performance_ratio_chart(df_full, period='all', today=None, fmt='png'):
+    """Génère le graphique du rapport entre fatigue et performance (image PNG ou SVG)."""
     # Filtrer par période
-    filtered_df = filter_data_by_period(df_full, period)
+    filtered_df = filter_data_by_period(df_full, period, today=today)
     
     # Création du graphique
     plt.figure(figsize=(10, 5))
@@ -332,69 +343,111 @@ def generate_fatigue_performance_ratio_chart(activities_data, period='all'):
     plt.legend()
     plt.tight_layout()
     
-    # Convertir le graphique en image base64
+    # Convertir le graphique en image (PNG ou SVG)
     img = BytesIO()
-    plt.savefig(img, format='png')
+    plt.savefig(img, format=fmt)
     img.seek(0)
     plt.close()
-    return base64.b64encode(img.getvalue()).decode('utf-8')
+    return img.getvalue()
+
+# Formats d'image des graphiques et types MIME associés
+CHART_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+# Graphiques disponibles et fonctions de génération associées
+CHART_GENERATORS = {
+    'acwr': generate_acwr_chart,
+    'fitness_fatigue': generate_fitness_fatigue_chart,
+    'fatigue_performance_ratio': generate_fatigue_performance_ratio_chart
+}
+
+def load_training_series(dm):
+    """Retourne les séries quotidiennes de charge, calculées une fois par version des données
+    et par paramètres de l'athlète."""
+    engine = get_training_engine(dm)
+    return dm.get_derived(
+        engine.cache_key(),
+        lambda: engine.compute(dm.load_activities(columns=TRAINING_COLUMNS)))
+
+def get_chart(dm, name, period, fmt='png'):
+    """Retourne l'image d'un graphique, depuis le cache si les données et le jour n'ont pas changé."""
+    # Les périodes relatives à aujourd'hui changent de contenu à minuit
+    today = pd.Timestamp.now().date()
+    key = ((dm.get_version(), get_training_engine(dm).cache_key()),
+           name, period, fmt, today if period != 'all' else None)
+    return chart_cache.get_or_render(
+        key, lambda: CHART_GENERATORS[name](load_training_series(dm), period, today=today, fmt=fmt),
+        tag=dm.csv_file)
+
+@app.route("/chart/<name>/<period>.<fmt>")
+def chart(name, period, fmt):
+    """Servir un graphique en image brute avec ETag, pour la mise en cache par le navigateur."""
+    if name not in CHART_GENERATORS or period not in VALID_PERIODS or fmt not in CHART_FORMATS:
+        return "Graphique inconnu.", 404
+    dm = get_data_manager()
+    if dm.get_version() is None:
+        return "Aucune donnée disponible.", 404
+    
+    image = get_chart(dm, name, period, fmt)
+    response = app.response_class(image, mimetype=CHART_FORMATS[fmt])
+    response.set_etag(hashlib.sha1(image).hexdigest())
+    # Le navigateur garde l'image mais la revalide (304) à chaque affichage
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@app.route("/api/timeseries")
+def api_timeseries():
+    """Retourne les séries quotidiennes de charge en JSON compact (colonnes, décalages en jours).
+    
+    Paramètres: metrics (liste séparée par des virgules), period, max_points (optionnel, au moins 2).
+    """
+    metrics = request.args.get('metrics', 'acwr,fatigue,fitness,form,ratio').split(',')
+    unknown = [m for m in metrics if m not in TIMESERIES_METRICS]
+    if unknown:
+        return jsonify({"error": f"Métriques inconnues : {', '.join(unknown)}"}), 400
+    
+    period = request.args.get('period', 'all')
+    if period not in VALID_PERIODS:
+        return jsonify({"error": f"Période inconnue : {period}"}), 400
+    max_points = request.args.get('max_points', type=int)
+    if max_points is not None and max_points < 2:
+        return jsonify({"error": "max_points doit être au moins 2"}), 400
+    
+    dm = get_data_manager()
+    if dm.get_version() is None:
+        return jsonify({"error": "Aucune donnée disponible."}), 404
+    
+    today = pd.Timestamp.now().date()
+    start_date = today - pd.Timedelta(days=PERIOD_DAYS[period]) if period in PERIOD_DAYS else None
+    payload = timeseries_payload(load_training_series(dm), metrics,
+                                 start_date=start_date, max_points=max_points)
+    payload['today'] = today.strftime('%Y-%m-%d')
+    return jsonify(payload)
 
 @app.route("/dashboard")
 @app.route("/dashboard/<period>")
 def dashboard(period='all'):
-    """Afficher le tableau de bord d'analyse de performance avec période sélectionnable."""
-    activities_data = data_manager.load_from_csv()
+    """Afficher le tableau de bord d'analyse de performance avec période sélectionnable.
+    
+    Les totaux et les dernières activités sont lus par des requêtes indexées, et les
+    graphiques sont chargés à part (/api/timeseries) : le coût ne dépend pas du nombre
+    d'activités de l'historique.
+    """
+    dm = get_data_manager()
+    activity_count = dm.count_activities()
     
-    if not activities_data:
+    if not activity_count:
         return redirect(url_for("index"))
     
     # Valider la période
-    valid_periods = ['7d', '1m', '3m', '6m', '1y', 'all']
-    if period not in valid_periods:
+    if period not in VALID_PERIODS:
         period = 'all'
     
-    # Préparation des données pour les graphiques
-    dates = [act.get("start_date_local", "").split("T")[0] for act in activities_data]
-    suffer_scores = [float(act.get("suffer_score", 0)) if act.get("suffer_score", "N/A") != "N/A" else 0 for act in activities_data]
-    
-    # Données pour les zones cardiaques
-    hr_zones_data = {
-        "labels": ["Zone 0", "Zone 1", "Zone 2", "Zone 3", "Zone 4", "Zone 5"],
-        "datasets": []
-    }
-    
-    for i, activity in enumerate(activities_data[:10]):  # Limiter à 10 activités récentes
-        zone_values = [
-            int(activity.get(f"zone_{z}", 0)) for z in range(6)
-        ]
-        date = activity.get("start_date_local", "").split("T")[0]
-        hr_zones_data["datasets"].append({
-            "label": date,
-            "data": zone_values
-        })
+    # Les 7 activités les plus récentes : les ajouts incrémentaux sont en fin de fichier,
+    # l'index les trie par date
+    recent = dm.query_activities(columns=TABLE_COLUMNS, newest_first=True, limit=7)
     
     # Calcul des distances parcourues par type d'activité
-    activity_types = {}
-    for activity in activities_data:
-        activity_type = activity.get("type", "Unknown")
-        distance = float(activity.get("distance", 0))
-        if activity_type in activity_types:
-            activity_types[activity_type] += distance
-        else:
-            activity_types[activity_type] = distance
-    
-    # Préparation des données pour la progression de vitesse
-    speed_data = []
-    for activity in sorted(activities_data, key=lambda x: x.get("start_date_local", "")):
-        date = activity.get("start_date_local", "").split("T")[0]
-        speed = float(activity.get("average_speed", 0))
-        if speed > 0:
-            speed_data.append({"date": date, "speed": speed})
-    
-    # Génération des graphiques avancés avec la période sélectionnée
-    acwr_chart = generate_acwr_chart(activities_data, period)
-    fitness_fatigue_chart = generate_fitness_fatigue_chart(activities_data, period)
-    fatigue_performance_ratio_chart = generate_fatigue_performance_ratio_chart(activities_data, period)
+    activity_types = dm.distance_by_type()
     
     # Labels pour l'affichage
     period_labels = {
@@ -408,19 +461,71 @@ def dashboard(period='all'):
     
     return render_template(
         "dashboard.html",
-        activities=activities_data,
-        dates=dates,
-        suffer_scores=suffer_scores,
-        hr_zones_data=hr_zones_data,
+        activities=activity_records(recent),
+        activity_count=activity_count,
         activity_types=activity_types,
-        speed_data=speed_data,
-        acwr_chart=acwr_chart,
-        fitness_fatigue_chart=fitness_fatigue_chart,
-        fatigue_performance_ratio_chart=fatigue_performance_ratio_chart,
         current_period=period,
-        period_labels=period_labels
+        period_labels=period_labels,
+        period_days=PERIOD_DAYS
+    )
+
+def load_team_ranking(today):
+    """Classe les athlètes enregistrés par risque (ACWR au jour `today`), en une passe vectorisée.
+    
+    Le classement est mis en cache pour les versions courantes des fichiers de tous les athlètes.
+    """
+    athlete_ids = athlete_registry.athlete_ids()
+    managers = [athlete_registry.get(athlete_id) for athlete_id in athlete_ids]
+    engines = [get_training_engine(dm) for dm in managers]
+    key = ("team", tuple(dm.get_version() for dm in managers), tuple(engine.cache_key() for engine in engines),
+           training_load_engine.acwr_mode, today)
+    
+    def build():
+        efforts = {
+            athlete_id: dm.get_derived(
+                ("effort_by_day", repr(engine.weight_scheme)),
+                lambda dm=dm, engine=engine: TrainingLoadEngine.effort_by_day(
+                    dm.load_activities(columns=TRAINING_COLUMNS), weight_scheme=engine.weight_scheme))
+            for athlete_id, dm, engine in zip(athlete_ids, managers, engines)
+        }
+        ids, dates, effort, starts = align_efforts(efforts, end=today)
+        # Constantes de temps propres à chaque athlète
+        loads = squad_loads(effort, starts, acwr_mode=training_load_engine.acwr_mode,
+                            tau_fitness=[engine.tau_fitness for engine in engines],
+                            tau_fatigue=[engine.tau_fatigue for engine in engines])
+        return risk_ranking(ids, loads)
+    
+    return data_manager.cache.get_or_compute(key, build)
+
+@app.route("/team")
+def team():
+    """Afficher le classement des athlètes de l'équipe par risque (ACWR hors de la zone 0.8–1.5).
+    
+    Réservé aux entraîneurs connectés (PEAKFLOW_COACH_IDS) en mode multi-athlète.
+    """
+    if not MULTI_ATHLETE:
+        abort(404)
+    if session.get("athlete_id") is None:
+        return redirect(url_for("login"))
+    if session["athlete_id"] not in COACH_IDS:
+        abort(403)
+    today = pd.Timestamp.now().date()
+    ranking = load_team_ranking(today)
+    return render_template(
+        "team.html",
+        ranking=ranking,
+        at_risk=sum(1 for athlete in ranking if athlete['risk'] > 0),
+        today=today.strftime('%Y-%m-%d'),
+        acwr_low=ACWR_LOW,
+        acwr_high=ACWR_HIGH,
+        athlete_links=DEV_ATHLETE_SWITCH
     )
 
+@app.route("/cache/stats")
+def cache_stats():
+    """Retourne les compteurs du cache de données."""
+    return jsonify(get_data_manager().cache.stats())
+
 if __name__ == "__main__":
     # Assurer que le répertoire de données existe
     os.makedirs(os.path.dirname(data_manager.csv_file), exist_ok=True)
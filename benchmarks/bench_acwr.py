@@ -0,0 +1,56 @@
+"""Benchmark du calcul ACWR : boucles `iloc` historiques contre le module vectorisé.
+
+Usage : python -m benchmarks.bench_acwr [nombre_de_jours]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from peakflow.models.acwr import rolling_load, compute_acwr
+
+
+def acwr_loops(df_full):
+    """Implémentation historique (une tranche `iloc` par jour)."""
+    charge_aigue = []
+    for i in range(len(df_full)):
+        last_7_days = df_full.iloc[max(0, i-6):i+1]
+        charge_aigue.append(last_7_days["relative_effort"].sum()/7)
+
+    charge_chronique = []
+    for i in range(len(df_full)):
+        last_28_days = df_full.iloc[max(0, i-27):i+1]
+        charge_chronique.append(last_28_days["relative_effort"].sum()/28)
+
+    return np.array(charge_aigue), np.array(charge_chronique)
+
+
+def main(days=3650):
+    """Compare les deux implémentations sur `days` jours de données (10 ans par défaut)."""
+    rng = np.random.default_rng(0)
+    effort = rng.gamma(2.0, 150.0, size=days) * (rng.random(days) < 0.7)
+    df_full = pd.DataFrame({'relative_effort': effort})
+
+    start = time.perf_counter()
+    ref_aigue, ref_chronique = acwr_loops(df_full)
+    loops_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    aigue = rolling_load(effort, 7)
+    chronique = rolling_load(effort, 28)
+    vector_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compute_acwr(effort, mode="ewma")
+    ewma_time = time.perf_counter() - start
+
+    identical = np.array_equal(aigue, ref_aigue) and np.array_equal(chronique, ref_chronique)
+    print(f"{days} jours")
+    print(f"Boucles iloc : {loops_time * 1000:.1f} ms")
+    print(f"Vectorisé    : {vector_time * 1000:.2f} ms (x{loops_time / vector_time:.0f})")
+    print(f"EWMA         : {ewma_time * 1000:.2f} ms")
+    print(f"Résultats identiques au bit près : {identical}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3650)
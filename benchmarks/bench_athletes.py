@@ -0,0 +1,98 @@
+"""Test de charge multi-athlètes : sessions concurrentes sur l'application Flask.
+
+Chaque client sélectionne son athlète, envoie un export initial puis, en boucle,
+consulte le tableau de bord et les séries, et ajoute des activités. On vérifie à
+la fin que chaque athlète ne voit que ses propres activités, et on affiche les
+latences (p50, p95) et le débit.
+
+Le benchmark active le mode multi-athlètes et la sélection d'athlète de développement
+(PEAKFLOW_MULTI_ATHLETE=1 et PEAKFLOW_DEV_ATHLETE_SWITCH=1) avant d'importer
+l'application : sans ces variables, /athlete/<id> répond 404.
+
+Usage : python -m benchmarks.bench_athletes [nombre_d_athletes] [iterations] [threads]
+"""
+
+import io
+import os
+import sys
+import csv
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from benchmarks.strava_stub import make_activities
+from peakflow.models.activity_analyzer import ActivityAnalyzer
+
+
+def export_csv(activities):
+    """Construit un export CSV (octets) à partir d'activités au format Strava."""
+    records = [ActivityAnalyzer.build_activity_record(activity, embed_streams=False) for activity in activities]
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(records[0].keys()))
+    writer.writeheader()
+    writer.writerows(records)
+    return out.getvalue().encode("utf-8")
+
+
+def run_athlete(app, index, iterations, initial, latencies):
+    """Simule la session d'un athlète et retourne (identifiant, identifiants d'activités envoyés)."""
+    athlete_id = f"athlete-{index}"
+    # Plage d'identifiants propre à l'athlète, pour détecter tout mélange de données
+    activities = make_activities(initial + iterations)[::-1]
+    for activity in activities:
+        activity["id"] += index * 100000
+    client = app.test_client()
+
+    def timed(method, *args, **kwargs):
+        start = time.perf_counter()
+        response = getattr(client, method)(*args, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code < 400, (athlete_id, args[0], response.status_code)
+        return response
+
+    timed("get", f"/athlete/{athlete_id}")
+    timed("post", "/", data={"file": (io.BytesIO(export_csv(activities[:initial])), "export.csv")},
+          content_type="multipart/form-data")
+    for i in range(iterations):
+        timed("get", "/dashboard")
+        timed("get", "/api/timeseries?metrics=acwr,form&period=1y")
+        batch = activities[initial + i:initial + i + 1]
+        timed("post", "/", data={"file": (io.BytesIO(export_csv(batch)), "export.csv"), "mode": "append"},
+              content_type="multipart/form-data")
+    return athlete_id, {activity["id"] for activity in activities}
+
+
+def main(athletes=50, iterations=5, threads=16, initial=200):
+    """Lance `athletes` sessions concurrentes de `iterations` cycles sur `threads` threads."""
+    with tempfile.TemporaryDirectory() as directory:
+        # L'application crée ses dossiers de données relativement au dossier courant
+        os.chdir(directory)
+        # Lues à l'import de l'application
+        os.environ["PEAKFLOW_MULTI_ATHLETE"] = "1"
+        os.environ["PEAKFLOW_DEV_ATHLETE_SWITCH"] = "1"
+        import app as webapp
+
+        latencies = []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(
+                lambda i: run_athlete(webapp.app, i, iterations, initial, latencies), range(athletes)))
+        elapsed = time.perf_counter() - start
+
+        for athlete_id, expected in results:
+            stored = webapp.athlete_registry.get(athlete_id).load_activities(columns=["activity_id"])
+            ids = set(stored["activity_id"].astype(int))
+            if ids != expected:
+                raise AssertionError(f"{athlete_id} : {len(ids ^ expected)} activités inattendues ou manquantes")
+
+        latencies = np.array(latencies) * 1000
+        print(f"{athletes} athlètes, {threads} threads : {len(latencies)} requêtes en {elapsed:.1f} s "
+              f"({len(latencies) / elapsed:.0f} req/s)")
+        print(f"Latence : p50 {np.percentile(latencies, 50):.0f} ms, p95 {np.percentile(latencies, 95):.0f} ms, "
+              f"max {latencies.max():.0f} ms")
+        print(f"Données isolées : {athletes} athlètes vérifiés, cache {webapp.data_manager.cache.stats()}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    main(*args)
@@ -0,0 +1,48 @@
+"""Synchronisation complète de l'historique contre un serveur simulé appliquant des quotas.
+
+Les fenêtres des quotas sont raccourcies (1 s et 10 s au lieu de 15 min et 24 h) ;
+le serveur renvoie aussi des erreurs 503 aléatoires. Le débit obtenu est comparé au
+débit maximal permis par les quotas.
+
+Usage : python -m benchmarks.bench_backfill [nombre_d_activites]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from peakflow.api.strava import StravaAPI, RateLimiter
+from peakflow.models.data_manager import DataManager
+from benchmarks.strava_stub import StubStrava
+
+LIMITS = (40, 300)
+WINDOWS = (1, 10)
+
+
+def main(activities=200):
+    """Synchronise `activities` activités et affiche les mesures."""
+    with StubStrava(activities=activities, limits=LIMITS, windows=WINDOWS, failure_rate=0.02) as stub, \
+            tempfile.TemporaryDirectory() as directory:
+        token_file = os.path.join(directory, "tokens.json")
+        with open(token_file, "w") as f:
+            json.dump({"access_token": "stub", "refresh_token": "stub", "expires_at": time.time() + 3600}, f)
+
+        api = StravaAPI(token_file=token_file, base_url=stub.url,
+                        rate_limiter=RateLimiter(limits=LIMITS, windows=WINDOWS, margin=0.05))
+        api.RETRY_BACKOFF = 0.05
+        data_manager = DataManager(csv_file=os.path.join(directory, "activities.csv"))
+
+        start = time.perf_counter()
+        added = api.backfill(data_manager, os.path.join(directory, "queue.json"), ftp=250, progress=None)
+        elapsed = time.perf_counter() - start
+
+        # Débit maximal : le quota le plus contraignant sur la durée mesurée
+        best = min(limit / window for limit, window in zip(LIMITS, WINDOWS))
+        print(f"{added} activités ajoutées en {elapsed:.1f} s")
+        print(f"{stub.requests} requêtes, {stub.throttled} réponses 429, {stub.failures} erreurs 503 simulées")
+        print(f"Débit : {stub.requests / elapsed:.1f} req/s (quota : {best:.1f} req/s en régime établi)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
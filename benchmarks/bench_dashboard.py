@@ -0,0 +1,109 @@
+"""Benchmark des données du tableau de bord : DataFrame complet historique, requêtes sur
+l'index SQLite et agrégats quotidiens/hebdomadaires.
+
+Pour des historiques de tailles croissantes, mesure le calcul des données du tableau
+de bord (dernières activités, totaux par type, effort et vitesse de la période) avec
+chaque méthode, pour les périodes 7d, 1m, 1y et all. Une activité est ajoutée avant chaque mesure,
+comme après une synchronisation : les résultats en cache de la version précédente ne
+servent plus.
+
+Usage : python -m benchmarks.bench_dashboard [nombre_max_d_activites]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from peakflow.models.data_manager import DataManager
+from peakflow.utils.cache import LRUCache
+
+COLUMNS = ["activity_id", "start_date_local", "type", "distance", "moving_time", "suffer_score",
+           "average_speed"] + [f"zone_{z}" for z in range(6)]
+
+PERIOD_DAYS = {'7d': 7, '1m': 30, '1y': 365, 'all': None}
+
+# Durée de l'historique généré (jours) : plus d'activités signifie plus d'activités par jour
+HISTORY_DAYS = 3650
+
+
+def make_records(count, rng):
+    """Génère `count` activités réparties sur les HISTORY_DAYS jours précédant aujourd'hui."""
+    today = pd.Timestamp.now().normalize()
+    offsets = np.sort(rng.integers(0, HISTORY_DAYS * 24, count))[::-1]
+    return [{"activity_id": i, "start_date_local": (today - pd.Timedelta(hours=int(h))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+             "type": ("Run", "Ride", "Swim")[i % 3], "distance": float(rng.uniform(1, 50)), "moving_time": "1:00:00",
+             "suffer_score": int(rng.integers(0, 200)), "average_speed": float(rng.uniform(0, 15)),
+             **{f"zone_{z}": int(rng.integers(0, 900)) for z in range(6)}}
+            for i, h in enumerate(offsets)]
+
+
+def dashboard_frame(data_manager, start):
+    """Implémentation historique : DataFrame complet (en cache), tris et agrégats en pandas."""
+    df = data_manager.load_activities(columns=COLUMNS)
+    latest = df.sort_values("start_date_local", ascending=False, kind="stable").head(10)
+    types = df["distance"].fillna(0).groupby(df["type"].fillna("Unknown"), sort=False).sum().to_dict()
+    by_date = df.sort_values("start_date_local", kind="stable")
+    if start is not None:
+        by_date = by_date[by_date["start_date_local"] >= start]
+    return len(df), latest, types, by_date
+
+
+def dashboard_index(data_manager, start):
+    """Requêtes indexées sur les activités (voir DataManager.query_activities)."""
+    return (data_manager.count_activities(),
+            data_manager.query_activities(columns=COLUMNS, newest_first=True, limit=10),
+            data_manager.distance_by_type(),
+            data_manager.query_activities(columns=["start_date_local", "suffer_score", "average_speed"],
+                                          start=start))
+
+
+def dashboard_rollups(data_manager, start):
+    """Implémentation actuelle : agrégats par jour (par semaine pour tout l'historique)."""
+    return (data_manager.count_activities(),
+            data_manager.query_activities(columns=COLUMNS, newest_first=True, limit=10),
+            data_manager.distance_by_type(),
+            data_manager.activity_rollups("day" if start is not None else "week", start=start, by_type=False))
+
+
+def median_time(function, data_manager, start, new_records):
+    """Temps d'exécution médian (ms), une nouvelle activité étant ajoutée avant chaque appel."""
+    times = []
+    for record in new_records:
+        data_manager.append_activities([record])
+        begin = time.perf_counter()
+        function(data_manager, start)
+        times.append(time.perf_counter() - begin)
+    return float(np.median(times)) * 1000
+
+
+def main(max_activities=100000):
+    """Compare les deux méthodes pour des historiques de 1 000 à `max_activities` activités."""
+    rng = np.random.default_rng(0)
+    sizes = [size for size in (1000, 10000, 100000, 1000000) if size <= max_activities]
+    today = pd.Timestamp.now().normalize()
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'activités':>10} {'période':>8} {'DataFrame':>10} {'requêtes':>9} {'agrégats':>9}")
+        for size in sizes:
+            data_manager = DataManager(csv_file=os.path.join(directory, str(size), "activities.csv"),
+                                       cache=LRUCache())
+            records = make_records(size + 120, rng)
+            data_manager.save_to_csv(records[:size])
+            # Premier accès : cache et index construits hors mesure
+            dashboard_frame(data_manager, None)
+            dashboard_index(data_manager, None)
+            dashboard_rollups(data_manager, None)
+            new_records = iter(records[size:])
+            for period, days in PERIOD_DAYS.items():
+                start = today - pd.Timedelta(days=days) if days else None
+                frame_time = median_time(dashboard_frame, data_manager, start, [next(new_records) for _ in range(10)])
+                index_time = median_time(dashboard_index, data_manager, start, [next(new_records) for _ in range(10)])
+                rollup_time = median_time(dashboard_rollups, data_manager, start,
+                                          [next(new_records) for _ in range(10)])
+                print(f"{size:>10} {period:>8} {frame_time:>8.1f}ms {index_time:>7.1f}ms {rollup_time:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
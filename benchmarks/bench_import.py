@@ -0,0 +1,79 @@
+"""Benchmark de l'import CSV : chargement complet historique contre import par blocs.
+
+Génère un export avec streams intégrés, l'importe avec chaque méthode dans un
+processus séparé et affiche le débit (lignes/s) et la mémoire maximale (RSS).
+
+Usage : python -m benchmarks.bench_import [nombre_de_lignes] [echantillons_par_activite]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import resource
+import tempfile
+import multiprocessing
+import numpy as np
+from peakflow.models.data_manager import DataManager
+
+COLUMNS = ["activity_id", "name", "type", "start_date_local", "distance", "moving_time",
+           "average_speed", "suffer_score"] + [f"zone_{z}" for z in range(6)] + \
+          ["pace_data", "heartrate_data"]
+
+
+def write_export(path, rows, samples):
+    """Écrit un export CSV de `rows` activités, ligne par ligne."""
+    rng = np.random.default_rng(0)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            time_data = list(range(samples))
+            distance = np.cumsum(rng.uniform(2, 4, samples)).round(1) / 1000
+            writer.writerow([
+                1000 + i, f"Sortie {i}", "Run", f"2020-01-01T07:00:00Z", 10.0, "1:00:00", 10.0, 50,
+                *rng.integers(0, 900, 6).tolist(),
+                json.dumps({"time": time_data, "distance": distance.tolist(),
+                            "velocity": rng.uniform(8, 14, samples).round(2).tolist()}),
+                json.dumps({"time": time_data, "heartrate": rng.integers(100, 185, samples).tolist()}),
+            ])
+
+
+def peak_rss_mb():
+    """Mémoire maximale du processus courant (Mo)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_import(method, export, directory, results):
+    """Importe l'export avec la méthode donnée (dans un processus séparé)."""
+    data_manager = DataManager(csv_file=os.path.join(directory, method, "activities.csv"))
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if method == "complet":
+        data_manager.load_from_csv(csv_file=export)
+    else:
+        data_manager.import_csv(export)
+    results.put((method, time.perf_counter() - start, baseline, peak_rss_mb()))
+
+
+def main(rows=2000, samples=3600):
+    """Compare les deux méthodes d'import sur un export de `rows` activités."""
+    with tempfile.TemporaryDirectory() as directory:
+        export = os.path.join(directory, "export.csv")
+        write_export(export, rows, samples)
+        print(f"Export : {rows} lignes, {os.path.getsize(export) / 1e6:.0f} Mo")
+
+        results = multiprocessing.Queue()
+        for method in ("complet", "par blocs"):
+            process = multiprocessing.Process(target=run_import, args=(method, export, directory, results))
+            process.start()
+            method, elapsed, baseline, peak = results.get()
+            process.join()
+            print(f"{method:<10} : {rows / elapsed:.0f} lignes/s, RSS max {peak:.0f} Mo "
+                  f"(+{peak - baseline:.0f} Mo)")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,51 @@
+"""Benchmark de la courbe de puissance : sommes de tranches historiques contre sommes cumulées.
+
+Usage : python -m benchmarks.bench_power_curve [nombre_d_echantillons]
+"""
+
+import sys
+import time
+import numpy as np
+from peakflow.models.power_analyzer import PowerAnalyzer
+
+
+def power_curve_loops(watts_data):
+    """Implémentation historique (somme de chaque tranche pour chaque départ)."""
+    durations = [1, 5, 10, 30, 60, 300, 600, 1200, 3600]
+    power_curve = {}
+    for duration in durations:
+        if len(watts_data) >= duration:
+            max_power = 0
+            for i in range(len(watts_data) - duration + 1):
+                avg_power = sum(watts_data[i:i+duration]) / duration
+                max_power = max(max_power, avg_power)
+            power_curve[str(duration)] = round(max_power, 2)
+    return power_curve
+
+
+def main(samples=20000):
+    """Compare les implémentations sur une sortie simulée de `samples` secondes."""
+    rng = np.random.default_rng(0)
+    watts_data = np.clip(rng.normal(220, 60, size=samples), 1, None).round().astype(int).tolist()
+
+    start = time.perf_counter()
+    reference = power_curve_loops(watts_data)
+    loops_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    curve = PowerAnalyzer.calculate_power_curve(watts_data)
+    prefix_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mmp = PowerAnalyzer.calculate_mean_max_power(watts_data)
+    mmp_time = time.perf_counter() - start
+
+    print(f"{samples} échantillons")
+    print(f"Tranches (durées standards)        : {loops_time * 1000:.0f} ms")
+    print(f"Sommes cumulées (durées standards) : {prefix_time * 1000:.2f} ms (x{loops_time / prefix_time:.0f})")
+    print(f"Courbe complète ({len(mmp)} durées)   : {mmp_time * 1000:.0f} ms")
+    print(f"Résultats identiques : {curve == reference}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,43 @@
+"""Benchmark de la réanalyse en masse selon le nombre de processus.
+
+Usage : python -m benchmarks.bench_reanalysis [nombre_d_activites] [duree_en_secondes]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from peakflow.models.activity_analyzer import ActivityAnalyzer
+from peakflow.models.data_manager import DataManager
+from peakflow.models.reanalysis import reanalyze_all, hr_zones_from_bounds
+from peakflow.models.stream_cache import StreamCache
+from benchmarks.strava_stub import make_activities, make_streams
+
+
+def main(activities=500, samples=3600):
+    """Réanalyse `activities` activités de `samples` secondes avec 1 à N processus."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = StreamCache(os.path.join(directory, "streams"))
+        records = []
+        for activity in make_activities(activities):
+            cache.put(activity["id"], make_streams(activity["id"], samples=samples))
+            records.append(ActivityAnalyzer.build_activity_record(activity, embed_streams=False))
+        data_manager = DataManager(csv_file=os.path.join(directory, "activities.csv"))
+        data_manager.save_to_csv(records)
+
+        hr_zones = hr_zones_from_bounds([0, 120, 140, 155, 170, 185])
+        cores = os.cpu_count() or 1
+        reference = None
+        for workers in sorted({1, 2, cores // 2, cores} - {0}):
+            start = time.perf_counter()
+            reanalyze_all(data_manager, ftp=280, hr_zones=hr_zones, stream_dir=cache.cache_dir,
+                          max_workers=workers, progress=None)
+            elapsed = time.perf_counter() - start
+            reference = reference or elapsed
+            print(f"{workers:>3} processus : {elapsed:.2f} s ({activities / elapsed:.0f} activités/s, "
+                  f"x{reference / elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,41 @@
+"""Benchmark de l'analyse d'équipe : une série par athlète contre une passe vectorisée.
+
+Usage : python -m benchmarks.bench_squad [nombre_d_athletes] [nombre_de_jours]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from peakflow.models.squad import squad_loads, risk_ranking
+from peakflow.models.training_load import TrainingLoadEngine
+
+
+def main(athletes=500, days=1826):
+    """Compare les deux méthodes sur `athletes` athlètes × `days` jours (5 ans par défaut)."""
+    rng = np.random.default_rng(0)
+    effort = rng.gamma(2.0, 150.0, size=(athletes, days)) * (rng.random((athletes, days)) < 0.7)
+    dates = pd.date_range("2020-01-01", periods=days).date
+    engine = TrainingLoadEngine()
+
+    start = time.perf_counter()
+    series = [engine.series_from_effort(pd.Series(row, index=dates)) for row in effort]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loads = squad_loads(effort)
+    ranking = risk_ranking([f"athlete-{i}" for i in range(athletes)], loads)
+    squad_time = time.perf_counter() - start
+
+    error = max(np.max(np.abs(loads[column] - np.stack([s[column].to_numpy() for s in series])))
+                for column in loads)
+    at_risk = sum(1 for athlete in ranking if athlete['risk'] > 0)
+    print(f"{athletes} athlètes × {days} jours")
+    print(f"Par athlète : {loop_time:.2f} s")
+    print(f"Vectorisé   : {squad_time:.3f} s (x{loop_time / squad_time:.0f}), écart max {error:.1e}, "
+          f"{at_risk} athlètes à risque")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
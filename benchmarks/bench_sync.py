@@ -0,0 +1,45 @@
+"""Benchmark de la synchronisation Strava contre un serveur local simulé.
+
+Compare une synchronisation séquentielle (1 requête à la fois) à une synchronisation
+parallèle, avec une latence simulée par requête.
+
+Usage : python -m benchmarks.bench_sync [nombre_d_activites] [latence_ms] [requetes_simultanees]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+from peakflow.api.strava import StravaAPI, RateLimiter
+from benchmarks.strava_stub import StubStrava
+
+
+def run(activities, latency, max_workers):
+    """Synchronise toutes les activités du serveur simulé et retourne les mesures."""
+    with StubStrava(activities=activities, latency=latency) as stub, \
+            tempfile.TemporaryDirectory() as directory:
+        token_file = os.path.join(directory, "tokens.json")
+        with open(token_file, "w") as f:
+            json.dump({"access_token": "stub", "refresh_token": "stub", "expires_at": time.time() + 3600}, f)
+
+        # Le serveur simulé n'envoie pas d'en-têtes de quota : régulateur sans limite
+        api = StravaAPI(token_file=token_file, base_url=stub.url, max_workers=max_workers,
+                        rate_limiter=RateLimiter(limits=(float("inf"),) * 2))
+        start = time.perf_counter()
+        records = api.sync_activities(ftp=250)
+        elapsed = time.perf_counter() - start
+        return len(records), stub.requests, stub.connections, elapsed
+
+
+def main(activities=200, latency_ms=20, max_workers=8):
+    """Affiche le temps de synchronisation séquentiel et parallèle."""
+    for workers in (1, max_workers):
+        count, requests, connections, elapsed = run(activities, latency_ms / 1000, workers)
+        print(f"{workers:>2} requête(s) simultanée(s) : {count} activités, {requests} requêtes, "
+              f"{connections} connexions, {elapsed:.2f} s ({requests / elapsed:.0f} req/s)")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    main(*args)
@@ -0,0 +1,233 @@
+"""Serveur local simulant les points d'accès de l'API Strava utilisés par StravaAPI.
+
+Usage : python -m benchmarks.strava_stub [nombre_d_activites] [port]
+        (puis STRAVA_API_URL=http://127.0.0.1:<port> pour pointer l'application dessus)
+"""
+
+import re
+import socket
+import sys
+import json
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+
+
+def make_activities(count, start=datetime(2020, 1, 1)):
+    """Génère `count` activités (une par jour), de la plus récente à la plus ancienne comme Strava."""
+    activities = []
+    for i in range(count):
+        date = start + timedelta(days=i, hours=7)
+        activities.append({
+            "id": 1000 + i,
+            "name": f"Sortie {i}",
+            "type": "Ride" if i % 3 else "Run",
+            "start_date": date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "start_date_local": date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "distance": 20000.0 + 100 * (i % 50),
+            "moving_time": 3600,
+            "elapsed_time": 3700,
+            "total_elevation_gain": 150.0,
+            "average_speed": 5.5,
+            "max_speed": 12.0,
+            "average_heartrate": 140.0,
+            "max_heartrate": 175.0,
+            "suffer_score": 60,
+            "device_watts": bool(i % 3),
+        })
+    return activities[::-1]
+
+
+def make_streams(activity_id, samples=600):
+    """Génère des streams déterministes pour une activité."""
+    rng = np.random.default_rng(activity_id)
+    velocity = np.clip(rng.normal(5.5, 1.0, samples), 0.5, None)
+    return {
+        "time": {"data": list(range(samples))},
+        "distance": {"data": np.cumsum(velocity).round(1).tolist()},
+        "velocity_smooth": {"data": velocity.round(3).tolist()},
+        "heartrate": {"data": rng.integers(100, 185, samples).tolist()},
+        "altitude": {"data": (100 + np.cumsum(rng.normal(0, 0.5, samples))).round(1).tolist()},
+        "watts": {"data": rng.integers(80, 400, samples).tolist()},
+        "cadence": {"data": rng.integers(70, 100, samples).tolist()},
+    }
+
+
+class StubStrava:
+    """Serveur HTTP local (dans un thread) imitant l'API Strava.
+
+    Compte les requêtes et les connexions TCP ouvertes (pour vérifier la réutilisation
+    des connexions), peut ajouter une latence fixe à chaque réponse, appliquer des
+    quotas comme Strava (réponses 429 et en-têtes X-RateLimit-*) et simuler des erreurs
+    temporaires (503).
+    """
+
+    def __init__(self, activities=100, latency=0.0, port=0, limits=None, windows=(900, 86400),
+                 failure_rate=0.0):
+        """Initialise le serveur.
+
+        Args:
+            activities: Nombre d'activités simulées.
+            latency: Latence ajoutée à chaque réponse (secondes).
+            port: Port d'écoute (0 = port libre choisi par le système).
+            limits: Optionnel, quotas (un par fenêtre) ; aucun quota par défaut.
+            windows: Durées des fenêtres des quotas (secondes), alignées sur l'horloge.
+            failure_rate: Proportion de réponses 503.
+        """
+        self.activities = make_activities(activities)
+        self.latency = latency
+        self.limits = limits
+        self.windows = windows
+        self.failure_rate = failure_rate
+        self.random = np.random.default_rng(0)
+        self.usage = [0] * len(windows)
+        self.periods = [None] * len(windows)
+        self.requests = 0
+        self.throttled = 0
+        self.failures = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        """URL de base à passer à StravaAPI(base_url=...)."""
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def check_quota(self):
+        """Comptabilise une requête ; retourne (réponse 429 ou None, en-têtes de quota)."""
+        if self.limits is None:
+            return None, {}
+        with self.lock:
+            now = time.time()
+            for i, window in enumerate(self.windows):
+                if self.periods[i] != int(now // window):
+                    self.periods[i], self.usage[i] = int(now // window), 0
+            over = any(usage >= limit for usage, limit in zip(self.usage, self.limits))
+            if over:
+                self.throttled += 1
+            else:
+                self.usage = [usage + 1 for usage in self.usage]
+            headers = {"X-RateLimit-Limit": ",".join(map(str, self.limits)),
+                       "X-RateLimit-Usage": ",".join(map(str, self.usage))}
+        if over:
+            return (429, headers, {"message": "Rate Limit Exceeded"}), headers
+        return None, headers
+
+    def add_activities(self, count):
+        """Ajoute `count` nouvelles activités (les plus récentes), comme après de nouvelles sorties."""
+        latest = max(activity["id"] for activity in self.activities) if self.activities else 999
+        start = datetime(2020, 1, 1) + timedelta(days=latest - 999)
+        new = make_activities(count, start=start)
+        for activity in new:
+            activity["id"] += latest - 999
+        self.activities = new + self.activities
+
+    def respond(self, method, path, query):
+        """Retourne (code, en-têtes, corps JSON) pour une requête."""
+        rejected, headers = self.check_quota()
+        if rejected:
+            return rejected
+        with self.lock:
+            failed = self.random.random() < self.failure_rate
+            self.failures += failed
+        if failed:
+            return 503, headers, {"message": "Service Unavailable"}
+        status, extra, payload = self.route(method, path, query)
+        return status, {**headers, **extra}, payload
+
+    def route(self, method, path, query):
+        """Retourne (code, en-têtes, corps JSON) d'un point d'accès."""
+        if method == "POST" and path == "/oauth/token":
+            return 200, {}, {"access_token": "stub", "refresh_token": "stub",
+                             "expires_at": time.time() + 6 * 3600}
+        if path == "/athlete/activities":
+            page = int(query.get("page", 1))
+            per_page = int(query.get("per_page", 30))
+            activities = self.activities
+            if "after" in query:
+                after = int(query["after"])
+                activities = [a for a in activities if datetime.strptime(
+                    a["start_date"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp() > after]
+            return 200, {}, activities[(page - 1) * per_page:page * per_page]
+        if path == "/athlete/zones":
+            bounds = [0, 120, 140, 155, 170, 185]
+            return 200, {}, {"heart_rate": {"zones": [
+                {"min": low, "max": high} for low, high in zip(bounds, bounds[1:] + [-1])]}}
+        match = re.fullmatch(r"/activities/(\d+)/(streams|zones)", path)
+        if match:
+            activity_id = int(match.group(1))
+            if match.group(2) == "streams":
+                return 200, {}, make_streams(activity_id)
+            return 200, {}, [{"type": "heartrate", "distribution_buckets": [
+                {"min": 0, "max": 120, "time": activity_id % 600 + i} for i in range(6)]}]
+        return 404, {}, {"message": "Record Not Found"}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Sans TCP_NODELAY, l'envoi séparé des en-têtes et du corps subit l'ACK retardé
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub.lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method):
+                with stub.lock:
+                    stub.requests += 1
+                url = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, headers, payload = stub.respond(method, url.path, query)
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                if length:
+                    self.rfile.read(length)
+                self._serve("POST")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    with StubStrava(activities=count, port=port) as stub:
+        print(f"Serveur simulé sur {stub.url} ({count} activités), Ctrl+C pour arrêter")
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            pass
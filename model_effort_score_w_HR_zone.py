@@ -7,6 +7,7 @@ from sklearn.metrics import mean_squared_error
 import seaborn as sns
 import matplotlib.pyplot as plt
 from datetime import datetime as dt
+from peakflow.models.acwr import rolling_load
 
 
 
@@ -58,29 +59,9 @@ df_full['relative_effort'] = df_full['relative_effort'].fillna(0)
 ####### Calcul des charges aigue et chronique ########
 ######################################################
 
-# Calcul de la charge aigue
-charge_aigue = []
-
-for i in range(len(df_full)):
-    last_7_days = df_full.iloc[max(0, i-6):i+1]
-    
-    ca = (last_7_days["relative_effort"].sum()/7)
-    
-    charge_aigue.append(ca)
-
-df_full["Charge_aigue"] = charge_aigue
-
-# Calcul de la charge chronique
-charge_chronique = []
-
-for i in range(len(df_full)):
-    last_28_days = df_full.iloc[max(0, i-27):i+1]
-    
-    cc = (last_28_days["relative_effort"].sum()/28)
-    
-    charge_chronique.append(cc)
-
-df_full["Charge_chronique"] = charge_chronique
+# Calcul des charges aigue (7 jours) et chronique (28 jours)
+df_full["Charge_aigue"] = rolling_load(df_full["relative_effort"].to_numpy(), 7)
+df_full["Charge_chronique"] = rolling_load(df_full["relative_effort"].to_numpy(), 28)
 
 # Calcul du ratio Charge Aiguë / Charge Chronique (ACWR)
 df_full['Ratio_AC'] = df_full['Charge_aigue'] / df_full['Charge_chronique']
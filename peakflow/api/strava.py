@@ -2,29 +2,276 @@
 
 import os
 import json
+import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 import csv
+from peakflow.models.activity_analyzer import ActivityAnalyzer
+from peakflow.models.stream_cache import STREAM_KEYS
+from peakflow.utils.files import atomic_write
+
+# URL de base de l'API (remplaçable, ex: serveur local simulant Strava)
+STRAVA_API_URL = "https://www.strava.com/api/v3"
+
+# Nombre de requêtes simultanées par défaut lors d'une synchronisation
+DEFAULT_MAX_WORKERS = 8
+
+# Fenêtres des quotas Strava (secondes) : 15 minutes (alignées sur le quart d'heure)
+# et journée (remise à zéro à minuit UTC)
+RATE_LIMIT_WINDOWS = (15 * 60, 24 * 3600)
+
+# Codes de réponse temporaires, retentés avec un délai croissant
+RETRY_STATUS = {500, 502, 503, 504}
+
+
+def write_json(path, data):
+    """Écrit un fichier JSON de façon atomique (voir atomic_write)."""
+    with atomic_write(path, mode="w") as f:
+        json.dump(data, f)
+
+
+def read_json(path, default=None):
+    """Lit un fichier JSON, ou retourne `default` s'il n'existe pas."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+class RateLimiter:
+    """Classe pour répartir les requêtes dans les quotas de l'API Strava.
+    
+    Les limites et l'usage de chaque fenêtre sont lus dans les en-têtes X-RateLimit-*
+    (et X-ReadRateLimit-* pour les lectures) des réponses, et complétés par le compte
+    local des requêtes en cours. Les requêtes partent sans délai tant que toutes les
+    fenêtres ont de la marge ; sinon elles attendent la fin de la fenêtre épuisée.
+    """
+    
+    HEADERS = ("X-RateLimit", "X-ReadRateLimit")
+    
+    def __init__(self, limits=(100, 1000), windows=RATE_LIMIT_WINDOWS, margin=1.0,
+                 clock=time.time, sleep=time.sleep):
+        """Initialise le régulateur.
+        
+        Args:
+            limits: Limites supposées avant la première réponse (une par fenêtre).
+            windows: Durées des fenêtres (secondes), alignées sur l'horloge.
+            margin: Délai ajouté après la fin d'une fenêtre (écart d'horloge avec le serveur).
+            clock: Fonction retournant l'heure courante (secondes).
+            sleep: Fonction d'attente.
+        """
+        self.windows = tuple(windows)
+        self.margin = margin
+        self.clock = clock
+        self.sleep = sleep
+        # Limites et usage par famille d'en-têtes, une valeur par fenêtre
+        self.limits = {self.HEADERS[0]: list(limits)}
+        self.usage = {self.HEADERS[0]: [0] * len(self.windows)}
+        self.periods = self._periods(clock())
+        self.waited = 0.0
+        self.lock = threading.Lock()
+    
+    def _periods(self, now):
+        """Retourne l'indice de la fenêtre courante pour chaque durée."""
+        return tuple(int(now // window) for window in self.windows)
+    
+    def _roll(self, now):
+        """Remet à zéro l'usage des fenêtres terminées."""
+        periods = self._periods(now)
+        for i, (old, new) in enumerate(zip(self.periods, periods)):
+            if new != old:
+                for usage in self.usage.values():
+                    usage[i] = 0
+        self.periods = periods
+    
+    def acquire(self):
+        """Attend qu'une requête puisse partir et la comptabilise.
+        
+        Returns:
+            Les fenêtres courantes, à repasser à update() avec la réponse.
+        """
+        with self.lock:
+            while True:
+                now = self.clock()
+                self._roll(now)
+                wait = 0
+                for name, limits in self.limits.items():
+                    for i, (limit, window) in enumerate(zip(limits, self.windows)):
+                        if self.usage[name][i] >= limit:
+                            wait = max(wait, (self.periods[i] + 1) * window - now + self.margin)
+                if wait <= 0:
+                    for usage in self.usage.values():
+                        for i in range(len(usage)):
+                            usage[i] += 1
+                    return self.periods
+                # Le verrou est conservé : les autres requêtes attendent la même fenêtre
+                self.waited += wait
+                self.sleep(wait)
+    
+    def update(self, headers, periods):
+        """Met à jour limites et usage à partir des en-têtes d'une réponse envoyée pendant `periods`."""
+        with self.lock:
+            self._roll(self.clock())
+            for name in self.HEADERS:
+                limit, usage = headers.get(f"{name}-Limit"), headers.get(f"{name}-Usage")
+                if not limit or not usage:
+                    continue
+                try:
+                    limits = [int(value) for value in limit.split(",")][:len(self.windows)]
+                    used = [int(value) for value in usage.split(",")][:len(self.windows)]
+                except ValueError:
+                    continue
+                self.limits[name] = limits
+                current = self.usage.setdefault(name, [0] * len(self.windows))
+                for i, value in enumerate(used):
+                    # Une réponse d'une fenêtre terminée ne compte pas dans la nouvelle
+                    if periods[i] == self.periods[i]:
+                        current[i] = max(current[i], value)
+    
+    def exhausted(self, periods):
+        """Marque la fenêtre courte comme épuisée (réponse 429 sans en-têtes exploitables)."""
+        with self.lock:
+            self._roll(self.clock())
+            if periods[0] == self.periods[0]:
+                for name, limits in self.limits.items():
+                    self.usage[name][0] = max(self.usage[name][0], limits[0])
+
+
+class SyncQueue:
+    """File persistante (JSON) des activités restant à synchroniser.
+    
+    Le fichier est réécrit atomiquement après chaque lot : une synchronisation
+    interrompue reprend là où elle s'était arrêtée.
+    """
+    
+    def __init__(self, path):
+        """Initialise la file à partir du fichier `path` (créé à la première sauvegarde)."""
+        self.path = path
+        state = read_json(path, {})
+        self.pending = state.get("pending", [])
+        self.attempts = state.get("attempts", {})
+        # Point de reprise à enregistrer une fois la file vidée (synchronisation incrémentale)
+        self.checkpoint = state.get("checkpoint")
+    
+    def __len__(self):
+        return len(self.pending)
+    
+    def save(self):
+        """Enregistre la file (écriture atomique)."""
+        write_json(self.path, {"pending": self.pending, "attempts": self.attempts,
+                               "checkpoint": self.checkpoint})
+    
+    def extend(self, activities):
+        """Ajoute des activités (résumés Strava) absentes de la file."""
+        ids = {activity["id"] for activity in self.pending}
+        self.pending.extend(activity for activity in activities if activity["id"] not in ids)
+    
+    def remove(self, activity_ids):
+        """Retire de la file les activités traitées."""
+        activity_ids = set(activity_ids)
+        self.pending = [activity for activity in self.pending if activity["id"] not in activity_ids]
+        for activity_id in activity_ids:
+            self.attempts.pop(str(activity_id), None)
+    
+    def retry(self, activity, max_attempts):
+        """Replace une activité en échec en fin de file.
+        
+        Returns:
+            False si l'activité a atteint `max_attempts` tentatives.
+        """
+        key = str(activity["id"])
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        if self.attempts[key] >= max_attempts:
+            return False
+        self.pending.remove(activity)
+        self.pending.append(activity)
+        return True
 
 class StravaAPI:
-    """Classe pour interagir avec l'API Strava."""
+    """Classe pour interagir avec l'API Strava.
     
-    def __init__(self, token_file="strava_tokens.json"):
-        """Initialise l'API Strava avec le fichier de tokens."""
+    Toutes les requêtes passent par une session HTTP unique dont le pool de connexions
+    est dimensionné pour `max_workers` requêtes simultanées (les connexions TLS sont
+    réutilisées d'un appel à l'autre).
+    """
+    
+    # Nombre de nouvelles tentatives après une erreur temporaire, délai initial (secondes)
+    MAX_RETRIES = 5
+    RETRY_BACKOFF = 1.0
+    
+    def __init__(self, token_file="strava_tokens.json", base_url=None, max_workers=DEFAULT_MAX_WORKERS,
+                 rate_limiter=None, timeout=30, stream_cache=None):
+        """Initialise l'API Strava avec le fichier de tokens.
+        
+        Args:
+            token_file: Chemin du fichier de tokens (None : tokens gardés en mémoire seulement).
+            base_url: Optionnel, URL de base de l'API (variable STRAVA_API_URL ou API Strava par défaut).
+            max_workers: Nombre maximal de requêtes simultanées.
+            rate_limiter: Optionnel, RateLimiter partagé (quotas Strava par défaut).
+            timeout: Délai maximal d'une requête (secondes).
+            stream_cache: Optionnel, StreamCache local des streams (les streams en cache ne
+                sont plus redemandés et ne sont plus recopiés dans les lignes d'activité).
+        """
         self.client_id = os.environ.get("STRAVA_CLIENT_ID")
         self.client_secret = os.environ.get("STRAVA_CLIENT_SECRET")
         self.redirect_url = os.environ.get("STRAVA_REDIRECT_URL")
+        self.base_url = (base_url or os.environ.get("STRAVA_API_URL", STRAVA_API_URL)).rstrip("/")
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.timeout = timeout
+        self.stream_cache = stream_cache
         self.token_file = token_file
         self.tokens = self.load_tokens_from_file()
+        self._token_lock = threading.Lock()
+        
+        # Session partagée : une connexion par requête simultanée au maximum
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def _request(self, method, url, **kwargs):
+        """Envoie une requête en respectant les quotas.
+        
+        Une réponse 429 est renvoyée après la fin de la fenêtre épuisée ; les erreurs 5xx
+        et de connexion sont retentées avec un délai croissant (MAX_RETRIES fois).
+        
+        Returns:
+            La réponse (éventuellement en erreur après la dernière tentative).
+        """
+        attempt = 0
+        while True:
+            periods = self.rate_limiter.acquire()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.MAX_RETRIES:
+                    raise
+            else:
+                self.rate_limiter.update(response.headers, periods)
+                if response.status_code == 429:
+                    self.rate_limiter.exhausted(periods)
+                    continue
+                if response.status_code not in RETRY_STATUS or attempt >= self.MAX_RETRIES:
+                    return response
+            time.sleep(self.RETRY_BACKOFF * 2 ** attempt)
+            attempt += 1
     
     def save_tokens_to_file(self, tokens):
-        """Sauvegarde les tokens d'accès dans un fichier."""
-        with open(self.token_file, "w") as f:
-            json.dump(tokens, f)
+        """Sauvegarde les tokens d'accès dans un fichier (en mémoire seulement sans fichier)."""
+        if self.token_file:
+            with open(self.token_file, "w") as f:
+                json.dump(tokens, f)
         self.tokens = tokens
     
     def load_tokens_from_file(self):
         """Charge les tokens d'accès à partir d'un fichier."""
+        if not self.token_file:
+            return None
         try:
             with open(self.token_file, "r") as f:
                 return json.load(f)
@@ -40,7 +287,7 @@ class StravaAPI:
         if not refresh_token:
             return None
             
-        url = "https://www.strava.com/api/v3/oauth/token"
+        url = f"{self.base_url}/oauth/token"
         params = {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
@@ -48,7 +295,7 @@ class StravaAPI:
             "refresh_token": refresh_token
         }
         
-        response = requests.post(url, params=params)
+        response = self._request("POST", url, params=params)
         if response.status_code == 200:
             tokens = response.json()
             self.save_tokens_to_file(tokens)
@@ -57,18 +304,24 @@ class StravaAPI:
             print(f"Erreur lors du rafraîchissement du token : {response.text}")
             return None
     
-    def get_authorization_url(self):
-        """Génère l'URL d'autorisation pour l'API Strava."""
+    def get_authorization_url(self, state=None):
+        """Génère l'URL d'autorisation pour l'API Strava.
+        
+        Args:
+            state: Optionnel, valeur renvoyée telle quelle au retour d'autorisation
+                (protection contre les requêtes forgées).
+        """
         return (f"https://www.strava.com/oauth/authorize"
                 f"?client_id={self.client_id}"
                 f"&response_type=code"
                 f"&redirect_uri={self.redirect_url}"
                 f"&approval_prompt=force"
-                f"&scope=read_all,activity:read_all")
+                f"&scope=read_all,activity:read_all"
+                + (f"&state={state}" if state else ""))
     
     def exchange_code_for_token(self, code):
         """Échange un code d'autorisation contre un token d'accès."""
-        url = "https://www.strava.com/api/v3/oauth/token"
+        url = f"{self.base_url}/oauth/token"
         params = {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
@@ -76,7 +329,7 @@ class StravaAPI:
             "grant_type": "authorization_code"
         }
         
-        response = requests.post(url, params=params)
+        response = self._request("POST", url, params=params)
         if response.status_code == 200:
             tokens = response.json()
             self.save_tokens_to_file(tokens)
@@ -87,30 +340,41 @@ class StravaAPI:
     
     def get_access_token(self):
         """Récupère un token d'accès valide, le rafraîchit si nécessaire."""
-        if not self.tokens:
-            return None
+        # Verrou : un seul rafraîchissement lorsque plusieurs requêtes sont simultanées
+        with self._token_lock:
+            if not self.tokens:
+                return None
+                
+            if self.tokens.get("expires_at", 0) < datetime.now().timestamp():
+                self.tokens = self.refresh_access_token()
             
-        if self.tokens.get("expires_at", 0) < datetime.now().timestamp():
-            self.tokens = self.refresh_access_token()
-        
-        return self.tokens.get("access_token") if self.tokens else None
+            return self.tokens.get("access_token") if self.tokens else None
     
     def get_activity_streams(self, activity_id):
-        """Récupère les données détaillées (streams) d'une activité."""
+        """Récupère les données détaillées (streams) d'une activité (depuis le cache local
+        s'il contient l'activité)."""
+        if self.stream_cache is not None:
+            streams = self.stream_cache.get_streams(activity_id)
+            if streams is not None:
+                return streams
+        
         access_token = self.get_access_token()
         if not access_token:
             return None
             
-        url = f"https://www.strava.com/api/v3/activities/{activity_id}/streams"
+        url = f"{self.base_url}/activities/{activity_id}/streams"
         headers = {"Authorization": f"Bearer {access_token}"}
         params = {
-            "keys": "time,distance,velocity_smooth,heartrate,altitude,watts,cadence",
+            "keys": ",".join(STREAM_KEYS),
             "key_by_type": True
         }
         
-        response = requests.get(url, headers=headers, params=params)
+        response = self._request("GET", url, headers=headers, params=params)
         if response.status_code == 200:
-            return response.json()
+            streams = response.json()
+            if self.stream_cache is not None:
+                self.stream_cache.put(activity_id, streams)
+            return streams
         else:
             print(f"Erreur lors de la récupération des streams pour l'activité {activity_id}: {response.status_code}")
             return None
@@ -121,10 +385,10 @@ class StravaAPI:
         if not access_token:
             return {i: 0 for i in range(6)}
             
-        url = f"https://www.strava.com/api/v3/activities/{activity_id}/zones"
+        url = f"{self.base_url}/activities/{activity_id}/zones"
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        response = requests.get(url, headers=headers)
+        response = self._request("GET", url, headers=headers)
         if response.status_code == 200:
             zones = response.json()
             hr_zones = {i: 0 for i in range(6)}
@@ -137,20 +401,49 @@ class StravaAPI:
             print(f"Erreur lors de la récupération des zones HR pour l'activité {activity_id}")
             return {i: 0 for i in range(6)}
     
-    def get_all_activities(self, per_page=30, max_pages=None):
-        """Récupère toutes les activités de base sans détails."""
+    def get_athlete_hr_zones(self):
+        """Récupère les zones de fréquence cardiaque de l'athlète ([{min, max}, ...]).
+        
+        Permet de recalculer localement le temps par zone de chaque activité
+        (ActivityAnalyzer.calculate_hr_zones) au lieu d'appeler get_hr_zones.
+        """
+        access_token = self.get_access_token()
+        if not access_token:
+            return None
+            
+        url = f"{self.base_url}/athlete/zones"
+        headers = {"Authorization": f"Bearer {access_token}"}
+        
+        response = self._request("GET", url, headers=headers)
+        if response.status_code == 200:
+            return response.json().get("heart_rate", {}).get("zones", [])
+        else:
+            print(f"Erreur lors de la récupération des zones de l'athlète : {response.status_code}")
+            return None
+    
+    def get_all_activities(self, per_page=30, max_pages=None, after=None):
+        """Récupère toutes les activités de base sans détails.
+        
+        Args:
+            per_page: Nombre d'activités par page (200 au maximum).
+            max_pages: Optionnel, nombre maximal de pages.
+            after: Optionnel, timestamp (secondes UTC) : seules les activités commencées
+                après sont retournées.
+        """
         access_token = self.get_access_token()
         if not access_token:
             return []
             
-        url = "https://www.strava.com/api/v3/athlete/activities"
+        url = f"{self.base_url}/athlete/activities"
         headers = {"Authorization": f"Bearer {access_token}"}
         activities = []
         page = 1
         
         while True:
             params = {"page": page, "per_page": per_page}
-            response = requests.get(url, headers=headers, params=params)
+            if after is not None:
+                params["after"] = int(after)
+            response = self._request("GET", url, headers=headers, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -160,10 +453,145 @@ class StravaAPI:
                 activities.extend(data)
                 page += 1
                 
-                if max_pages and page > max_pages:
+                # Une page incomplète est la dernière : inutile de demander la suivante
+                if len(data) < per_page or (max_pages and page > max_pages):
                     break
             else:
                 print(f"Erreur lors de la récupération des activités (page {page}): {response.status_code}")
                 break
         
-        return activities
\ No newline at end of file
+        return activities
+    
+    def get_activity_details(self, activity_ids, include_zones=True, max_workers=None):
+        """Récupère les streams (et zones HR) de plusieurs activités en parallèle.
+        
+        Args:
+            activity_ids: Identifiants des activités.
+            include_zones: Récupérer aussi les zones HR de chaque activité (inutile si
+                elles sont recalculées localement, voir ActivityAnalyzer.calculate_hr_zones).
+            max_workers: Optionnel, nombre de requêtes simultanées (self.max_workers par défaut).
+        
+        Returns:
+            Dictionnaire {activity_id: {"streams": ..., "hr_zones": ...}}.
+        """
+        activity_ids = list(activity_ids)
+        # Rafraîchir le token une seule fois avant de lancer les requêtes
+        if not activity_ids or not self.get_access_token():
+            return {}
+        
+        def fetch(activity_id):
+            details = {"streams": self.get_activity_streams(activity_id)}
+            if include_zones:
+                details["hr_zones"] = self.get_hr_zones(activity_id)
+            return details
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers or self.max_workers, self.max_workers)) as executor:
+            return dict(zip(activity_ids, executor.map(fetch, activity_ids)))
+    
+    def sync_activities(self, ftp=None, max_pages=None, max_workers=None):
+        """Récupère les activités et leurs détails, prêtes à être enregistrées par DataManager.
+        
+        Args:
+            ftp: Optionnel, FTP de l'athlète pour l'analyse de puissance.
+            max_pages: Optionnel, nombre maximal de pages d'activités.
+            max_workers: Optionnel, nombre de requêtes simultanées.
+        """
+        activities = self.get_all_activities(max_pages=max_pages)
+        details = self.get_activity_details([a["id"] for a in activities], max_workers=max_workers)
+        return [
+            ActivityAnalyzer.build_activity_record(activity, ftp=ftp, embed_streams=self.stream_cache is None,
+                                                   **details.get(activity["id"], {}))
+            for activity in activities
+        ]
+    
+    def backfill(self, data_manager, queue_file, ftp=None, batch_size=50, max_attempts=3,
+                 checkpoint_file=None, progress=print):
+        """Synchronise l'historique de l'athlète sans surveillance.
+        
+        Les activités absentes de `data_manager` sont placées dans une file persistante,
+        puis traitées par lots : détails récupérés en parallèle au débit maximal permis
+        par les quotas, lignes ajoutées aux données, file enregistrée. Relancer la
+        méthode après une interruption reprend la file existante.
+        
+        Avec `checkpoint_file`, la synchronisation est incrémentale : seules les activités
+        commencées après le point de reprise (date de début de la plus récente activité
+        déjà synchronisée) sont listées, par pages de 200, et le point de reprise est
+        avancé une fois la file vidée.
+        
+        Args:
+            data_manager: DataManager recevant les activités.
+            queue_file: Chemin du fichier de la file de travail.
+            ftp: Optionnel, FTP de l'athlète pour l'analyse de puissance.
+            batch_size: Nombre d'activités par lot.
+            max_attempts: Nombre de lots où une activité sans streams est retentée avant
+                d'être enregistrée sans ses détails.
+            checkpoint_file: Optionnel, fichier JSON du point de reprise.
+            progress: Fonction appelée avec un message d'avancement (None pour aucun).
+        
+        Returns:
+            Nombre d'activités ajoutées.
+        """
+        if not self.get_access_token():
+            return 0
+        
+        queue = SyncQueue(queue_file)
+        if not len(queue):
+            after = self.sync_checkpoint(data_manager, checkpoint_file) if checkpoint_file else None
+            activities = self.get_all_activities(per_page=200, after=after)
+            known = set(data_manager.load_activities(columns=["activity_id"])["activity_id"].dropna())
+            queue.extend(activity for activity in activities if activity["id"] not in known)
+            if activities:
+                queue.checkpoint = max(self.activity_timestamp(activity) for activity in activities)
+            queue.save()
+        
+        added = 0
+        total = len(queue)
+        while len(queue):
+            batch = queue.pending[:batch_size]
+            details = self.get_activity_details([activity["id"] for activity in batch])
+            records = []
+            for activity in batch:
+                activity_details = details.get(activity["id"], {})
+                if activity_details.get("streams") is None and queue.retry(activity, max_attempts):
+                    continue
+                records.append(ActivityAnalyzer.build_activity_record(
+                    activity, ftp=ftp, embed_streams=self.stream_cache is None, **activity_details))
+            
+            added += len(data_manager.append_activities(records))
+            queue.remove(record["activity_id"] for record in records)
+            queue.save()
+            if progress:
+                progress(f"Synchronisation : {total - len(queue)}/{total} activités traitées")
+        
+        # Toutes les activités listées sont enregistrées : le point de reprise peut avancer
+        if checkpoint_file and queue.checkpoint is not None:
+            previous = read_json(checkpoint_file, {}).get("after", 0)
+            write_json(checkpoint_file, {"after": max(previous, queue.checkpoint)})
+            queue.checkpoint = None
+            queue.save()
+        
+        return added
+    
+    @staticmethod
+    def activity_timestamp(activity):
+        """Retourne le début d'une activité Strava (timestamp en secondes UTC)."""
+        start = activity.get("start_date") or activity.get("start_date_local")
+        return int(datetime.fromisoformat(start.replace("Z", "+00:00")).timestamp())
+    
+    @staticmethod
+    def sync_checkpoint(data_manager, checkpoint_file):
+        """Retourne le point de reprise (timestamp UTC) de la synchronisation incrémentale.
+        
+        Sans fichier de point de reprise, il est déduit de la plus récente activité
+        enregistrée (date locale, avec un jour de marge pour le fuseau horaire ; les
+        activités déjà présentes sont de toute façon ignorées).
+        """
+        checkpoint = read_json(checkpoint_file, {})
+        if "after" in checkpoint:
+            return checkpoint["after"]
+        
+        dates = data_manager.load_activities(columns=["start_date_local"]).get("start_date_local")
+        if dates is None or dates.dropna().empty:
+            return None
+        # Timestamp pandas sans fuseau : interprété comme UTC
+        return int(dates.max().timestamp()) - 24 * 3600
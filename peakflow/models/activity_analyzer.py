@@ -1,8 +1,10 @@
 """Module d'analyse des activités sportives."""
 
-import json
 import datetime
 import numpy as np
+from peakflow.models.activity_streams import ActivityStreams
+from peakflow.models.power_analyzer import PowerAnalyzer
+from peakflow.models.zones import time_in_zones
 
 class ActivityAnalyzer:
     """Classe pour analyser les activités sportives."""
@@ -50,36 +52,74 @@ class ActivityAnalyzer:
         }
     
     @staticmethod
-    def process_streams_data(streams):
-        """Traite les données de streams pour une activité."""
-        if not streams:
-            return {}
+    def build_activity_record(activity, streams=None, hr_zones=None, ftp=None, embed_streams=True):
+        """Construit la ligne complète d'une activité (détails, zones HR et streams).
         
-        # Données de base
-        distance_data = streams.get("distance", {}).get("data", [])
-        time_data = streams.get("time", {}).get("data", [])
-        velocity_data = streams.get("velocity_smooth", {}).get("data", [])
+        Args:
+            activity: Activité Strava (résumé).
+            streams: Optionnel, streams de l'activité.
+            hr_zones: Optionnel, temps par zone HR {indice: secondes}.
+            ftp: Optionnel, FTP de l'athlète pour l'analyse de puissance.
+            embed_streams: Recopier les streams (JSON) dans la ligne ; à désactiver lorsqu'ils
+                sont conservés dans un StreamCache.
+        """
+        record = ActivityAnalyzer.extract_activity_details(activity)
+        hr_zones = hr_zones or {}
+        for i in range(6):
+            record[f"zone_{i}"] = hr_zones.get(i, 0)
+        
+        streams = streams or {}
+        record["segments"] = None
+        watts_data = streams.get("watts", {}).get("data", [])
+        record["power_analysis"] = (PowerAnalyzer.analyze_power_data(
+            watts_data, ftp, time_data=streams.get("time", {}).get("data")) if watts_data and ftp else None)
+        if not embed_streams:
+            record.update({"power_data": None, "pace_data": None, "elevation_data": None, "heartrate_data": None})
+            return record
         
-        # Convertir distances
-        distance_km = [d/1000 for d in distance_data] if distance_data else []
+        record["segments"] = ActivityAnalyzer.calculate_segment_stats(
+            streams.get("distance", {}).get("data", []),
+            streams.get("time", {}).get("data", []),
+            streams.get("velocity_smooth", {}).get("data", [])
+        ) or None
+        record["power_data"] = PowerAnalyzer.process_power_data(streams)
+        record.update(ActivityAnalyzer.process_streams_data(streams) or
+                      {"pace_data": None, "elevation_data": None, "heartrate_data": None})
+        return record
+    
+    @staticmethod
+    def calculate_hr_zones(streams, hr_zones):
+        """Calcule localement le temps passé dans chaque zone cardiaque d'une activité.
         
-        # Convertir vitesses
-        velocity_kmh = [round(v * 3.6, 2) if v is not None else None for v in velocity_data] if velocity_data else []
+        Args:
+            streams: Streams de l'activité (clés heartrate et time).
+            hr_zones: Zones {indice: (min, max)}, voir peakflow.models.zones.heart_rate_zones.
         
-        return {
-            "pace_data": json.dumps({
-                "time": time_data,
-                "distance": distance_km,
-                "velocity": velocity_kmh
-            }) if time_data and distance_km and velocity_kmh else None,
-            
-            "elevation_data": json.dumps({
-                "distance": distance_km,
-                "altitude": streams.get("altitude", {}).get("data", [])
-            }) if distance_km and streams.get("altitude", {}).get("data", []) else None,
-            
-            "heartrate_data": json.dumps({
-                "time": time_data,
-                "heartrate": streams.get("heartrate", {}).get("data", [])
-            }) if time_data and streams.get("heartrate", {}).get("data", []) else None
-        }
\ No newline at end of file
+        Returns:
+            Dictionnaire {indice: secondes} pour les indices 0 à 5, au même format que
+            StravaAPI.get_hr_zones.
+        """
+        result = {i: 0 for i in range(6)}
+        heartrate_data = streams.get("heartrate", {}).get("data", []) if streams else []
+        if not heartrate_data:
+            return result
+        
+        time_data = streams.get("time", {}).get("data", [])
+        result.update(time_in_zones(heartrate_data, hr_zones, time_data=time_data))
+        return result
+    
+    @staticmethod
+    def process_streams_data(streams):
+        """Traite les données de streams pour une activité.
+        
+        Args:
+            streams: Streams Strava ({clé: {"data": [...]}}) ou ActivityStreams.
+        
+        Returns:
+            Colonnes pace_data, elevation_data et heartrate_data (JSON).
+        """
+        if not streams:
+            return {}
+        if not isinstance(streams, ActivityStreams):
+            streams = ActivityStreams.from_strava(streams)
+        return streams.to_columns()
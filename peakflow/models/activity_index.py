@@ -0,0 +1,365 @@
+"""Module d'index SQLite des activités (requêtes par période, par type, dernières activités,
+agrégats quotidiens et hebdomadaires)."""
+
+import os
+import json
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from peakflow.models.columnar_store import FLOAT_COLUMNS, ZONE_COLUMNS, parse_dates
+
+# Version du schéma de la base (PRAGMA user_version) : une base d'une autre version est recréée
+SCHEMA_VERSION = 3
+
+# Colonnes indexées (celles du tableau de bord et des agrégats)
+INDEX_COLUMNS = ["activity_id", "start_date_local", "type", "distance", "moving_time",
+                 "total_elevation_gain", "suffer_score", "average_speed"] + [f"zone_{z}" for z in range(6)]
+
+# Types SQLite des colonnes indexées
+SQL_TYPES = {"activity_id": "INTEGER", "start_date_local": "TEXT", "type": "TEXT", "distance": "REAL",
+             "moving_time": "TEXT", "total_elevation_gain": "REAL", "suffer_score": "REAL",
+             "average_speed": "REAL", **{f"zone_{z}": "INTEGER" for z in range(6)}}
+
+# Mesures des agrégats et leur calcul sur les activités d'une période (moving_seconds : durée
+# de mouvement en secondes ; speed_total et speed_count : moyenne des vitesses non nulles)
+ROLLUP_MEASURES = {
+    "activities": "COUNT(*)",
+    "distance": "TOTAL(distance)",
+    "moving_time": "TOTAL(moving_seconds)",
+    "elevation": "TOTAL(total_elevation_gain)",
+    "suffer_score": "TOTAL(suffer_score)",
+    "speed_total": "TOTAL(CASE WHEN average_speed > 0 THEN average_speed END)",
+    "speed_count": "COUNT(CASE WHEN average_speed > 0 THEN 1 END)",
+    **{f"zone_{z}": f"TOTAL(zone_{z})" for z in range(6)},
+}
+
+# Tables d'agrégats par granularité, et calcul de la période (jour, lundi de la semaine ISO)
+DAY = "substr(start_date_local, 1, 10)"
+ROLLUP_TABLES = {
+    "day": ("rollup_daily", DAY),
+    "week": ("rollup_weekly", f"date({DAY}, '-' || ((CAST(strftime('%w', {DAY}) AS INTEGER) + 6) % 7) || ' days')"),
+}
+
+# Format des dates stockées (ISO 8601 : l'ordre alphabétique est l'ordre chronologique) ;
+# les dates avec fuseau sont stockées en UTC, suffixées par Z
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def date_param(value, granularity=None):
+    """Convertit une date de filtre en chaîne comparable aux dates stockées, ou au début de
+    sa période (jour, lundi de la semaine) pour les agrégats de la granularité donnée."""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    if granularity is None:
+        return timestamp.strftime(DATE_FORMAT)
+    timestamp = timestamp.normalize()
+    if granularity == "week":
+        timestamp -= pd.Timedelta(days=timestamp.weekday())
+    return timestamp.strftime("%Y-%m-%d")
+
+
+class ActivityIndex:
+    """Classe d'index SQLite des activités d'un fichier de données.
+
+    La base (mode WAL) contient une ligne par activité, dans l'ordre du fichier
+    (colonne position), avec des index sur start_date_local, type et activity_id :
+    les filtres par période, les totaux par type et les dernières activités sont
+    des requêtes indexées. Les lecteurs voient toujours une version complète de
+    l'index (transactions SQLite) sans bloquer les écritures.
+
+    Des tables d'agrégats (totaux par type, par jour et type, par semaine ISO et type)
+    sont mises à jour dans la même transaction que les insertions : les vues sur de
+    longues périodes lisent quelques lignes par jour ou par semaine, quel que soit le
+    nombre d'activités.
+
+    L'index enregistre la version du fichier de données qu'il reflète (voir
+    DataManager.get_version) ; il est reconstruit lorsqu'elle change, sauf après un
+    ajout, où seules les nouvelles lignes sont insérées.
+    """
+
+    def __init__(self, db_path):
+        """Initialise l'index stocké dans `db_path` (créé au premier accès)."""
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self):
+        """Retourne la connexion du thread courant (une connexion par thread)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._create_schema(connection)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _create_schema(connection):
+        """(Re)crée les tables ; l'index est vide et sera reconstruit au prochain accès."""
+        columns = ", ".join(f"{column} {SQL_TYPES[column]}" for column in INDEX_COLUMNS)
+        measures = ", ".join(f"{measure} REAL" for measure in ROLLUP_MEASURES)
+        statements = [
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)",
+            f"CREATE TABLE activities (position INTEGER PRIMARY KEY, {columns}, moving_seconds REAL)",
+            "CREATE INDEX activities_date ON activities (start_date_local)",
+            "CREATE INDEX activities_type ON activities (type, distance)",
+            "CREATE INDEX activities_id ON activities (activity_id)",
+            "CREATE TABLE type_totals (type TEXT PRIMARY KEY, distance REAL, activities INTEGER, "
+            "first_position INTEGER)",
+        ] + [f"CREATE TABLE {table} (period TEXT NOT NULL, type TEXT NOT NULL, {measures}, "
+             "PRIMARY KEY (period, type)) WITHOUT ROWID" for table, _ in ROLLUP_TABLES.values()]
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Une autre connexion a pu créer le schéma entre-temps
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                for (table,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                    connection.execute(f"DROP TABLE {table}")
+                for statement in statements:
+                    connection.execute(statement)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def version(self):
+        """Retourne la version des données reflétée par l'index (None s'il est vide)."""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return tuple(json.loads(row[0])) if row else None
+
+    @staticmethod
+    def _frame(rows, columns):
+        """Construit un DataFrame typé (types de DataManager.load_activities) à partir de lignes SQLite."""
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        for column in columns:
+            if column == "start_date_local":
+                df[column] = parse_dates(df[column])
+            elif column == "activity_id":
+                df[column] = df[column].astype("Int64")
+            elif column in ZONE_COLUMNS:
+                df[column] = df[column].fillna(0).astype("int64")
+            elif column in FLOAT_COLUMNS:
+                df[column] = df[column].astype("float64")
+            else:
+                df[column] = df[column].astype("object")
+        return df
+
+    @staticmethod
+    def _rows(activities, start_position):
+        """Convertit un DataFrame typé en lignes SQLite (colonnes INDEX_COLUMNS puis moving_seconds)."""
+        df = pd.DataFrame({column: activities[column] if column in activities else None
+                           for column in INDEX_COLUMNS}, index=activities.index)
+        # Durées de mouvement "H:MM:SS" en secondes, pour les agrégats
+        df["moving_seconds"] = pd.to_timedelta(df["moving_time"], errors="coerce").dt.total_seconds()
+        dates = pd.to_datetime(df["start_date_local"])
+        if dates.dt.tz is not None:
+            df["start_date_local"] = dates.dt.tz_convert("UTC").dt.strftime(DATE_FORMAT + "Z")
+        else:
+            df["start_date_local"] = dates.dt.strftime(DATE_FORMAT)
+        df = df.astype(object).where(df.notna(), None)
+        for position, values in enumerate(df.itertuples(index=False, name=None), start=start_position):
+            yield (position,) + tuple(value.item() if hasattr(value, "item") else value for value in values)
+
+    def _insert(self, connection, activities, start_position):
+        """Insère des activités à partir de `start_position` et met à jour les agrégats
+        (totaux par type, par jour et par semaine) avec les nouvelles lignes."""
+        placeholders = ", ".join("?" * (len(INDEX_COLUMNS) + 2))
+        connection.executemany(
+            f"INSERT INTO activities (position, {', '.join(INDEX_COLUMNS)}, moving_seconds) "
+            f"VALUES ({placeholders})", self._rows(activities, start_position))
+        connection.execute("""
+            INSERT INTO type_totals (type, distance, activities, first_position)
+            SELECT COALESCE(type, 'Unknown'), TOTAL(distance), COUNT(*), MIN(position) FROM activities
+            WHERE position >= ? GROUP BY COALESCE(type, 'Unknown') ORDER BY MIN(position)
+            ON CONFLICT (type) DO UPDATE SET distance = distance + excluded.distance,
+                                             activities = activities + excluded.activities
+        """, (start_position,))
+        measures = ", ".join(ROLLUP_MEASURES)
+        computed = ", ".join(ROLLUP_MEASURES.values())
+        updates = ", ".join(f"{measure} = {measure} + excluded.{measure}" for measure in ROLLUP_MEASURES)
+        for table, period in ROLLUP_TABLES.values():
+            connection.execute(f"""
+                INSERT INTO {table} (period, type, {measures})
+                SELECT {period}, COALESCE(type, 'Unknown'), {computed} FROM activities
+                WHERE position >= ? AND start_date_local IS NOT NULL GROUP BY 1, 2
+                ON CONFLICT (period, type) DO UPDATE SET {updates}
+            """, (start_position,))
+
+    def _set_version(self, connection, version):
+        connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                           (json.dumps(list(version)),))
+
+    def rebuild(self, activities, version):
+        """Remplace le contenu de l'index par les activités (DataFrame typé) de la version donnée."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if self.version() != version:
+                connection.execute("DELETE FROM activities")
+                for table in ["type_totals"] + [table for table, _ in ROLLUP_TABLES.values()]:
+                    connection.execute(f"DELETE FROM {table}")
+                self._insert(connection, activities, 0)
+                self._set_version(connection, version)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def append(self, activities, previous, version):
+        """Ajoute des activités à l'index s'il reflète la version `previous` des données.
+
+        Returns:
+            True si l'index est à jour pour `version`, False s'il devra être reconstruit.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            current = self.version() == tuple(previous)
+            if current:
+                last = connection.execute("SELECT MAX(position) FROM activities").fetchone()[0]
+                self._insert(connection, activities, 0 if last is None else last + 1)
+                self._set_version(connection, version)
+            connection.execute("COMMIT")
+            return current
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _where(start=None, end=None, activity_type=None, dated=None):
+        """Construit la clause WHERE (et ses paramètres) d'un filtre par période et par type.
+
+        `dated` limite aux activités avec date (True) ou sans date (False)."""
+        clauses, params = [], []
+        if dated is not None:
+            clauses.append("start_date_local IS NOT NULL" if dated else "start_date_local IS NULL")
+        if start is not None:
+            clauses.append("start_date_local >= ?")
+            params.append(date_param(start))
+        if end is not None:
+            clauses.append("start_date_local < ?")
+            params.append(date_param(end))
+        if activity_type is not None:
+            clauses.append("type = ?")
+            params.append(activity_type)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, columns=None, start=None, end=None, activity_type=None, newest_first=False, limit=None):
+        """Retourne les activités d'une période, triées par date (sans date en dernier).
+
+        Args:
+            columns: Optionnel, colonnes parmi INDEX_COLUMNS (toutes par défaut).
+            start: Optionnel, première date incluse.
+            end: Optionnel, date de fin exclue.
+            activity_type: Optionnel, type d'activité.
+            newest_first: Trier de la plus récente à la plus ancienne.
+            limit: Optionnel, nombre maximal d'activités.
+
+        Returns:
+            DataFrame typé (mêmes types que DataManager.load_activities).
+        """
+        columns = [c for c in (columns or INDEX_COLUMNS) if c in INDEX_COLUMNS]
+        select = f"SELECT {', '.join(columns)} FROM activities"
+        limit = -1 if limit is None else int(limit)
+
+        # Parcours de l'index des dates dans l'ordre demandé, arrêté à `limit` lignes
+        where, params = self._where(start, end, activity_type, dated=True)
+        order = "DESC" if newest_first else "ASC"
+        rows = self._connection().execute(
+            f"{select}{where} ORDER BY start_date_local {order}, position LIMIT ?", params + [limit]).fetchall()
+
+        # Activités sans date, en dernier (hors de toute période)
+        if start is None and end is None and (limit < 0 or len(rows) < limit):
+            where, params = self._where(activity_type=activity_type, dated=False)
+            rows += self._connection().execute(
+                f"{select}{where} ORDER BY position LIMIT ?",
+                params + [limit - len(rows) if limit >= 0 else -1]).fetchall()
+        return self._frame(rows, columns)
+
+    def count(self, start=None, end=None, activity_type=None):
+        """Retourne le nombre d'activités d'une période."""
+        if start is None and end is None:
+            where, params = (" WHERE type = ?", [activity_type]) if activity_type is not None else ("", [])
+            return self._connection().execute(
+                f"SELECT COALESCE(SUM(activities), 0) FROM type_totals{where}", params).fetchone()[0]
+        where, params = self._where(start, end, activity_type)
+        return self._connection().execute(f"SELECT COUNT(*) FROM activities{where}", params).fetchone()[0]
+
+    def totals_by_type(self, start=None, end=None):
+        """Retourne la distance totale par type d'activité ({type: km}, "Unknown" pour aucun type).
+
+        Sans période, les totaux tenus à jour à chaque insertion sont lus directement.
+        """
+        if start is None and end is None:
+            return dict(self._connection().execute(
+                "SELECT type, distance FROM type_totals ORDER BY first_position").fetchall())
+        where, params = self._where(start, end)
+        rows = self._connection().execute(
+            f"SELECT type, TOTAL(distance), MIN(position) FROM activities{where} GROUP BY type", params).fetchall()
+        # Types dans l'ordre de leur première activité
+        totals = {}
+        for activity_type, distance, _ in sorted(rows, key=lambda row: row[2]):
+            activity_type = "Unknown" if activity_type is None else activity_type
+            totals[activity_type] = totals.get(activity_type, 0.0) + distance
+        return totals
+
+    def rollups(self, granularity="day", start=None, end=None, activity_type=None, by_type=True):
+        """Retourne les agrégats quotidiens ou hebdomadaires (semaines ISO) d'une période.
+
+        Seules les tables d'agrégats sont lues : le coût dépend du nombre de jours ou de
+        semaines de la période, pas du nombre d'activités. Les activités sans date n'y
+        figurent pas.
+
+        Args:
+            granularity: "day" ou "week" (périodes désignées par le lundi de la semaine).
+            start: Optionnel, date dont la période (jour ou semaine) est la première incluse.
+            end: Optionnel, date dont la période est la première exclue.
+            activity_type: Optionnel, type d'activité.
+            by_type: Une ligne par période et par type (True) ou par période, tous types confondus.
+
+        Returns:
+            DataFrame trié par période : colonnes period (datetime), type (si `by_type`),
+            ROLLUP_MEASURES (moving_time en secondes, suffer_score : somme des suffer_score) et
+            speed (vitesse moyenne des activités de vitesse non nulle).
+        """
+        if granularity not in ROLLUP_TABLES:
+            raise ValueError(f"Granularité inconnue : {granularity}")
+        table, _ = ROLLUP_TABLES[granularity]
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("period >= ?")
+            params.append(date_param(start, granularity))
+        if end is not None:
+            clauses.append("period < ?")
+            params.append(date_param(end, granularity))
+        if activity_type is not None:
+            clauses.append("type = ?")
+            params.append(activity_type)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        if by_type:
+            columns = ["period", "type"] + list(ROLLUP_MEASURES)
+            query = f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY period, type"
+        else:
+            columns = ["period"] + list(ROLLUP_MEASURES)
+            totals = ", ".join(f"SUM({measure})" for measure in ROLLUP_MEASURES)
+            query = f"SELECT period, {totals} FROM {table}{where} GROUP BY period ORDER BY period"
+        rows = self._connection().execute(query, params).fetchall()
+        # Mesures converties en un seul bloc numérique
+        measures = list(ROLLUP_MEASURES)
+        labels = columns[:len(columns) - len(measures)]
+        values = np.array([row[len(labels):] for row in rows], dtype="float64").reshape(len(rows), len(measures))
+        df = pd.DataFrame(values, columns=measures)
+        for position, label in enumerate(labels):
+            df.insert(position, label, np.array([row[position] for row in rows], dtype=object))
+        df["period"] = pd.to_datetime(df["period"], format="%Y-%m-%d")
+        df["activities"] = df["activities"].astype("int64")
+        speed_total = values[:, measures.index("speed_total")]
+        speed_count = values[:, measures.index("speed_count")]
+        df["speed"] = np.divide(speed_total, speed_count, out=np.zeros_like(speed_total), where=speed_count > 0)
+        return df
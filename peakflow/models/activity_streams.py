@@ -0,0 +1,108 @@
+"""Module de représentation des streams d'une activité sous forme de tableaux NumPy."""
+
+import json
+import numpy as np
+
+
+def as_array(data):
+    """Convertit un stream (liste pouvant contenir None, ou tableau) en tableau NumPy.
+
+    Les valeurs manquantes sont décrites par un masque (MaskedArray) ; le type des
+    valeurs présentes (entier ou flottant) est conservé.
+    """
+    if isinstance(data, np.ndarray):
+        return data
+    if any(value is None for value in data):
+        mask = np.fromiter((value is None for value in data), dtype=bool, count=len(data))
+        values = np.asarray([0 if value is None else value for value in data])
+        return np.ma.MaskedArray(values, mask=mask)
+    return np.asarray(data)
+
+
+def round_exact(values, decimals):
+    """Arrondit un tableau comme round() de Python (arrondi décimal exact).
+
+    np.round multiplie par 10**decimals, ce qui peut changer le résultat lorsque la
+    valeur est presque à mi-chemin ; ces rares valeurs sont arrondies avec round().
+    """
+    rounded = np.round(values, decimals)
+    scaled = np.ma.getdata(values) * 10 ** decimals
+    ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ambiguous.any():
+        data = np.ma.getdata(rounded)
+        data[ambiguous] = [round(float(value), decimals) for value in np.ma.getdata(values)[ambiguous]]
+    return rounded
+
+
+def to_json(array):
+    """Sérialise un tableau en liste JSON (valeurs masquées en null)."""
+    return json.dumps(array.tolist())
+
+
+class ActivityStreams:
+    """Classe regroupant les streams d'une activité sous forme de tableaux NumPy.
+
+    Les axes (temps, distance en km) sont calculés une seule fois et partagés par
+    toutes les séries ; la conversion en JSON n'a lieu qu'à la sortie (to_columns),
+    une fois par axe et par activité.
+    """
+
+    def __init__(self, arrays):
+        """Initialise à partir d'un dictionnaire {clé Strava: tableau}."""
+        self.arrays = {key: array for key, array in arrays.items() if array is not None and len(array)}
+        self._derived = {}
+
+    @classmethod
+    def from_strava(cls, streams):
+        """Construit les streams à partir de la réponse Strava ({clé: {"data": [...]}})."""
+        return cls({key: as_array(stream.get("data") or [])
+                    for key, stream in (streams or {}).items() if isinstance(stream, dict)})
+
+    def get(self, key):
+        """Retourne le tableau d'un stream, ou None s'il est absent."""
+        return self.arrays.get(key)
+
+    def _cached(self, name, compute):
+        if name not in self._derived:
+            self._derived[name] = compute()
+        return self._derived[name]
+
+    @property
+    def time(self):
+        """Axe du temps (secondes)."""
+        return self.get("time")
+
+    @property
+    def distance_km(self):
+        """Axe de la distance (km)."""
+        distance = self.get("distance")
+        return None if distance is None else self._cached("distance_km", lambda: distance / 1000)
+
+    @property
+    def velocity_kmh(self):
+        """Vitesse lissée (km/h, arrondie au centième)."""
+        velocity = self.get("velocity_smooth")
+        return None if velocity is None else self._cached(
+            "velocity_kmh", lambda: round_exact(velocity * 3.6, 2))
+
+    def to_columns(self):
+        """Sérialise les streams dans les colonnes pace_data, elevation_data et heartrate_data.
+
+        Chaque axe partagé n'est converti en JSON qu'une fois.
+        """
+        time, distance = self.time, self.distance_km
+        velocity, altitude, heartrate = self.velocity_kmh, self.get("altitude"), self.get("heartrate")
+        time_json = to_json(time) if time is not None else None
+        distance_json = to_json(distance) if distance is not None else None
+
+        return {
+            "pace_data": (f'{{"time": {time_json}, "distance": {distance_json}, '
+                          f'"velocity": {to_json(velocity)}}}')
+            if time_json and distance_json and velocity is not None else None,
+
+            "elevation_data": f'{{"distance": {distance_json}, "altitude": {to_json(altitude)}}}'
+            if distance_json and altitude is not None else None,
+
+            "heartrate_data": f'{{"time": {time_json}, "heartrate": {to_json(heartrate)}}}'
+            if time_json and heartrate is not None else None
+        }
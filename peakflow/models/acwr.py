@@ -0,0 +1,123 @@
+"""Module de calcul vectorisé des charges aiguë et chronique (ACWR)."""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+# Nombre maximal de fenêtres matérialisées à la fois (borne la mémoire à chunk * window flottants)
+WINDOW_CHUNK = 65536
+
+
+def rolling_load(effort, window):
+    """Calcule la charge glissante : somme des `window` derniers jours divisée par `window`.
+
+    Les premières fenêtres sont partielles (somme des jours disponibles, toujours divisée
+    par `window`). Le résultat est identique au bit près à
+    `df.iloc[max(0, i-window+1):i+1]["relative_effort"].sum()/window`, car chaque fenêtre
+    est sommée sur un bloc contigu, avec le même ordre de sommation que pandas.
+
+    Args:
+        effort: Tableau 1-D des efforts quotidiens.
+        window: Taille de la fenêtre en jours.
+
+    Returns:
+        np.ndarray de même longueur que `effort`.
+    """
+    effort = np.ascontiguousarray(effort, dtype=np.float64)
+    n = len(effort)
+    sums = np.empty(n, dtype=np.float64)
+
+    # Fenêtres partielles du début
+    head = min(window - 1, n)
+    for i in range(head):
+        sums[i] = effort[:i + 1].sum()
+
+    # Fenêtres complètes, matérialisées par blocs contigus
+    if n >= window:
+        windows = sliding_window_view(effort, window)
+        for start in range(0, len(windows), WINDOW_CHUNK):
+            block = np.ascontiguousarray(windows[start:start + WINDOW_CHUNK])
+            sums[window - 1 + start:window - 1 + start + len(block)] = block.sum(axis=1)
+
+    return sums / window
+
+
+def ewma_load(effort, window, initial=0):
+    """Calcule la charge par moyenne mobile exponentielle (lambda = 2 / (window + 1)).
+
+    EWMA_t = lambda * effort_t + (1 - lambda) * EWMA_{t-1}, avec EWMA_{-1} = `initial`
+    (0 par défaut, ou la dernière valeur connue pour poursuivre une série).
+    """
+    effort = np.asarray(effort, dtype=np.float64)
+    lam = 2 / (window + 1)
+    return lfilter([lam], [1, -(1 - lam)], effort, zi=[(1 - lam) * initial])[0]
+
+
+def acwr_ratio(acute, chronic):
+    """Calcule le ratio charge aiguë / charge chronique (0 quand la charge chronique est nulle)."""
+    acute = np.asarray(acute, dtype=np.float64)
+    chronic = np.asarray(chronic, dtype=np.float64)
+    ratio = np.zeros_like(acute)
+    np.divide(acute, chronic, out=ratio, where=chronic != 0)
+    ratio[np.isnan(ratio)] = 0
+    return ratio
+
+
+def compute_acwr(effort, acute_window=7, chronic_window=28, mode="rolling"):
+    """Calcule les charges aiguë et chronique et leur ratio.
+
+    Args:
+        effort: Tableau 1-D des efforts quotidiens (un jour par élément, sans trou).
+        acute_window: Fenêtre de la charge aiguë en jours.
+        chronic_window: Fenêtre de la charge chronique en jours.
+        mode: "rolling" (moyennes glissantes, comportement historique) ou "ewma".
+
+    Returns:
+        Tuple (charge_aigue, charge_chronique, ratio) de tableaux NumPy.
+    """
+    if mode == "rolling":
+        load = rolling_load
+    elif mode == "ewma":
+        load = ewma_load
+    else:
+        raise ValueError(f"Mode ACWR inconnu : {mode}")
+
+    acute = load(effort, acute_window)
+    chronic = load(effort, chronic_window)
+    return acute, chronic, acwr_ratio(acute, chronic)
+
+
+def update_acwr(effort, acute, chronic, start, acute_window=7, chronic_window=28, mode="rolling"):
+    """Recalcule les charges et le ratio à partir de l'indice `start` seulement.
+
+    Les valeurs avant `start` sont reprises de `acute` et `chronic` (calculées sur la
+    même série d'effort) ; le résultat est identique à un recalcul complet.
+
+    Args:
+        effort: Série d'effort complète (déjà mise à jour).
+        acute: Charges aiguës valides jusqu'à `start - 1` (au moins `start` valeurs).
+        chronic: Charges chroniques valides jusqu'à `start - 1`.
+        start: Premier jour modifié.
+
+    Returns:
+        Tuple (charge_aigue, charge_chronique, ratio) de la longueur de `effort`.
+    """
+    effort = np.asarray(effort, dtype=np.float64)
+    new_acute = np.empty(len(effort), dtype=np.float64)
+    new_chronic = np.empty(len(effort), dtype=np.float64)
+    new_acute[:start] = acute[:start]
+    new_chronic[:start] = chronic[:start]
+
+    for values, previous, window in ((new_acute, acute, acute_window), (new_chronic, chronic, chronic_window)):
+        if mode == "rolling":
+            # Seules les fenêtres touchant un jour modifié changent ; on repart de
+            # `window - 1` jours avant pour que ces fenêtres soient complètes
+            offset = max(0, start - (window - 1))
+            values[start:] = rolling_load(effort[offset:], window)[start - offset:]
+        elif mode == "ewma":
+            initial = previous[start - 1] if start > 0 else 0
+            values[start:] = ewma_load(effort[start:], window, initial=initial)
+        else:
+            raise ValueError(f"Mode ACWR inconnu : {mode}")
+
+    return new_acute, new_chronic, acwr_ratio(new_acute, new_chronic)
@@ -0,0 +1,63 @@
+"""Module de gestion des données de plusieurs athlètes (une partition par athlète)."""
+
+import os
+import re
+import threading
+from peakflow.models.data_manager import DataManager
+
+# Identifiants d'athlète acceptés (utilisés comme nom de dossier)
+ATHLETE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class AthleteRegistry:
+    """Classe donnant accès au gestionnaire de données de chaque athlète.
+
+    Chaque athlète dispose de son propre dossier (CSV, stockage en colonnes, verrou) ;
+    les entrées du cache partagé sont étiquetées par fichier et restent donc séparées.
+    """
+
+    def __init__(self, base_dir="data/athletes", cache=None):
+        """Initialise le registre.
+
+        Args:
+            base_dir: Dossier contenant un sous-dossier par athlète.
+            cache: Optionnel, cache LRU partagé par les gestionnaires (DATASET_CACHE par défaut).
+        """
+        self.base_dir = base_dir
+        self.cache = cache
+        self._managers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_valid_id(athlete_id):
+        """Vérifie qu'un identifiant d'athlète est utilisable comme nom de dossier."""
+        return bool(athlete_id) and ATHLETE_ID_PATTERN.match(str(athlete_id)) is not None
+
+    def csv_file(self, athlete_id):
+        """Retourne le chemin du fichier CSV des activités d'un athlète."""
+        return os.path.join(self.base_dir, str(athlete_id), "activities_with_details.csv")
+
+    def token_file(self, athlete_id):
+        """Retourne le chemin du fichier des tokens Strava d'un athlète."""
+        return os.path.join(self.base_dir, str(athlete_id), "strava_tokens.json")
+
+    def get(self, athlete_id):
+        """Retourne le gestionnaire de données d'un athlète (créé au premier accès).
+
+        Raises:
+            ValueError: Si l'identifiant n'est pas valide.
+        """
+        athlete_id = str(athlete_id)
+        if not self.is_valid_id(athlete_id):
+            raise ValueError(f"Identifiant d'athlète invalide : {athlete_id}")
+        with self._lock:
+            if athlete_id not in self._managers:
+                self._managers[athlete_id] = DataManager(csv_file=self.csv_file(athlete_id), cache=self.cache)
+            return self._managers[athlete_id]
+
+    def athlete_ids(self):
+        """Liste les athlètes disposant de données enregistrées."""
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(name for name in os.listdir(self.base_dir)
+                      if self.is_valid_id(name) and os.path.exists(self.csv_file(name)))
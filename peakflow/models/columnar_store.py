@@ -0,0 +1,428 @@
+"""Module de stockage en colonnes (Parquet) des activités."""
+
+import os
+import json
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from peakflow.utils.files import atomic_write, sync_file
+
+# Colonnes contenant des données détaillées (JSON), stockées à part dans la table des streams
+STREAM_COLUMNS = ["segments", "power_analysis", "power_data",
+                  "pace_data", "elevation_data", "heartrate_data"]
+
+# Types des colonnes de la table principale
+DATE_COLUMNS = ["start_date_local"]
+FLOAT_COLUMNS = ["distance", "total_elevation_gain", "calories", "average_speed", "max_speed",
+                 "average_heartrate", "max_heartrate", "suffer_score",
+                 "weighted_average_watts", "max_watts", "kilojoules"]
+INT_COLUMNS = ["activity_id"]
+ZONE_COLUMNS = [f"zone_{zone}" for zone in range(6)]
+BOOL_COLUMNS = ["device_watts"]
+
+# Métadonnée Parquet donnant la génération d'un fichier : les deltas ne sont lus qu'avec
+# le fichier principal de même génération (une réécriture complète change de génération)
+GENERATION_KEY = b"peakflow.generation"
+
+# Nombre de tentatives de lecture lorsqu'une écriture concurrente remplace les fichiers
+READ_RETRIES = 5
+
+
+def parse_dates(values):
+    """Convertit des dates (chaînes ISO 8601 ou dates pandas) en dates naïves.
+
+    Les dates avec fuseau (suffixe Z des exports Strava, décalage explicite) sont
+    ramenées en UTC puis privées de leur fuseau ; les dates sans fuseau sont conservées
+    telles quelles. Un mélange des deux formats donne ainsi une seule colonne datetime.
+    """
+    return pd.to_datetime(values, errors='coerce', format='ISO8601', utc=True).dt.tz_localize(None)
+
+
+def to_typed_frame(activities):
+    """Convertit des activités (liste de dictionnaires ou DataFrame de chaînes) en DataFrame typé.
+
+    Les colonnes de streams sont conservées sous forme de chaînes JSON.
+    """
+    df = pd.DataFrame(activities).copy()
+
+    for column in DATE_COLUMNS:
+        if column in df:
+            df[column] = parse_dates(df[column])
+    for column in FLOAT_COLUMNS:
+        if column in df:
+            # Les valeurs non numériques ("N/A", "") deviennent NaN
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+    for column in INT_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+    for column in ZONE_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype('int64')
+    for column in BOOL_COLUMNS:
+        if column in df:
+            df[column] = df[column].map(lambda v: str(v).strip().lower() == "true").astype('bool')
+    for column in STREAM_COLUMNS:
+        if column in df:
+            df[column] = df[column].map(_serialize_stream)
+
+    # Les colonnes restantes (nom, type, durées...) sont des chaînes
+    typed = set(DATE_COLUMNS + FLOAT_COLUMNS + INT_COLUMNS + ZONE_COLUMNS + BOOL_COLUMNS + STREAM_COLUMNS)
+    for column in df.columns:
+        if column not in typed:
+            df[column] = df[column].map(lambda v: None if v is None else str(v)).astype('object')
+
+    return df
+
+
+def _serialize_stream(value):
+    """Retourne la chaîne JSON d'une valeur de stream (None si vide)."""
+    if value is None or (isinstance(value, float) and pd.isna(value)) or value == "":
+        return None
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def new_generation():
+    """Retourne un nouvel identifiant de génération."""
+    return uuid.uuid4().hex
+
+
+def with_generation(schema, generation):
+    """Retourne le schéma Arrow complété de la génération (None pour aucune)."""
+    metadata = dict(schema.metadata or {})
+    metadata.pop(GENERATION_KEY, None)
+    if generation is not None:
+        metadata[GENERATION_KEY] = generation.encode()
+    return schema.with_metadata(metadata)
+
+
+def schema_generation(schema):
+    """Retourne la génération d'un schéma Parquet (None pour un fichier sans génération)."""
+    value = (schema.metadata or {}).get(GENERATION_KEY)
+    return value.decode() if value else None
+
+
+def write_parquet(df, path, generation=None):
+    """Écrit un DataFrame dans un fichier Parquet de façon atomique."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata(with_generation(table.schema, generation).metadata)
+    with atomic_write(path, "wb") as f:
+        pq.write_table(table, f)
+
+
+def arrow_schema(df):
+    """Retourne le schéma Arrow d'un DataFrame typé ; les colonnes texte entièrement vides
+    sont typées en chaînes (et non en nul) pour accepter les blocs suivants."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, pa.field(field.name, pa.string()))
+    return schema
+
+
+class StoreWriter:
+    """Classe pour écrire des activités bloc par bloc dans un ColumnarStore.
+
+    Chaque bloc devient un groupe de lignes Parquet : la mémoire utilisée est celle
+    d'un bloc. Les fichiers sont écrits à côté des fichiers définitifs et renommés par
+    commit() (remplacement du contenu, ou nouveau fichier delta en mode ajout).
+    """
+
+    def __init__(self, store, append=False):
+        """Initialise l'écriture dans `store`, en remplacement ou en ajout."""
+        self.store = store
+        self.append = append and store.exists()
+        tables = (store.activities_path, store.streams_path)
+        if self.append:
+            self.number = store._next_delta()
+            self.targets = {table: f"{table[:-len('.parquet')]}.delta-{self.number}.parquet" for table in tables}
+            self.generations = {table: store.generation(table) for table in tables}
+        else:
+            self.targets = {table: table for table in tables}
+            generation = new_generation()
+            self.generations = {table: generation for table in tables}
+        self.writers = {}
+
+    def write(self, activities):
+        """Écrit un bloc d'activités.
+
+        Returns:
+            DataFrame typé du bloc, sans les colonnes de streams.
+        """
+        df = to_typed_frame(activities)
+        stream_columns = [c for c in STREAM_COLUMNS if c in df]
+        if stream_columns and "activity_id" in df:
+            self._write(self.store.streams_path, df[["activity_id"] + stream_columns])
+        main = df.drop(columns=stream_columns)
+        self._write(self.store.activities_path, main)
+        return main
+
+    def _write(self, table, df):
+        """Ajoute un groupe de lignes au fichier temporaire d'une table."""
+        writer = self.writers.get(table)
+        if writer is None:
+            directory = os.path.dirname(table)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            writer = pq.ParquetWriter(f"{self.targets[table]}.tmp",
+                                      with_generation(arrow_schema(df), self.generations[table]))
+            self.writers[table] = writer
+        writer.write_table(pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False))
+
+    def commit(self):
+        """Termine l'écriture et met les fichiers en place."""
+        if self.store.activities_path not in self.writers:
+            self.abort()
+            return
+        for table, writer in self.writers.items():
+            writer.close()
+            sync_file(f"{self.targets[table]}.tmp")
+        if not self.append and self.store.streams_path not in self.writers:
+            self.store._remove(self.store.streams_path)
+        # Table des streams d'abord : la table principale (qui date le stockage) en dernier
+        for table in (self.store.streams_path, self.store.activities_path):
+            if table in self.writers:
+                os.replace(f"{self.targets[table]}.tmp", self.targets[table])
+        self.writers = {}
+        if not self.append:
+            # Les anciens deltas (autre génération) ne sont déjà plus lus
+            self.store._remove_deltas()
+        if self.append and self.number >= self.store.MAX_DELTAS:
+            self.store.compact()
+
+    def abort(self):
+        """Abandonne l'écriture et supprime les fichiers temporaires."""
+        for table, writer in self.writers.items():
+            writer.close()
+            os.remove(f"{self.targets[table]}.tmp")
+        self.writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+class ColumnarStore:
+    """Classe pour stocker les activités dans des fichiers Parquet.
+
+    La table principale contient les colonnes typées des activités ; la table des
+    streams contient les colonnes JSON volumineuses, indexées par activity_id, et
+    n'est lue que lorsqu'elle est demandée. Les ajouts sont écrits dans des fichiers
+    delta séparés, fusionnés lors de la prochaine réécriture complète (ou compaction).
+
+    Chaque fichier est écrit à part puis renommé, et porte la génération de sa table :
+    un lecteur ne voit jamais un fichier partiel ni le mélange de deux versions, sans
+    attendre les écritures en cours.
+    """
+
+    # Nombre de fichiers delta au-delà duquel le stockage est compacté
+    MAX_DELTAS = 16
+
+    def __init__(self, base_path):
+        """Initialise le stockage à partir d'un chemin de base (sans extension)."""
+        self.base_path = base_path
+        self.activities_path = f"{base_path}.parquet"
+        self.streams_path = f"{base_path}_streams.parquet"
+
+    def _deltas(self, main_path):
+        """Retourne les fichiers delta d'une table, dans l'ordre d'écriture."""
+        directory = os.path.dirname(main_path) or "."
+        prefix = os.path.basename(main_path)[:-len(".parquet")] + ".delta-"
+        if not os.path.isdir(directory):
+            return []
+        numbers = sorted(int(name[len(prefix):-len(".parquet")]) for name in os.listdir(directory)
+                         if name.startswith(prefix) and name.endswith(".parquet"))
+        return [os.path.join(directory, f"{prefix}{n}.parquet") for n in numbers]
+
+    def _remove(self, path):
+        """Supprime un fichier s'il existe."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _remove_deltas(self):
+        """Supprime les fichiers delta des deux tables."""
+        for delta in self._deltas(self.activities_path) + self._deltas(self.streams_path):
+            self._remove(delta)
+
+    def generation(self, main_path):
+        """Retourne la génération du fichier principal d'une table (None s'il n'existe pas)."""
+        try:
+            return schema_generation(pq.read_schema(main_path))
+        except FileNotFoundError:
+            return None
+
+    def state(self):
+        """Retourne un identifiant du contenu de la table principale (génération et deltas),
+        qui change à chaque écriture, ajout ou compactage."""
+        return self.generation(self.activities_path), tuple(self._deltas(self.activities_path))
+
+    def _next_delta(self):
+        """Retourne le numéro du prochain fichier delta."""
+        deltas = self._deltas(self.activities_path)
+        return int(deltas[-1].rsplit(".delta-", 1)[1][:-len(".parquet")]) + 1 if deltas else 1
+
+    def _parts(self, main_path):
+        """Retourne les fichiers d'une table (principal puis deltas) existants."""
+        parts = [main_path] if os.path.exists(main_path) else []
+        return parts + self._deltas(main_path)
+
+    def exists(self):
+        """Indique si la table principale existe."""
+        return os.path.exists(self.activities_path)
+
+    def is_older_than(self, path):
+        """Indique si le stockage est absent ou plus ancien que le fichier donné."""
+        if not self.exists():
+            return True
+        if not os.path.exists(path):
+            return False
+        mtimes = []
+        for part in self._parts(self.activities_path):
+            try:
+                mtimes.append(os.stat(part).st_mtime_ns)
+            except FileNotFoundError:
+                # Delta supprimé par une réécriture concurrente
+                continue
+        return not mtimes or max(mtimes) < os.stat(path).st_mtime_ns
+
+    def write(self, activities):
+        """Écrit les activités (liste de dictionnaires ou DataFrame) dans le stockage, en
+        remplaçant son contenu."""
+        df = to_typed_frame(activities)
+        generation = new_generation()
+
+        stream_columns = [c for c in STREAM_COLUMNS if c in df]
+        if stream_columns and "activity_id" in df:
+            write_parquet(df[["activity_id"] + stream_columns], self.streams_path, generation)
+        else:
+            self._remove(self.streams_path)
+
+        write_parquet(df.drop(columns=stream_columns), self.activities_path, generation)
+        self._remove_deltas()
+        return df
+
+    def append(self, activities):
+        """Ajoute des activités au stockage sans réécrire les données existantes."""
+        if not self.exists():
+            return self.write(activities)
+
+        df = to_typed_frame(activities)
+        number = self._next_delta()
+
+        stream_columns = [c for c in STREAM_COLUMNS if c in df]
+        if stream_columns and "activity_id" in df:
+            write_parquet(df[["activity_id"] + stream_columns],
+                          f"{self.streams_path[:-len('.parquet')]}.delta-{number}.parquet",
+                          self.generation(self.streams_path))
+        write_parquet(df.drop(columns=stream_columns),
+                      f"{self.activities_path[:-len('.parquet')]}.delta-{number}.parquet",
+                      self.generation(self.activities_path))
+
+        if number >= self.MAX_DELTAS:
+            self.compact()
+        return df
+
+    def writer(self, append=False):
+        """Retourne un StoreWriter pour écrire des activités par blocs (à utiliser avec `with`)."""
+        return StoreWriter(self, append=append)
+
+    def compact(self):
+        """Fusionne les fichiers delta dans les tables principales."""
+        for main_path in (self.activities_path, self.streams_path):
+            deltas = self._deltas(main_path)
+            if deltas:
+                write_parquet(self._read_parts(main_path), main_path, new_generation())
+                for delta in deltas:
+                    self._remove(delta)
+
+    def _read_parts(self, main_path, columns=None, filters=None):
+        """Lit et concatène les fichiers d'une table en ne chargeant que les colonnes demandées.
+
+        Si une écriture concurrente supprime un fichier pendant la lecture, la lecture
+        est reprise sur la nouvelle version.
+        """
+        for attempt in range(READ_RETRIES):
+            try:
+                return self._read_snapshot(main_path, columns=columns, filters=filters)
+            except FileNotFoundError:
+                if attempt == READ_RETRIES - 1:
+                    raise
+
+    def _read_snapshot(self, main_path, columns=None, filters=None):
+        """Lit le fichier principal d'une table et ses deltas de même génération."""
+        frames = []
+        generation = None
+        if os.path.exists(main_path):
+            with open(main_path, "rb") as f:
+                generation, frame = self._read_file(f, columns, filters)
+            frames.append(frame)
+        for delta in self._deltas(main_path):
+            with open(delta, "rb") as f:
+                delta_generation, frame = self._read_file(f, columns, filters)
+            # Delta d'une autre version de la table (en cours de remplacement)
+            if delta_generation == generation:
+                frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _read_file(f, columns=None, filters=None):
+        """Lit un fichier Parquet ouvert ; retourne (génération, DataFrame)."""
+        schema = pq.read_schema(f)
+        part_columns = columns
+        if columns is not None:
+            part_columns = [c for c in columns if c in schema.names]
+        f.seek(0)
+        df = pd.read_parquet(f, columns=part_columns, filters=filters)
+        # Fichiers écrits avant la normalisation des fuseaux (dates UTC avec fuseau)
+        for column in DATE_COLUMNS:
+            if column in df and isinstance(df[column].dtype, pd.DatetimeTZDtype):
+                df[column] = parse_dates(df[column])
+        return schema_generation(schema), df
+
+    def read(self, columns=None):
+        """Lit la table principale, en ne chargeant que les colonnes demandées."""
+        if not self.exists():
+            return pd.DataFrame(columns=columns or [])
+        return self._read_parts(self.activities_path, columns=columns)
+
+    def columns(self):
+        """Retourne la liste des colonnes de la table principale."""
+        names = []
+        for part in self._parts(self.activities_path):
+            names += [name for name in pq.read_schema(part).names if name not in names]
+        return names
+
+    def read_streams(self, activity_ids=None, columns=None):
+        """Lit les streams (JSON décodé) pour les activités et colonnes demandées.
+
+        Returns:
+            Dictionnaire {activity_id: {colonne: données}}.
+        """
+        columns = [c for c in (columns or STREAM_COLUMNS) if c in STREAM_COLUMNS]
+        filters = [("activity_id", "in", list(activity_ids))] if activity_ids is not None else None
+        df = self._read_parts(self.streams_path, columns=["activity_id"] + columns, filters=filters)
+
+        streams = {}
+        for row in df.to_dict("records"):
+            values = {}
+            for column in columns:
+                raw = row.get(column)
+                try:
+                    values[column] = json.loads(raw) if isinstance(raw, str) and raw else None
+                except json.JSONDecodeError:
+                    values[column] = None
+            streams[int(row["activity_id"])] = values
+        return streams
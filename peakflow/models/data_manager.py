@@ -3,39 +3,526 @@
 import os
 import csv
 import json
+import math
 import sys
+import shutil
+from contextlib import contextmanager
 from datetime import datetime
+import pandas as pd
 from peakflow.models.activity_analyzer import ActivityAnalyzer
 from peakflow.models.power_analyzer import PowerAnalyzer
+from peakflow.models.effort import get_weight_scheme
+from peakflow.models.columnar_store import ColumnarStore, STREAM_COLUMNS, INT_COLUMNS, ZONE_COLUMNS, to_typed_frame
+from peakflow.models.activity_index import ActivityIndex, INDEX_COLUMNS, ROLLUP_MEASURES
+from peakflow.utils.cache import LRUCache
+from peakflow.utils.locks import FileLock, locked
+from peakflow.utils.files import atomic_write, sync_file
 
 # Augmenter la limite de taille des champs CSV
 csv.field_size_limit(sys.maxsize)
 
+# Cache mémoire partagé par tous les gestionnaires (plusieurs fichiers de données) ;
+# PEAKFLOW_CACHE_ATHLETE_MB borne la part d'un même fichier (d'un même athlète)
+DATASET_CACHE = LRUCache(
+    max_bytes=int(os.environ.get("PEAKFLOW_CACHE_MB", 256)) * 1024 * 1024,
+    max_tag_bytes=int(os.environ["PEAKFLOW_CACHE_ATHLETE_MB"]) * 1024 * 1024
+    if os.environ.get("PEAKFLOW_CACHE_ATHLETE_MB") else None)
+
+# Nombre de lignes lues à la fois lors d'un import CSV
+IMPORT_CHUNK_ROWS = 100
+
+# Colonnes obligatoires d'un fichier importé
+REQUIRED_COLUMNS = ["activity_id", "start_date_local"]
+
+# Paramètres du modèle de charge enregistrables pour un athlète (voir TrainingLoadEngine)
+SETTINGS_KEYS = ["tau_fitness", "tau_fatigue", "weight_scheme"]
+
+
+def csv_value(column, value):
+    """Retourne une valeur sous sa forme texte dans le CSV (entiers sans décimale pour
+    les colonnes entières, JSON pour les streams)."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if column in INT_COLUMNS or column in ZONE_COLUMNS:
+        number = pd.to_numeric(value, errors="coerce")
+        if pd.notna(number) and float(number).is_integer():
+            return str(int(number))
+    return str(value)
+
+
+def normalize_setting(key, value):
+    """Valide un paramètre du modèle de charge et le retourne sous sa forme enregistrée.
+    
+    Raises:
+        ValueError: Si le paramètre est inconnu ou sa valeur invalide.
+    """
+    if key not in SETTINGS_KEYS:
+        raise ValueError(f"Paramètre inconnu : {key}")
+    if key == "weight_scheme":
+        if isinstance(value, str):
+            get_weight_scheme(value)
+            return value
+        if not isinstance(value, dict) or not value:
+            raise ValueError("weight_scheme doit être un nom de schéma ou un dictionnaire {zone: coefficient}")
+        try:
+            scheme = {int(zone): float(coef) for zone, coef in value.items()}
+        except (TypeError, ValueError):
+            raise ValueError("weight_scheme : zones entières et coefficients numériques attendus")
+        if not all(0 <= zone <= 5 and math.isfinite(coef) and coef >= 0 for zone, coef in scheme.items()):
+            raise ValueError("weight_scheme : zones de 0 à 5 et coefficients finis positifs attendus")
+        return scheme
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} doit être un nombre")
+    if not (math.isfinite(value) and value > 0):
+        raise ValueError(f"{key} doit être un nombre fini strictement positif")
+    return value
+
+
 class DataManager:
     """Classe pour gérer les données des activités."""
     
-    def __init__(self, csv_file="data/activities_with_details.csv"):
-        """Initialise le gestionnaire de données."""
+    def __init__(self, csv_file="data/activities_with_details.csv", cache=None):
+        """Initialise le gestionnaire de données.
+        
+        Args:
+            csv_file: Chemin du fichier CSV des activités.
+            cache: Optionnel, cache LRU à utiliser (cache partagé DATASET_CACHE par défaut).
+        """
         self.csv_file = csv_file
+        self.cache = cache if cache is not None else DATASET_CACHE
+        # Stockage en colonnes (Parquet) utilisé pour les lectures de l'application
+        self.store = ColumnarStore(os.path.splitext(csv_file)[0])
+        # Index SQLite des activités (requêtes par période, par type, dernières activités)
+        self.index = ActivityIndex(f"{os.path.splitext(csv_file)[0]}.sqlite")
+        # Paramètres du modèle de charge de l'athlète (constantes de temps, pondération des zones)
+        self.settings_file = f"{os.path.splitext(csv_file)[0]}.settings.json"
+        # Verrou des écritures (entre threads et entre processus)
+        self.lock = FileLock(f"{csv_file}.lock")
+
+    def get_version(self):
+        """Retourne un identifiant de version du fichier CSV (mtime, taille), ou None s'il n'existe pas."""
+        try:
+            stat = os.stat(self.csv_file)
+        except FileNotFoundError:
+            return None
+        return (self.csv_file, stat.st_mtime_ns, stat.st_size)
+
+    def load_settings(self):
+        """Retourne les paramètres du modèle de charge enregistrés pour ces données
+        (sous-ensemble de SETTINGS_KEYS, vide si aucun n'est enregistré).
+        
+        Les valeurs invalides (fichier modifié à la main) sont ignorées : les paramètres
+        par défaut s'appliquent à leur place.
+        """
+        try:
+            with open(self.settings_file, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        settings = {}
+        for key in SETTINGS_KEYS:
+            if isinstance(stored, dict) and key in stored:
+                try:
+                    # Les clés JSON sont des chaînes : normalize_setting revient aux numéros de zone
+                    settings[key] = normalize_setting(key, stored[key])
+                except ValueError:
+                    continue
+        return settings
+    
+    @locked
+    def save_settings(self, **settings):
+        """Enregistre des paramètres du modèle de charge (les autres sont conservés).
+        
+        Args:
+            tau_fitness: Optionnel, constante de temps de la fitness (jours, > 0).
+            tau_fatigue: Optionnel, constante de temps de la fatigue (jours, > 0).
+            weight_scheme: Optionnel, nom d'un schéma de pondération ou dictionnaire
+                           {zone: coefficient} (voir peakflow.models.effort).
+        
+        Raises:
+            ValueError: Si un paramètre est inconnu ou invalide.
+        """
+        settings = {key: normalize_setting(key, value) for key, value in settings.items()}
+        
+        current = self.load_settings()
+        current.update(settings)
+        with atomic_write(self.settings_file, mode="w", encoding="utf-8") as f:
+            json.dump(current, f)
     
+    @locked
     def save_to_csv(self, activities_data):
-        """Sauvegarde les données dans un fichier CSV."""
+        """Sauvegarde les données dans un fichier CSV.
+        
+        Le fichier est écrit à part puis renommé : une lecture concurrente voit l'ancien
+        ou le nouveau fichier complet, et une interruption laisse l'ancien intact.
+        """
         if not activities_data:
             return
             
         # Déterminer les en-têtes à partir des clés de la première activité
         fieldnames = list(activities_data[0].keys())
         
-        # Assurer que le répertoire existe
-        os.makedirs(os.path.dirname(self.csv_file), exist_ok=True)
-        
-        with open(self.csv_file, mode="w", newline="", encoding="utf-8") as csvfile:
+        with atomic_write(self.csv_file, mode="w", newline="", encoding="utf-8") as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
-            writer.writerows(activities_data)
+            for activity in activities_data:
+                # Les champs JSON décodés sont réécrits en JSON
+                writer.writerow({key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                                 for key, value in activity.items()})
+        
+        # Mettre à jour le stockage en colonnes et invalider les données en cache
+        self.store.write(activities_data)
+        self.cache.invalidate(self.csv_file)
         
         return True
     
+    def append_from_csv(self, csv_file):
+        """Ajoute les activités d'un fichier CSV aux données existantes.
+        
+        Args:
+            csv_file: Chemin vers le fichier CSV à importer.
+        
+        Returns:
+            DataFrame typé des activités ajoutées.
+        """
+        return self.import_csv(csv_file, append=True)
+    
+    @locked
+    def import_csv(self, csv_file, append=False, chunksize=IMPORT_CHUNK_ROWS):
+        """Importe un fichier CSV par blocs, avec une mémoire bornée quelle que soit sa taille.
+        
+        Chaque bloc est validé (activity_id numérique et unique), converti en colonnes
+        typées et écrit aussitôt : colonnes de streams dans la table des streams, autres
+        colonnes dans la table principale, lignes brutes dans un CSV temporaire. Le CSV
+        et le stockage en colonnes ne sont mis en place qu'une fois le fichier entier lu.
+        
+        Args:
+            csv_file: Chemin vers le fichier CSV à importer.
+            append: Ajouter aux données existantes (activités déjà présentes ignorées)
+                au lieu de les remplacer.
+            chunksize: Nombre de lignes par bloc.
+        
+        Returns:
+            DataFrame typé des activités importées (sans les colonnes de streams).
+        
+        Raises:
+            ValueError: Si une colonne obligatoire manque.
+        """
+        append = append and os.path.exists(self.csv_file)
+        seen = set()
+        fieldnames = None
+        previous_key = None
+        if append:
+            seen.update(self.load_activities(columns=["activity_id"])["activity_id"].dropna().astype(int))
+            previous_key = ("activities",) + self.get_version()
+            with open(self.csv_file, mode="r", newline="", encoding="utf-8") as csvfile:
+                fieldnames = next(csv.reader(csvfile))
+        
+        os.makedirs(os.path.dirname(self.csv_file) or ".", exist_ok=True)
+        tmp_file = f"{self.csv_file}.tmp"
+        imported = []
+        try:
+            with self.store.writer(append=append) as writer:
+                with open(tmp_file, mode="w", newline="", encoding="utf-8") as out:
+                    for chunk in pd.read_csv(csv_file, dtype=str, keep_default_na=False, chunksize=chunksize):
+                        missing = [column for column in REQUIRED_COLUMNS if column not in chunk]
+                        if missing:
+                            raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+                        
+                        ids = pd.to_numeric(chunk["activity_id"], errors="coerce")
+                        valid = ids.notna() & ~ids.isin(seen) & ~ids.duplicated()
+                        chunk = chunk[valid]
+                        if chunk.empty:
+                            continue
+                        seen.update(ids[valid].astype(int))
+                        
+                        header = fieldnames is None
+                        fieldnames = fieldnames or list(chunk.columns)
+                        chunk.reindex(columns=fieldnames, fill_value="").to_csv(out, header=header, index=False)
+                        imported.append(writer.write(chunk))
+                
+                if not imported:
+                    writer.abort()
+                    return to_typed_frame(pd.DataFrame(columns=REQUIRED_COLUMNS))
+                
+                # Le CSV est mis en place avant le stockage (qui doit rester plus récent que lui)
+                if append:
+                    with open(tmp_file, mode="rb") as src, self._appending() as dst:
+                        shutil.copyfileobj(src, dst)
+                else:
+                    sync_file(tmp_file)
+                    os.replace(tmp_file, self.csv_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+        
+        typed = pd.concat(imported, ignore_index=True)
+        if previous_key:
+            self.index.append(typed, previous=previous_key[1:], version=self.get_version())
+        previous = self.cache.get(previous_key) if previous_key else None
+        self.cache.invalidate(self.csv_file)
+        if previous is not None:
+            # Prolonger le jeu de données en cache pour la nouvelle version du fichier
+            self.cache.put(("activities",) + self.get_version(),
+                           pd.concat([previous, typed], ignore_index=True), tag=self.csv_file)
+        return typed
+    
+    @locked
+    def append_activities(self, activities):
+        """Ajoute des activités (liste de dictionnaires ou DataFrame) aux données existantes.
+        
+        Les activités sont dédoublonnées sur activity_id ; seules les nouvelles lignes
+        sont écrites (ajoutées à la fin du CSV et dans un fichier delta du stockage en
+        colonnes) et le jeu de données en cache est prolongé sans relecture complète.
+        
+        Returns:
+            DataFrame typé des activités ajoutées.
+        """
+        new_activities = pd.DataFrame(activities)
+        if new_activities.empty or "activity_id" not in new_activities:
+            return to_typed_frame(new_activities)
+        if not os.path.exists(self.csv_file):
+            self.save_to_csv(new_activities.to_dict("records"))
+            return self.load_activities()
+        
+        existing = self.load_activities(columns=["activity_id"])
+        previous_key = ("activities",) + self.get_version()
+        
+        ids = pd.to_numeric(new_activities["activity_id"], errors="coerce")
+        new_activities = new_activities[ids.notna() & ~ids.isin(existing["activity_id"].dropna())
+                                        & ~ids.duplicated()]
+        if new_activities.empty:
+            return to_typed_frame(new_activities)
+        
+        # Ajouter les lignes au CSV en conservant ses en-têtes
+        with open(self.csv_file, mode="r", newline="", encoding="utf-8") as csvfile:
+            fieldnames = next(csv.reader(csvfile))
+        with self._appending(text=True) as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, restval="", extrasaction="ignore")
+            writer.writerows({key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                              for key, value in activity.items()}
+                             for activity in new_activities.to_dict("records"))
+        
+        typed = self.store.append(new_activities)
+        self.index.append(typed, previous=previous_key[1:], version=self.get_version())
+        
+        # Prolonger le jeu de données en cache pour la nouvelle version du fichier
+        previous = self.cache.get(previous_key)
+        self.cache.invalidate(self.csv_file)
+        if previous is not None:
+            columns = [c for c in typed.columns if c not in STREAM_COLUMNS]
+            self.cache.put(("activities",) + self.get_version(),
+                           pd.concat([previous, typed[columns]], ignore_index=True), tag=self.csv_file)
+        return typed
+    
+    @contextmanager
+    def _appending(self, text=False):
+        """Ouvre le CSV en ajout ; en cas d'erreur, il est ramené à sa taille initiale
+        pour ne pas garder de ligne partielle. Les données sont écrites sur disque (fsync)."""
+        size = os.path.getsize(self.csv_file)
+        mode, kwargs = ("a", {"newline": "", "encoding": "utf-8"}) if text else ("ab", {})
+        try:
+            with open(self.csv_file, mode=mode, **kwargs) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            os.truncate(self.csv_file, size)
+            raise
+    
+    @locked
+    def update_activities(self, updates):
+        """Met à jour des colonnes de certaines activités.
+        
+        Le CSV est réécrit dans un fichier temporaire puis renommé : une lecture
+        concurrente ou une interruption ne voit jamais un fichier à moitié écrit.
+        
+        Args:
+            updates: Dictionnaire {activity_id: {colonne: nouvelle valeur}}.
+        
+        Returns:
+            Nombre d'activités mises à jour.
+        """
+        if not updates or not os.path.exists(self.csv_file):
+            return 0
+        
+        df = pd.read_csv(self.csv_file, dtype=str, keep_default_na=False)
+        ids = pd.to_numeric(df["activity_id"], errors="coerce")
+        # dtype object : les colonnes partiellement mises à jour ne passent pas en float64
+        changes = pd.DataFrame.from_dict(updates, orient="index", dtype=object)
+        for column in changes.columns:
+            values = ids.map(changes[column].dropna())
+            present = values.notna()
+            if column not in df:
+                df[column] = ""
+            df.loc[present, column] = values[present].map(lambda value: csv_value(column, value))
+        
+        with atomic_write(self.csv_file, mode="w", newline="", encoding="utf-8") as f:
+            df.to_csv(f, index=False)
+        
+        self.store.write(df)
+        self.cache.invalidate(self.csv_file)
+        return int(ids.isin(changes.index).sum())
+    
+    def load_activities(self, columns=None):
+        """Charge les activités depuis le stockage en colonnes sous forme de DataFrame typé.
+        
+        Le stockage est reconstruit à partir du CSV s'il est absent ou plus ancien.
+        Les colonnes JSON volumineuses (streams) ne sont jamais chargées ici,
+        voir load_streams.
+        
+        Args:
+            columns: Optionnel, liste des colonnes à charger (toutes par défaut).
+        """
+        # Version du fichier et état du stockage relevés avant le contrôle de fraîcheur : une
+        # écriture concurrente qui les modifie pendant la lecture est détectée ensuite
+        version = self.get_version()
+        state = self.store.state()
+        if self.store.is_older_than(self.csv_file):
+            if version is None:
+                return pd.DataFrame(columns=columns or [])
+            if not self.lock.acquire(blocking=False):
+                # Écriture en cours : lire la dernière version complète du stockage sans attendre
+                # (sans la mettre en cache, elle ne correspond pas à la version du CSV)
+                df = self.store.read(columns=columns)
+                return df if columns is None else df[[c for c in columns if c in df.columns]]
+            try:
+                # Un autre thread ou processus a pu reconstruire le stockage entre-temps
+                if self.store.is_older_than(self.csv_file):
+                    self.store.write(pd.read_csv(self.csv_file, dtype=str, keep_default_na=False))
+                    self.cache.invalidate(self.csv_file)
+                version = self.get_version()
+                state = self.store.state()
+            finally:
+                self.lock.release()
+        
+        if version is None:
+            return pd.DataFrame(columns=columns or [])
+        # Le jeu de données complet est gardé en mémoire pour la version courante du fichier,
+        # seulement s'il correspond à cette version (ni le fichier ni le stockage n'ont changé
+        # pendant la lecture)
+        key = ("activities",) + version
+        df = self.cache.get(key)
+        if df is None:
+            df = self.store.read()
+            if self.is_snapshot(version, state):
+                self.cache.put(key, df, tag=self.csv_file)
+        if columns is None:
+            return df.copy()
+        return df[[c for c in columns if c in df.columns]]
+    
+    def is_snapshot(self, version, state):
+        """Indique si le fichier a toujours la version `version`, le stockage l'état `state`
+        (voir ColumnarStore.state), et si ce stockage est à jour pour ce fichier."""
+        return (self.get_version() == version and self.store.state() == state
+                and not self.store.is_older_than(self.csv_file))
+    
+    def activity_index(self):
+        """Retourne l'index SQLite des activités, reconstruit s'il ne reflète pas la version
+        courante du fichier (ou None s'il n'y a pas de données)."""
+        version = self.get_version()
+        if version is None:
+            return None
+        if self.index.version() != version:
+            # Mettre le stockage à jour si nécessaire, puis le relire sans cache : l'index
+            # partagé n'est reconstruit qu'à partir d'un état du stockage vérifié pour `version`
+            self.load_activities(columns=["activity_id"])
+            state = self.store.state()
+            if self.is_snapshot(version, state):
+                activities = self.store.read(columns=INDEX_COLUMNS)
+                if self.is_snapshot(version, state):
+                    self.index.rebuild(activities, version)
+        return self.index
+    
+    def query_activities(self, columns=None, start=None, end=None, activity_type=None,
+                         newest_first=False, limit=None):
+        """Retourne les activités d'une période par une requête indexée (voir ActivityIndex.query).
+        
+        Le coût dépend du nombre d'activités retournées, pas de la taille de l'historique ;
+        le résultat est mis en cache pour la version courante du fichier et ne doit pas
+        être modifié. Sans aucun filtre, les activités sont prises dans le jeu de données
+        en mémoire (load_activities), déjà chargé en entier.
+        """
+        columns = list(columns or INDEX_COLUMNS)
+        if start is None and end is None and activity_type is None and limit is None:
+            # Tout l'historique : tri du jeu de données déjà en mémoire (sans date en dernier)
+            df = self.load_activities(columns=columns)
+            if "start_date_local" in df:
+                df = df.sort_values("start_date_local", ascending=not newest_first, kind="stable",
+                                    na_position="last")
+            return df.reset_index(drop=True)
+        
+        index = self.activity_index()
+        if index is None:
+            return pd.DataFrame(columns=columns)
+        key = ("query", tuple(columns), start, end, activity_type, newest_first, limit)
+        return self.get_derived(key, lambda: index.query(columns=columns, start=start, end=end,
+                                                          activity_type=activity_type,
+                                                          newest_first=newest_first, limit=limit))
+    
+    def count_activities(self, start=None, end=None, activity_type=None):
+        """Retourne le nombre d'activités d'une période."""
+        index = self.activity_index()
+        return index.count(start=start, end=end, activity_type=activity_type) if index else 0
+    
+    def distance_by_type(self, start=None, end=None):
+        """Retourne la distance totale par type d'activité sur une période ({type: km})."""
+        index = self.activity_index()
+        if index is None:
+            return {}
+        return self.get_derived(("distance_by_type", start, end),
+                                lambda: index.totals_by_type(start=start, end=end))
+    
+    def activity_rollups(self, granularity="day", start=None, end=None, activity_type=None, by_type=True):
+        """Retourne les agrégats quotidiens ou hebdomadaires d'une période (voir ActivityIndex.rollups).
+        
+        Les agrégats sont mis à jour à chaque ajout d'activités ; le résultat est mis en cache
+        pour la version courante du fichier et ne doit pas être modifié.
+        """
+        index = self.activity_index()
+        if index is None:
+            columns = ["period"] + (["type"] if by_type else []) + list(ROLLUP_MEASURES) + ["speed"]
+            return pd.DataFrame(columns=columns)
+        key = ("rollups", granularity, start, end, activity_type, by_type)
+        return self.get_derived(key, lambda: index.rollups(granularity=granularity, start=start, end=end,
+                                                            activity_type=activity_type, by_type=by_type))
+    
+    def get_derived(self, key, builder):
+        """Retourne une donnée dérivée (ex: séries quotidiennes) mise en cache pour la version
+        courante du fichier, en la calculant avec `builder()` si nécessaire.
+        
+        Args:
+            key: Clé identifiant la donnée dérivée et ses paramètres.
+            builder: Fonction sans argument calculant la donnée.
+        """
+        version = self.get_version()
+        if version is None:
+            return builder()
+        return self.cache.get_or_compute(("derived", key) + version, builder, tag=self.csv_file)
+    
+    def put_derived(self, key, value):
+        """Enregistre une donnée dérivée pour la version courante du fichier (ex: séries
+        mises à jour incrémentalement après un ajout)."""
+        version = self.get_version()
+        if version is not None:
+            self.cache.put(("derived", key) + version, value, tag=self.csv_file)
+    
+    def load_streams(self, activity_ids=None, columns=None):
+        """Charge les données détaillées (JSON décodé) de certaines activités.
+        
+        Args:
+            activity_ids: Optionnel, identifiants des activités à charger (toutes par défaut).
+            columns: Optionnel, colonnes parmi STREAM_COLUMNS (toutes par défaut).
+        
+        Returns:
+            Dictionnaire {activity_id: {colonne: données}}.
+        """
+        if self.store.is_older_than(self.csv_file):
+            self.load_activities(columns=["activity_id"])
+        return self.store.read_streams(activity_ids=activity_ids, columns=columns)
+    
     def load_from_csv(self, csv_file=None):
         """Charge les données depuis le fichier CSV.
         
@@ -52,9 +539,7 @@ class DataManager:
                 
                 # Convertir les chaînes JSON en objets Python
                 for activity in activities:
-                    json_fields = ["segments", "power_analysis", "power_data", 
-                                  "pace_data", "elevation_data", "heartrate_data"]
-                    for field in json_fields:
+                    for field in STREAM_COLUMNS:
                         if field in activity and activity[field]:
                             try:
                                 activity[field] = json.loads(activity[field])
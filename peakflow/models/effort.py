@@ -0,0 +1,64 @@
+"""Module de calcul vectorisé du score d'effort relatif à partir des zones cardiaques."""
+
+import numpy as np
+import pandas as pd
+
+# Schémas de pondération : coefficient appliqué aux minutes passées dans chaque zone
+WEIGHT_SCHEMES = {
+    # Schéma historique : exp(poids) avec les poids {1: 1, 2: 2, 3: 3, 4: 4, 5: 5}
+    "exponential": {zone: float(np.exp(weight)) for zone, weight in {1: 1, 2: 2, 3: 3, 4: 4, 5: 5}.items()},
+    # TRIMP d'Edwards : coefficient linéaire égal au numéro de zone
+    "edwards": {1: 1.0, 2: 2.0, 3: 3.0, 4: 4.0, 5: 5.0}
+}
+
+DEFAULT_WEIGHT_SCHEME = "exponential"
+
+
+def register_weight_scheme(name, coefficients):
+    """Enregistre un schéma de pondération {numéro de zone: coefficient par minute}."""
+    WEIGHT_SCHEMES[name] = {int(zone): float(coef) for zone, coef in coefficients.items()}
+
+
+def get_weight_scheme(scheme=None):
+    """Retourne les coefficients d'un schéma à partir de son nom ou d'un dictionnaire."""
+    if scheme is None:
+        scheme = DEFAULT_WEIGHT_SCHEME
+    if isinstance(scheme, dict):
+        return scheme
+    try:
+        return WEIGHT_SCHEMES[scheme]
+    except KeyError:
+        raise ValueError(f"Schéma de pondération inconnu : {scheme}")
+
+
+def zone_matrix(df, zones):
+    """Construit la matrice (activités x zones) des secondes passées en zone.
+
+    Les colonnes absentes ou non numériques valent 0 ; les valeurs sont tronquées
+    à l'entier comme dans le calcul historique.
+    """
+    matrix = np.zeros((len(df), len(zones)), dtype=np.float64)
+    for j, zone in enumerate(zones):
+        column = f'zone_{zone}'
+        if column in df:
+            matrix[:, j] = np.trunc(pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy(dtype=np.float64))
+    return matrix
+
+
+def relative_effort(df, scheme=None):
+    """Calcule le score d'effort relatif de chaque activité.
+
+    Le score est un produit matrice-vecteur entre les minutes passées dans chaque zone
+    et les coefficients du schéma de pondération.
+
+    Args:
+        df: DataFrame contenant les colonnes zone_1 à zone_5 (secondes).
+        scheme: Nom d'un schéma de WEIGHT_SCHEMES ou dictionnaire {zone: coefficient}.
+
+    Returns:
+        np.ndarray des scores, un par activité.
+    """
+    coefficients = get_weight_scheme(scheme)
+    zones = sorted(coefficients)
+    weights = np.array([coefficients[zone] for zone in zones], dtype=np.float64)
+    return (zone_matrix(df, zones) / 60) @ weights
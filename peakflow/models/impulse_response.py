@@ -0,0 +1,68 @@
+"""Module du modèle impulsion-réponse de Banister (fitness/fatigue) sous forme de filtre linéaire."""
+
+import numpy as np
+from scipy.signal import lfilter
+
+# Constantes de temps par défaut (en jours)
+TAU_FITNESS = 45
+TAU_FATIGUE = 15
+
+
+def impulse_response(effort, tau, initial=None):
+    """Calcule la réponse r_i = effort_i + exp(-1/tau) * r_{i-1} comme un filtre IIR d'ordre 1.
+
+    Comme dans le calcul historique, la série démarre à 0 : l'effort du premier jour
+    n'est pas pris en compte (r_0 = 0). Si `initial` est fourni, la série poursuit
+    une réponse existante dont la dernière valeur est `initial`.
+    """
+    x = np.array(effort, dtype=np.float64)
+    if len(x) == 0:
+        return x
+    decay = np.exp(-1/tau)
+    if initial is not None:
+        return lfilter([1.0], [1.0, -decay], x, zi=[decay * initial])[0]
+    x[0] = 0
+    return lfilter([1.0], [1.0, -decay], x)
+
+
+def fatigue_performance_ratio(fatigue, performance, first_day=True):
+    """Calcule le rapport fatigue/performance (%) borné à 200, 150 par défaut si la performance
+    est inférieure ou égale à 0.001, et 0 pour le premier jour de la série (si `first_day`).
+
+    Accepte aussi des tableaux 2-D (une série par ligne, jours sur le dernier axe)."""
+    fatigue = np.asarray(fatigue, dtype=np.float64)
+    performance = np.asarray(performance, dtype=np.float64)
+    valid = performance > 0.001
+    ratio = np.full(fatigue.shape, 150.0)
+    np.divide(fatigue, performance, out=ratio, where=valid)
+    ratio[valid] = np.minimum(ratio[valid] * 100, 200)
+    if first_day and ratio.shape[-1]:
+        ratio[..., 0] = 0
+    return ratio
+
+
+def fitness_fatigue(effort, tau_fitness=TAU_FITNESS, tau_fatigue=TAU_FATIGUE, initial=None):
+    """Calcule les courbes du modèle fitness/fatigue.
+
+    Args:
+        effort: Tableau 1-D des efforts quotidiens.
+        tau_fitness: Constante de temps de la fitness (jours).
+        tau_fatigue: Constante de temps de la fatigue (jours).
+        initial: Optionnel, tuple (fitness, fatigue) de la veille du premier jour, pour
+                 poursuivre des courbes existantes au lieu de démarrer à 0.
+
+    Returns:
+        Dictionnaire de tableaux NumPy : fatigue, fitness, performance, forme, rapport.
+    """
+    initial_fitness, initial_fatigue = initial if initial is not None else (None, None)
+    fatigue = impulse_response(effort, tau_fatigue, initial=initial_fatigue)
+    fitness = impulse_response(effort, tau_fitness, initial=initial_fitness)
+    performance = (fitness - fatigue)/2
+    forme = fitness - 2*fatigue
+    return {
+        'fatigue': fatigue,
+        'fitness': fitness,
+        'performance': performance,
+        'forme': forme,
+        'rapport': fatigue_performance_ratio(fatigue, performance, first_day=initial is None)
+    }
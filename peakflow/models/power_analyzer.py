@@ -2,6 +2,7 @@
 
 import json
 import numpy as np
+from peakflow.models.zones import time_in_zones as calculate_time_in_zones
 
 class PowerAnalyzer:
     """Classe pour analyser les données de puissance des activités cyclistes."""
@@ -20,8 +21,14 @@ class PowerAnalyzer:
         }
     
     @staticmethod
-    def analyze_power_data(watts_data, ftp):
-        """Analyse les données de puissance pour une activité."""
+    def analyze_power_data(watts_data, ftp, time_data=None):
+        """Analyse les données de puissance pour une activité.
+        
+        Args:
+            watts_data: Stream de puissance.
+            ftp: FTP de l'athlète.
+            time_data: Optionnel, stream de temps ; sinon les échantillons valent 1 s.
+        """
         if not watts_data:
             return None
             
@@ -31,89 +38,129 @@ class PowerAnalyzer:
         if not valid_watts:
             return None
             
-        power_zones = PowerAnalyzer.calculate_power_zones(ftp)
-        time_in_zones = {zone: 0 for zone in power_zones.keys()}
+        # Calculer le temps passé dans chaque zone (échantillons invalides ignorés)
+        watts = np.array(watts_data, dtype=np.float64)
+        watts[~(watts > 0)] = np.nan
+        time_in_zones = calculate_time_in_zones(watts, PowerAnalyzer.calculate_power_zones(ftp),
+                                                time_data=time_data)
         
-        # Calculer le temps passé dans chaque zone
-        for watts in valid_watts:
-            for zone, (min_watts, max_watts) in power_zones.items():
-                if min_watts <= watts < max_watts:
-                    time_in_zones[zone] += 1
-                    break
+        # Puissance normalisée, IF et TSS partagent la même moyenne mobile
+        metrics = PowerAnalyzer.calculate_power_metrics(valid_watts, ftp)
                     
         return {
             'average_power': round(sum(valid_watts) / len(valid_watts), 2),
-            'normalized_power': PowerAnalyzer.calculate_normalized_power(valid_watts),
+            'normalized_power': metrics['normalized_power'],
             'max_power': max(valid_watts),
             'time_in_zones': time_in_zones,
-            'intensity_factor': PowerAnalyzer.calculate_intensity_factor(valid_watts, ftp),
-            'training_stress_score': PowerAnalyzer.calculate_tss(valid_watts, ftp),
+            'intensity_factor': metrics['intensity_factor'],
+            'training_stress_score': metrics['training_stress_score'],
             'power_curve': PowerAnalyzer.calculate_power_curve(valid_watts)
         }
     
+    @staticmethod
+    def calculate_power_metrics(watts_data, ftp):
+        """Calcule en une passe la puissance normalisée, le facteur d'intensité et le TSS.
+        
+        La moyenne mobile sur 30 secondes n'est calculée qu'une fois et partagée.
+        
+        Returns:
+            Dictionnaire normalized_power, intensity_factor, training_stress_score
+            (valeurs None si moins de 30 échantillons).
+        """
+        normalized_power = PowerAnalyzer.calculate_normalized_power(watts_data)
+        if normalized_power is None:
+            return {'normalized_power': None, 'intensity_factor': None, 'training_stress_score': None}
+        
+        intensity_factor = round(normalized_power / ftp, 3)
+        duration_hours = len(watts_data) / 3600  # Convertir secondes en heures
+        return {
+            'normalized_power': normalized_power,
+            'intensity_factor': intensity_factor,
+            'training_stress_score': round(100 * duration_hours * intensity_factor ** 2, 1)
+        }
+    
     @staticmethod
     def calculate_normalized_power(watts_data):
         """Calcule la puissance normalisée."""
         if len(watts_data) < 30:
             return None
             
-        # Moyenne mobile sur 30 secondes
-        rolling_avg = []
-        for i in range(len(watts_data) - 29):
-            window = watts_data[i:i+30]
-            rolling_avg.append(sum(window) / 30)
+        # Moyenne mobile sur 30 secondes (sommes cumulées)
+        cumulative = PowerAnalyzer._cumulative_sum(watts_data)
+        rolling_avg = (cumulative[30:] - cumulative[:-30]) / 30
             
-        # Élever à la 4ème puissance
-        raised = [w ** 4 for w in rolling_avg]
-        
-        # Moyenne des valeurs
-        avg = sum(raised) / len(raised)
-        
-        # Racine 4ème
-        return round(avg ** 0.25, 2)
+        # Élever à la 4ème puissance, moyenne des valeurs puis racine 4ème
+        return round(float(np.mean(rolling_avg ** 4)) ** 0.25, 2)
     
     @staticmethod
     def calculate_intensity_factor(watts_data, ftp):
         """Calcule le facteur d'intensité basé sur la puissance normalisée."""
-        np = PowerAnalyzer.calculate_normalized_power(watts_data)
-        if np is None:
-            return None
-        return round(np / ftp, 3)
+        return PowerAnalyzer.calculate_power_metrics(watts_data, ftp)['intensity_factor']
     
     @staticmethod
     def calculate_tss(watts_data, ftp):
         """Calcule le Training Stress Score."""
         if not watts_data:
             return None
-            
-        duration_hours = len(watts_data) / 3600  # Convertir secondes en heures
-        intensity_factor = PowerAnalyzer.calculate_intensity_factor(watts_data, ftp)
-        
-        if intensity_factor is None:
-            return None
-            
-        return round(100 * duration_hours * intensity_factor ** 2, 1)
+        return PowerAnalyzer.calculate_power_metrics(watts_data, ftp)['training_stress_score']
     
     @staticmethod
-    def calculate_power_curve(watts_data):
-        """Calcule la courbe de puissance (meilleures puissances sur différentes durées)."""
+    def calculate_power_curve(watts_data, durations=None):
+        """Calcule la courbe de puissance (meilleures puissances sur différentes durées).
+        
+        Chaque durée est calculée en O(n) à partir des sommes cumulées.
+        
+        Args:
+            watts_data: Puissances échantillonnées à 1 Hz.
+            durations: Optionnel, durées en secondes (durées standards par défaut).
+        """
         if not watts_data:
             return None
             
         # Durées standards en secondes
-        durations = [1, 5, 10, 30, 60, 300, 600, 1200, 3600]
+        if durations is None:
+            durations = [1, 5, 10, 30, 60, 300, 600, 1200, 3600]
+        cumulative = PowerAnalyzer._cumulative_sum(watts_data)
         power_curve = {}
         
         for duration in durations:
             if len(watts_data) >= duration:
-                max_power = 0
-                for i in range(len(watts_data) - duration + 1):
-                    avg_power = sum(watts_data[i:i+duration]) / duration
-                    max_power = max(max_power, avg_power)
+                max_power = PowerAnalyzer._best_average(cumulative, duration)
                 power_curve[str(duration)] = round(max_power, 2)
                 
         return power_curve
     
+    @staticmethod
+    def calculate_mean_max_power(watts_data, max_duration=None):
+        """Calcule la courbe de puissance moyenne maximale pour chaque durée de 1 s à `max_duration`.
+        
+        Args:
+            watts_data: Puissances échantillonnées à 1 Hz.
+            max_duration: Optionnel, durée maximale en secondes (durée de la sortie par défaut).
+        
+        Returns:
+            np.ndarray où l'élément d-1 est la meilleure puissance moyenne sur d secondes.
+        """
+        if not watts_data:
+            return None
+        
+        n = len(watts_data)
+        max_duration = n if max_duration is None else min(max_duration, n)
+        cumulative = PowerAnalyzer._cumulative_sum(watts_data)
+        return np.array([PowerAnalyzer._best_average(cumulative, d) for d in range(1, max_duration + 1)])
+    
+    @staticmethod
+    def _cumulative_sum(watts_data):
+        """Retourne les sommes cumulées des puissances, précédées de 0."""
+        watts = np.asarray(watts_data, dtype=np.float64)
+        return np.concatenate(([0.0], np.cumsum(watts)))
+    
+    @staticmethod
+    def _best_average(cumulative, duration):
+        """Retourne la meilleure moyenne sur `duration` échantillons consécutifs (sommes cumulées)."""
+        window_sums = cumulative[duration:] - cumulative[:-duration]
+        return max(float(window_sums.max()) / duration, 0)
+    
     @staticmethod
     def process_power_data(streams):
         """Traite les données de puissance à partir des streams d'une activité."""
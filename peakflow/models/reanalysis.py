@@ -0,0 +1,139 @@
+"""Module de réanalyse en masse des activités enregistrées (changement de FTP ou de zones HR).
+
+Usage : python -m peakflow.models.reanalysis [--csv FICHIER] [--ftp WATTS]
+        [--hr-zones 0,120,140,155,170,185] [--streams DOSSIER] [--workers N]
+"""
+
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from peakflow.models.activity_analyzer import ActivityAnalyzer
+from peakflow.models.columnar_store import ColumnarStore
+from peakflow.models.data_manager import DataManager
+from peakflow.models.power_analyzer import PowerAnalyzer
+from peakflow.models.stream_cache import StreamCache
+
+# Nombre d'activités envoyées à la fois à un processus
+CHUNK_SIZE = 64
+
+
+def hr_zones_from_bounds(bounds):
+    """Construit les zones HR {indice: (min, max)} à partir des bornes basses de chaque zone."""
+    bounds = list(bounds)
+    return {i: (low, bounds[i + 1] if i + 1 < len(bounds) else float('inf'))
+            for i, low in enumerate(bounds)}
+
+
+def load_chunk_streams(store_path, stream_dir, activity_ids):
+    """Charge les streams (temps, puissance, fréquence cardiaque) d'un lot d'activités.
+
+    Les streams sont lus dans le StreamCache s'il les contient, sinon dans les colonnes
+    power_data/heartrate_data du stockage en colonnes.
+
+    Returns:
+        Dictionnaire {activity_id: streams au format Strava}.
+    """
+    streams = {}
+    cache = StreamCache(stream_dir) if stream_dir else None
+    missing = []
+    for activity_id in activity_ids:
+        cached = cache.get_streams(activity_id, keys=["time", "watts", "heartrate"]) if cache else None
+        if cached is not None:
+            streams[activity_id] = cached
+        else:
+            missing.append(activity_id)
+
+    if missing:
+        stored = ColumnarStore(store_path).read_streams(activity_ids=missing,
+                                                        columns=["power_data", "heartrate_data"])
+        for activity_id, columns in stored.items():
+            activity_streams = {}
+            for column in ("power_data", "heartrate_data"):
+                for key, data in (columns.get(column) or {}).items():
+                    activity_streams.setdefault(key, {"data": data})
+            streams[activity_id] = activity_streams
+    return streams
+
+
+def reanalyze_chunk(store_path, stream_dir, activity_ids, ftp=None, hr_zones=None):
+    """Réanalyse un lot d'activités (exécuté dans un processus de travail).
+
+    Les streams sont chargés dans le processus, seuls les identifiants et les
+    résultats (petits) transitent entre les processus.
+
+    Returns:
+        Dictionnaire {activity_id: {colonne: nouvelle valeur}}.
+    """
+    updates = {}
+    for activity_id, streams in load_chunk_streams(store_path, stream_dir, activity_ids).items():
+        values = {}
+        watts_data = streams.get("watts", {}).get("data", [])
+        if ftp and watts_data:
+            values["power_analysis"] = PowerAnalyzer.analyze_power_data(
+                watts_data, ftp, time_data=streams.get("time", {}).get("data"))
+        if hr_zones and streams.get("heartrate", {}).get("data"):
+            zones = ActivityAnalyzer.calculate_hr_zones(streams, hr_zones)
+            values.update({f"zone_{i}": seconds for i, seconds in zones.items()})
+        if values:
+            updates[activity_id] = values
+    return updates
+
+
+def reanalyze_all(data_manager, ftp=None, hr_zones=None, stream_dir=None, max_workers=None,
+                  chunk_size=CHUNK_SIZE, progress=print):
+    """Réanalyse toutes les activités enregistrées en parallèle et enregistre les résultats.
+
+    Args:
+        data_manager: DataManager des activités.
+        ftp: Optionnel, nouvelle FTP (recalcul de power_analysis).
+        hr_zones: Optionnel, nouvelles zones HR {indice: (min, max)} (recalcul de zone_0..zone_5).
+        stream_dir: Optionnel, dossier d'un StreamCache.
+        max_workers: Optionnel, nombre de processus (nombre de cœurs par défaut).
+        chunk_size: Nombre d'activités par lot.
+        progress: Fonction appelée avec un message d'avancement (None pour aucun).
+
+    Returns:
+        Nombre d'activités mises à jour.
+    """
+    # Le stockage en colonnes est mis à jour ici, avant d'être lu par les processus
+    ids = data_manager.load_activities(columns=["activity_id"])["activity_id"].dropna().astype(int).tolist()
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+    updates = {}
+    done = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(reanalyze_chunk, data_manager.store.base_path, stream_dir,
+                                   chunk, ftp, hr_zones): len(chunk) for chunk in chunks}
+        for future in as_completed(futures):
+            updates.update(future.result())
+            done += futures[future]
+            if progress:
+                progress(f"Réanalyse : {done}/{len(ids)} activités")
+
+    # Une seule réécriture, atomique, une fois tous les lots terminés
+    data_manager.update_activities(updates)
+    return len(updates)
+
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande."""
+    parser = argparse.ArgumentParser(description="Réanalyse toutes les activités enregistrées.")
+    parser.add_argument("--csv", default="data/activities_with_details.csv", help="Fichier CSV des activités")
+    parser.add_argument("--ftp", type=float, help="Nouvelle FTP (watts)")
+    parser.add_argument("--hr-zones", help="Bornes basses des zones HR, ex: 0,120,140,155,170,185")
+    parser.add_argument("--streams", help="Dossier du cache des streams")
+    parser.add_argument("--workers", type=int, help="Nombre de processus")
+    args = parser.parse_args(argv)
+
+    if not args.ftp and not args.hr_zones:
+        parser.error("indiquer --ftp et/ou --hr-zones")
+    hr_zones = hr_zones_from_bounds(float(v) for v in args.hr_zones.split(",")) if args.hr_zones else None
+
+    count = reanalyze_all(DataManager(csv_file=args.csv), ftp=args.ftp, hr_zones=hr_zones,
+                          stream_dir=args.streams, max_workers=args.workers)
+    print(f"{count} activités mises à jour")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
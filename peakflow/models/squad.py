@@ -0,0 +1,175 @@
+"""Module de calcul vectorisé de la charge d'entraînement d'une équipe (athlètes × jours)."""
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from peakflow.models.acwr import acwr_ratio
+from peakflow.models.impulse_response import fatigue_performance_ratio, TAU_FITNESS, TAU_FATIGUE
+
+# Zone de ratio ACWR considérée sans risque
+ACWR_LOW = 0.8
+ACWR_HIGH = 1.5
+
+# Séries calculées par squad_loads (mêmes noms que les colonnes de TrainingLoadEngine)
+SQUAD_COLUMNS = ['relative_effort', 'Charge_aigue', 'Charge_chronique', 'Ratio_AC',
+                 'fatigue', 'fitness', 'performance', 'forme', 'rapport']
+
+
+def align_efforts(efforts, end=None):
+    """Aligne les efforts quotidiens de plusieurs athlètes sur un calendrier commun.
+
+    Args:
+        efforts: Dictionnaire {athlete_id: Series d'effort indexée par date}
+                 (voir TrainingLoadEngine.effort_by_day).
+        end: Optionnel, dernier jour du calendrier (dernier jour d'activité par défaut).
+
+    Returns:
+        Tuple (athlete_ids, dates, effort, starts) : effort est un tableau 2-D
+        (athlètes × jours, 0 les jours sans activité) et starts l'indice du premier
+        jour d'activité de chaque athlète (-1 s'il n'en a aucun).
+    """
+    athlete_ids = list(efforts)
+    first_days = [series.index.min() for series in efforts.values() if len(series)]
+    last_days = [series.index.max() for series in efforts.values() if len(series)]
+    if not first_days:
+        return athlete_ids, np.array([], dtype=object), np.zeros((len(athlete_ids), 0)), \
+            np.full(len(athlete_ids), -1)
+
+    origin = min(first_days)
+    last = max(last_days + ([end] if end is not None else []))
+    dates = pd.date_range(start=origin, end=last).date
+    effort = np.zeros((len(athlete_ids), len(dates)))
+    starts = np.full(len(athlete_ids), -1)
+    for row, series in enumerate(efforts.values()):
+        if not len(series):
+            continue
+        positions = np.array([(day - origin).days for day in series.index])
+        np.add.at(effort[row], positions, series.to_numpy(dtype=np.float64))
+        starts[row] = positions.min()
+    return athlete_ids, dates, effort, starts
+
+
+def squad_rolling_load(effort, window):
+    """Charge glissante de chaque ligne : somme des `window` derniers jours divisée par `window`."""
+    return lfilter(np.ones(window), [1.0], effort, axis=1) / window
+
+
+def squad_ewma_load(effort, window):
+    """Charge par moyenne mobile exponentielle de chaque ligne (lambda = 2 / (window + 1))."""
+    lam = 2 / (window + 1)
+    return lfilter([lam], [1, -(1 - lam)], effort, axis=1)
+
+
+def squad_decay(impulses, tau):
+    """Réponse impulsionnelle exp(-1/tau) de chaque ligne ; `tau` est commun ou donné par athlète.
+
+    Les athlètes de même constante de temps sont filtrés ensemble, en une passe.
+    """
+    tau = np.broadcast_to(np.asarray(tau, dtype=np.float64), (len(impulses),))
+    response = np.empty_like(impulses)
+    for value in np.unique(tau):
+        rows = tau == value
+        response[rows] = lfilter([1.0], [1.0, -np.exp(-1 / value)], impulses[rows], axis=1)
+    return response
+
+
+def squad_loads(effort, starts=None, acwr_mode="rolling", tau_fitness=TAU_FITNESS,
+                tau_fatigue=TAU_FATIGUE, acute_window=7, chronic_window=28):
+    """Calcule en une passe les séries de charge de tous les athlètes.
+
+    Chaque ligne donne les mêmes valeurs que TrainingLoadEngine sur l'historique seul
+    de l'athlète (à l'arrondi près pour les moyennes glissantes) : les jours avant son
+    premier jour d'activité sont à 0 et ne modifient ni les fenêtres ni les courbes.
+
+    Args:
+        effort: Tableau 2-D des efforts quotidiens (athlètes × jours).
+        starts: Optionnel, indice du premier jour d'activité de chaque athlète (voir
+                align_efforts) ; l'effort de ce jour est ignoré par les courbes de
+                fitness/fatigue, comme pour un athlète seul. Premier jour du calendrier
+                par défaut.
+        acwr_mode: Mode de calcul des charges ("rolling" ou "ewma").
+        tau_fitness: Constante de temps de la fitness (jours), commune ou une par athlète.
+        tau_fatigue: Constante de temps de la fatigue (jours), commune ou une par athlète.
+
+    Returns:
+        Dictionnaire de tableaux 2-D, clés identiques aux colonnes de TrainingLoadEngine.
+    """
+    effort = np.asarray(effort, dtype=np.float64)
+    if effort.ndim != 2:
+        raise ValueError("L'effort doit être un tableau 2-D (athlètes × jours)")
+    if not effort.size:
+        return {column: np.zeros(effort.shape) for column in SQUAD_COLUMNS}
+    rows = np.arange(len(effort))
+    if starts is None:
+        starts = np.zeros(len(effort), dtype=int)
+    starts = np.asarray(starts)
+
+    if acwr_mode == "rolling":
+        load = squad_rolling_load
+    elif acwr_mode == "ewma":
+        load = squad_ewma_load
+    else:
+        raise ValueError(f"Mode ACWR inconnu : {acwr_mode}")
+    acute = load(effort, acute_window)
+    chronic = load(effort, chronic_window)
+
+    # Les courbes démarrent à 0 le premier jour de chaque athlète (effort de ce jour ignoré)
+    active = starts >= 0
+    impulses = effort.copy()
+    impulses[rows[active], starts[active]] = 0
+    fatigue = squad_decay(impulses, tau_fatigue)
+    fitness = squad_decay(impulses, tau_fitness)
+    performance = (fitness - fatigue) / 2
+
+    rapport = fatigue_performance_ratio(fatigue, performance, first_day=False)
+    # Rapport nul le premier jour de chaque athlète et avant
+    rapport[np.arange(effort.shape[1]) <= np.where(active, starts, effort.shape[1])[:, None]] = 0
+
+    return {
+        'relative_effort': effort,
+        'Charge_aigue': acute,
+        'Charge_chronique': chronic,
+        'Ratio_AC': acwr_ratio(acute, chronic),
+        'fatigue': fatigue,
+        'fitness': fitness,
+        'performance': performance,
+        'forme': fitness - 2 * fatigue,
+        'rapport': rapport
+    }
+
+
+def risk_ranking(athlete_ids, loads, day=-1, low=ACWR_LOW, high=ACWR_HIGH):
+    """Classe les athlètes par risque, d'après leur ratio ACWR d'un jour donné.
+
+    Le risque est l'écart du ratio à la zone [low, high] (0 à l'intérieur) ; les
+    athlètes les plus éloignés de la zone viennent en premier.
+
+    Args:
+        athlete_ids: Identifiants des athlètes (ordre des lignes de `loads`).
+        loads: Résultat de squad_loads.
+        day: Indice du jour évalué (dernier jour par défaut).
+
+    Returns:
+        Liste de dictionnaires (athlete_id, acwr, acute, chronic, fitness, fatigue, form,
+        risk, status), du plus au moins à risque.
+    """
+    if not len(athlete_ids) or not loads['Ratio_AC'].shape[1]:
+        return []
+    ratio = loads['Ratio_AC'][:, day]
+    risk = np.maximum(low - ratio, 0) + np.maximum(ratio - high, 0)
+    status = np.where(ratio > high, "surcharge", np.where(ratio < low, "sous-charge", "optimal"))
+
+    ranking = []
+    for row in np.lexsort((-ratio, -risk)):
+        ranking.append({
+            'athlete_id': athlete_ids[row],
+            'acwr': float(ratio[row]),
+            'acute': float(loads['Charge_aigue'][row, day]),
+            'chronic': float(loads['Charge_chronique'][row, day]),
+            'fitness': float(loads['fitness'][row, day]),
+            'fatigue': float(loads['fatigue'][row, day]),
+            'form': float(loads['forme'][row, day]),
+            'risk': float(risk[row]),
+            'status': str(status[row])
+        })
+    return ranking
@@ -0,0 +1,145 @@
+"""Module de cache local des streams d'activités (format binaire compressé)."""
+
+import io
+import os
+import json
+import numpy as np
+from peakflow.utils.files import atomic_write
+
+# Streams demandés à Strava et conservés dans le cache
+STREAM_KEYS = ["time", "distance", "velocity_smooth", "heartrate", "altitude", "watts", "cadence"]
+
+# Échelles essayées pour stocker des décimales en entiers sans perte (0,1 ; 0,01 ; 0,001)
+SCALES = [1, 10, 100, 1000]
+
+
+def encode_stream(values):
+    """Encode un stream en tableaux compacts.
+
+    Les valeurs représentables sans perte en virgule fixe (entiers, ou décimales à 1-3
+    chiffres comme les distances et altitudes Strava) sont stockées sous forme d'écarts
+    successifs dans le plus petit type entier suffisant ; les autres en float64. Les
+    valeurs manquantes (None) sont décrites par un masque.
+
+    Returns:
+        (dictionnaire {suffixe: tableau}, métadonnées).
+    """
+    raw = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    mask = np.isnan(raw)
+    arrays = {}
+    if mask.any():
+        arrays["mask"] = np.packbits(mask)
+        # Les valeurs manquantes reprennent la précédente : écart nul
+        index = np.where(mask, 0, np.arange(len(raw)))
+        raw = raw[np.maximum.accumulate(index)]
+        raw[np.isnan(raw)] = 0
+
+    integer = all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in values if v is not None)
+    for scale in SCALES:
+        quantized = np.round(raw * scale)
+        # -0.0 ne survit pas au passage en entier : ces streams restent en flottants
+        if (np.abs(quantized).max(initial=0) < 2 ** 62 and np.array_equal(quantized / scale, raw)
+                and not np.signbit(raw[raw == 0]).any()):
+            deltas = np.diff(quantized.astype(np.int64), prepend=0)
+            for dtype in (np.int8, np.int16, np.int32, np.int64):
+                info = np.iinfo(dtype)
+                if info.min <= deltas.min(initial=0) and deltas.max(initial=0) <= info.max:
+                    break
+            arrays["data"] = deltas.astype(dtype)
+            return arrays, {"encoding": "delta", "scale": scale, "integer": integer and scale == 1,
+                            "length": len(raw)}
+
+    arrays["data"] = raw
+    return arrays, {"encoding": "raw", "length": len(raw)}
+
+
+def decode_stream(arrays, meta):
+    """Décode un stream encodé par encode_stream.
+
+    Returns:
+        Tableau NumPy (masqué si le stream contient des valeurs manquantes).
+    """
+    data = arrays["data"]
+    if meta["encoding"] == "delta":
+        values = np.cumsum(data, dtype=np.int64)
+        if not meta.get("integer"):
+            values = values / meta["scale"]
+    else:
+        values = np.asarray(data, dtype=np.float64)
+    if "mask" in arrays:
+        mask = np.unpackbits(arrays["mask"], count=meta["length"]).astype(bool)
+        return np.ma.MaskedArray(values, mask=mask)
+    return values
+
+
+class StreamCache:
+    """Classe pour conserver localement les streams (immuables) des activités.
+
+    Chaque activité est un fichier .npz compressé, nommé par son activity_id et
+    réparti dans des sous-dossiers. Les streams d'un fichier sont décompressés
+    séparément, seulement lorsqu'ils sont demandés.
+    """
+
+    def __init__(self, cache_dir="data/streams"):
+        """Initialise le cache dans le dossier `cache_dir`."""
+        self.cache_dir = cache_dir
+
+    def path(self, activity_id):
+        """Retourne le chemin du fichier d'une activité."""
+        activity_id = int(activity_id)
+        return os.path.join(self.cache_dir, f"{activity_id % 256:02x}", f"{activity_id}.npz")
+
+    def __contains__(self, activity_id):
+        return os.path.exists(self.path(activity_id))
+
+    def put(self, activity_id, streams):
+        """Enregistre les streams d'une activité (format Strava {clé: {"data": [...]}})."""
+        arrays, meta = {}, {}
+        for key, stream in (streams or {}).items():
+            data = stream.get("data") if isinstance(stream, dict) else None
+            if not data or np.ndim(data) != 1:
+                continue
+            encoded, meta[key] = encode_stream(data)
+            arrays.update({f"{key}.{suffix}": array for suffix, array in encoded.items()})
+        arrays["__meta__"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        with atomic_write(self.path(activity_id), mode="wb") as f:
+            f.write(buffer.getvalue())
+
+    def load(self, activity_id, keys=None):
+        """Charge les streams d'une activité sous forme de tableaux NumPy.
+
+        Args:
+            activity_id: Identifiant de l'activité.
+            keys: Optionnel, streams à décoder (tous par défaut).
+
+        Returns:
+            Dictionnaire {clé: tableau}, ou None si l'activité n'est pas en cache.
+        """
+        try:
+            archive = np.load(self.path(activity_id))
+        except FileNotFoundError:
+            return None
+        with archive:
+            meta = json.loads(archive["__meta__"].tobytes().decode("utf-8"))
+            arrays = {}
+            for key in (keys if keys is not None else meta):
+                if key not in meta:
+                    continue
+                parts = {suffix: archive[f"{key}.{suffix}"] for suffix in ("data", "mask")
+                         if f"{key}.{suffix}" in archive.files}
+                arrays[key] = decode_stream(parts, meta[key])
+            return arrays
+
+    def get_streams(self, activity_id, keys=None):
+        """Charge les streams d'une activité au format de l'API Strava ({clé: {"data": liste}}).
+
+        Returns:
+            Dictionnaire des streams, ou None si l'activité n'est pas en cache.
+        """
+        arrays = self.load(activity_id, keys=keys)
+        if arrays is None:
+            return None
+        return {key: {"data": array.tolist()} for key, array in arrays.items()}
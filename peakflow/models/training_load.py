@@ -0,0 +1,222 @@
+"""Module de calcul de la charge d'entraînement (ACWR, fatigue, fitness, forme)."""
+
+import numpy as np
+import pandas as pd
+from peakflow.models.acwr import compute_acwr, update_acwr
+from peakflow.models.effort import relative_effort
+from peakflow.models.impulse_response import fitness_fatigue, TAU_FITNESS, TAU_FATIGUE
+
+
+class TrainingLoadEngine:
+    """Calcule en une passe les séries quotidiennes de charge d'un athlète.
+
+    Le résultat est un DataFrame partagé par tous les graphiques du tableau de bord
+    (mis en cache par version des données, voir DataManager.get_derived) et ne doit
+    pas être modifié par les appelants.
+    """
+
+    def __init__(self, acwr_mode="rolling", tau_fitness=TAU_FITNESS, tau_fatigue=TAU_FATIGUE,
+                 weight_scheme=None):
+        """Initialise le moteur avec les paramètres de l'athlète.
+
+        Args:
+            acwr_mode: Mode de calcul des charges ("rolling" ou "ewma").
+            tau_fitness: Constante de temps de la fitness de l'athlète (jours).
+            tau_fatigue: Constante de temps de la fatigue de l'athlète (jours).
+            weight_scheme: Schéma de pondération des zones cardiaques (défaut : exponentiel).
+        """
+        self.acwr_mode = acwr_mode
+        self.weight_scheme = weight_scheme
+        self.tau_fitness = tau_fitness
+        self.tau_fatigue = tau_fatigue
+
+    def cache_key(self):
+        """Retourne une clé identifiant le calcul (nom et paramètres) pour la mise en cache."""
+        return ("training_load", self.acwr_mode, self.tau_fitness, self.tau_fatigue,
+                repr(self.weight_scheme))
+
+    def compute(self, activities_data):
+        """Calcule les séries quotidiennes à partir des activités (liste ou DataFrame)."""
+        return self.build_series(activities_data, acwr_mode=self.acwr_mode,
+                                 tau_fitness=self.tau_fitness, tau_fatigue=self.tau_fatigue,
+                                 weight_scheme=self.weight_scheme)
+
+    def update(self, previous, new_activities):
+        """Met à jour des séries existantes avec de nouvelles activités.
+
+        Seuls les jours à partir de la première date touchée sont recalculés : les
+        charges reprennent les fenêtres précédentes et les courbes de fitness/fatigue
+        repartent de leur état de la veille. Le coût est proportionnel au nombre de
+        jours recalculés, pas à la longueur de l'historique.
+
+        Args:
+            previous: Séries quotidiennes existantes (résultat de compute ou update).
+            new_activities: Nouvelles activités (liste ou DataFrame).
+        """
+        new_effort = self.effort_by_day(new_activities, weight_scheme=self.weight_scheme)
+        if previous is None or previous.empty:
+            return self.compute(new_activities)
+        if new_effort.empty:
+            return previous
+
+        first_date = previous['date'].iloc[0]
+        last_date = max(previous['date'].iloc[-1], new_effort.index.max())
+        # Premier jour à recalculer (les jours vides ajoutés après l'historique aussi)
+        start = min((new_effort.index.min() - first_date).days, len(previous))
+        if start <= 0:
+            # Le début de la série change : tout recalculer à partir de l'effort fusionné
+            effort = pd.concat([previous.set_index('date')['relative_effort'], new_effort])
+            effort = effort.groupby(level=0).sum()
+            return self.series_from_effort(effort)
+
+        # Série d'effort prolongée, avec les nouveaux efforts ajoutés aux jours existants
+        dates = pd.date_range(start=first_date, end=last_date).date
+        effort = np.zeros(len(dates))
+        effort[:len(previous)] = previous['relative_effort'].to_numpy()
+        positions = np.array([(day - first_date).days for day in new_effort.index])
+        np.add.at(effort, positions, new_effort.to_numpy())
+
+        charge_aigue, charge_chronique, ratio = update_acwr(
+            effort, previous['Charge_aigue'].to_numpy(), previous['Charge_chronique'].to_numpy(),
+            start, mode=self.acwr_mode)
+
+        courbes = fitness_fatigue(effort[start:], tau_fitness=self.tau_fitness, tau_fatigue=self.tau_fatigue,
+                                  initial=(previous['fitness'].iloc[start - 1], previous['fatigue'].iloc[start - 1]))
+
+        df_full = pd.DataFrame({'date': dates, 'relative_effort': effort,
+                                'Charge_aigue': charge_aigue, 'Charge_chronique': charge_chronique,
+                                'Ratio_AC': ratio})
+        for column, values in courbes.items():
+            df_full[column] = np.concatenate([previous[column].to_numpy()[:start], values])
+        return df_full
+
+    def series_from_effort(self, effort):
+        """Calcule toutes les séries à partir d'une série d'effort indexée par date."""
+        date_range = pd.date_range(start=effort.index.min(), end=effort.index.max())
+        df_full = pd.DataFrame({'date': date_range.date})
+        df_full = df_full.merge(effort.rename('relative_effort').rename_axis('date').reset_index(),
+                                on='date', how='left')
+        df_full['relative_effort'] = df_full['relative_effort'].fillna(0)
+        return self.add_load_series(df_full, acwr_mode=self.acwr_mode,
+                                    tau_fitness=self.tau_fitness, tau_fatigue=self.tau_fatigue)
+
+    @staticmethod
+    def effort_by_day(activities_data, weight_scheme=None):
+        """Retourne l'effort relatif total par jour d'activité (Series indexée par date)."""
+        # Convertir les données d'activités en DataFrame
+        df = pd.DataFrame(activities_data)
+        if df.empty:
+            return pd.Series(dtype='float64')
+        df['start_date_local'] = pd.to_datetime(df['start_date_local'])
+        df['date'] = df['start_date_local'].dt.date
+
+        # Calculer le score d'effort relatif pour chaque activité
+        df['relative_effort'] = relative_effort(df, scheme=weight_scheme)
+
+        # Agréger par jour
+        return df.groupby('date')['relative_effort'].sum()
+
+    @staticmethod
+    def build_daily_effort(activities_data, weight_scheme=None):
+        """Construit la série quotidienne d'effort relatif (jours sans activité à 0).
+
+        Args:
+            activities_data: Liste des activités (dictionnaires) à analyser.
+            weight_scheme: Schéma de pondération des zones (voir peakflow.models.effort).
+        """
+        daily_effort = TrainingLoadEngine.effort_by_day(activities_data, weight_scheme).reset_index()
+
+        # Générer toutes les dates
+        date_range = pd.date_range(start=daily_effort['date'].min(), end=daily_effort['date'].max())
+        df_full = pd.DataFrame({'date': date_range.date})
+
+        # Fusionner avec les efforts quotidiens
+        df_full = df_full.merge(daily_effort, on='date', how='left')
+        df_full['relative_effort'] = df_full['relative_effort'].fillna(0)
+
+        return df_full
+
+    @staticmethod
+    def build_series(activities_data, acwr_mode="rolling",
+                     tau_fitness=TAU_FITNESS, tau_fatigue=TAU_FATIGUE, weight_scheme=None):
+        """Calcule en une passe l'effort, l'ACWR, la fatigue, la fitness, la performance,
+        la forme et le rapport fatigue/performance."""
+        df_full = TrainingLoadEngine.build_daily_effort(activities_data, weight_scheme=weight_scheme)
+        return TrainingLoadEngine.add_load_series(df_full, acwr_mode=acwr_mode,
+                                                  tau_fitness=tau_fitness, tau_fatigue=tau_fatigue)
+
+    @staticmethod
+    def add_load_series(df_full, acwr_mode="rolling", tau_fitness=TAU_FITNESS, tau_fatigue=TAU_FATIGUE):
+        """Ajoute les charges, l'ACWR et les courbes fitness/fatigue à une série d'effort quotidienne."""
+        # Calcul des charges aiguë (7 jours) et chronique (28 jours) et du ratio ACWR
+        charge_aigue, charge_chronique, ratio = compute_acwr(
+            df_full['relative_effort'].to_numpy(), mode=acwr_mode)
+        df_full["Charge_aigue"] = charge_aigue
+        df_full["Charge_chronique"] = charge_chronique
+        df_full['Ratio_AC'] = ratio
+
+        # Calcul des courbes de fatigue, fitness, performance, forme et du rapport
+        courbes = fitness_fatigue(df_full['relative_effort'].to_numpy(),
+                                  tau_fitness=tau_fitness, tau_fatigue=tau_fatigue)
+        for column, values in courbes.items():
+            df_full[column] = values
+
+        return df_full
+
+
+# Métriques exposées par l'API de séries temporelles et colonnes correspondantes
+TIMESERIES_METRICS = {
+    'effort': 'relative_effort',
+    'acute': 'Charge_aigue',
+    'chronic': 'Charge_chronique',
+    'acwr': 'Ratio_AC',
+    'fatigue': 'fatigue',
+    'fitness': 'fitness',
+    'performance': 'performance',
+    'form': 'forme',
+    'ratio': 'rapport'
+}
+
+
+def timeseries_payload(df_full, metrics, start_date=None, max_points=None):
+    """Construit une représentation JSON compacte en colonnes des séries quotidiennes.
+
+    Les dates sont des décalages en jours par rapport à `start`, et les valeurs sont
+    arrondies à la précision float32.
+
+    Args:
+        df_full: Séries quotidiennes (voir TrainingLoadEngine).
+        metrics: Liste de noms de métriques (clés de TIMESERIES_METRICS).
+        start_date: Optionnel, première date à inclure.
+        max_points: Optionnel, nombre maximal de points (sous-échantillonnage régulier,
+                    au moins 2 : le premier et le dernier jour sont toujours conservés).
+
+    Raises:
+        ValueError: Si max_points est inférieur à 2.
+    """
+    if max_points is not None and max_points < 2:
+        raise ValueError("max_points doit être au moins 2")
+    if start_date is not None:
+        df_full = df_full[df_full['date'] >= start_date]
+    if df_full.empty:
+        return {'start': None, 'offsets': [], 'metrics': {metric: [] for metric in metrics}}
+
+    indices = np.arange(len(df_full))
+    if max_points is not None and len(df_full) > max_points:
+        # Sous-échantillonnage régulier en gardant le premier et le dernier jour
+        indices = np.unique(np.linspace(0, len(df_full) - 1, max_points).round().astype(int))
+
+    dates = pd.to_datetime(df_full['date'].to_numpy()[indices])
+    start = dates[0]
+    offsets = (dates - start).days
+
+    return {
+        'start': start.strftime('%Y-%m-%d'),
+        'offsets': offsets.tolist(),
+        'metrics': {
+            # str() d'un float32 donne sa représentation la plus courte
+            metric: [float(str(v)) for v in
+                     df_full[TIMESERIES_METRICS[metric]].to_numpy()[indices].astype(np.float32)]
+            for metric in metrics
+        }
+    }
@@ -0,0 +1,65 @@
+"""Module de calcul vectorisé du temps passé par zone (puissance, fréquence cardiaque)."""
+
+import numpy as np
+
+# Intervalle maximal (secondes) entre deux échantillons d'un enregistrement continu : au-delà,
+# l'enregistrement a été mis en pause et l'échantillon ne compte qu'un intervalle habituel
+MAX_SAMPLE_GAP = 10
+
+
+def sample_durations(time_data, n, max_gap=MAX_SAMPLE_GAP):
+    """Retourne la durée représentée par chaque échantillon (en secondes).
+
+    Chaque échantillon vaut le temps écoulé depuis le précédent ; le premier reprend
+    l'intervalle suivant. Un intervalle supérieur à `max_gap` (pause) est remplacé par
+    l'intervalle médian de l'enregistrement, borné par `max_gap`. Sans stream de temps,
+    les échantillons valent 1 s (1 Hz).
+    """
+    if time_data is None or len(time_data) != n or n == 0:
+        return np.ones(n)
+    times = np.asarray(time_data, dtype=np.float64)
+    first = times[1] - times[0] if n > 1 else 1
+    durations = np.diff(times, prepend=times[0] - first)
+    if max_gap is not None:
+        pauses = durations > max_gap
+        if pauses.any():
+            durations[pauses] = min(np.median(durations), max_gap)
+    return durations
+
+
+def time_in_zones(samples, zones, time_data=None, max_gap=MAX_SAMPLE_GAP):
+    """Calcule le temps passé dans chaque zone en un appel vectorisé.
+
+    Les échantillons sont affectés à la zone dont la borne basse est la plus grande
+    borne inférieure ou égale à leur valeur (min <= valeur < max pour des zones
+    contiguës). Les valeurs manquantes ou sous la première zone sont ignorées.
+
+    Args:
+        samples: Valeurs du stream (None autorisé).
+        zones: Dictionnaire ordonné {nom: (min, max)} de zones contiguës.
+        time_data: Optionnel, stream de temps (secondes) de même longueur que `samples`.
+        max_gap: Intervalle au-delà duquel un échantillon suit une pause (voir
+                 sample_durations) ; None pour compter tout le temps écoulé.
+
+    Returns:
+        Dictionnaire {nom: secondes} (entiers).
+    """
+    names = list(zones)
+    lows = np.array([zones[name][0] for name in names], dtype=np.float64)
+    values = np.array(samples, dtype=np.float64)  # None devient NaN
+
+    durations = sample_durations(time_data, len(values), max_gap=max_gap)
+
+    indices = np.searchsorted(lows, values, side='right') - 1
+    valid = ~np.isnan(values) & (indices >= 0)
+    seconds = np.bincount(indices[valid], weights=durations[valid], minlength=len(names))
+    return {name: int(round(value)) for name, value in zip(names, seconds)}
+
+
+def heart_rate_zones(strava_zones):
+    """Convertit les zones cardiaques d'un athlète Strava ([{min, max}, ...], max = -1 pour
+    la dernière) en dictionnaire {indice: (min, max)} utilisable par time_in_zones."""
+    return {
+        i: (zone.get("min", 0), float('inf') if zone.get("max", -1) == -1 else zone["max"])
+        for i, zone in enumerate(strava_zones)
+    }
@@ -0,0 +1,125 @@
+"""Cache mémoire LRU à budget borné, partagé entre fichiers de données."""
+
+import sys
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """Estime l'occupation mémoire d'une valeur mise en cache (en octets)."""
+    if hasattr(value, "memory_usage"):
+        # DataFrame / Series pandas
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Cache LRU thread-safe avec budget mémoire et compteurs de succès/échecs.
+
+    Chaque entrée peut être associée à une étiquette (ex: chemin du fichier source)
+    afin d'invalider d'un coup toutes les entrées dérivées d'un même fichier. Un budget
+    par étiquette peut aussi être fixé : un fichier (un athlète) volumineux évince
+    alors ses propres entrées plutôt que celles des autres.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_tag_bytes=None):
+        """Initialise le cache.
+
+        Args:
+            max_bytes: Budget mémoire maximal (en octets).
+            max_tag_bytes: Optionnel, budget maximal des entrées d'une même étiquette.
+        """
+        self.max_bytes = max_bytes
+        self.max_tag_bytes = max_tag_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._tag_bytes = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Retourne la valeur associée à la clé et la marque comme récemment utilisée."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, tag=None):
+        """Ajoute une valeur, en évinçant les entrées les moins récentes si nécessaire."""
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes or (self.max_tag_bytes is not None and size > self.max_tag_bytes):
+                # Trop volumineux pour être mis en cache
+                return value
+            self._entries[key] = (value, size, tag)
+            self._bytes += size
+            self._tag_bytes[tag] = self._tag_bytes.get(tag, 0) + size
+            # Budget de l'étiquette : évincer d'abord ses propres entrées les plus anciennes
+            if self.max_tag_bytes is not None and self._tag_bytes[tag] > self.max_tag_bytes:
+                for old_key in [k for k, (_, _, t) in self._entries.items() if t == tag]:
+                    if self._tag_bytes[tag] <= self.max_tag_bytes:
+                        break
+                    self._remove(old_key)
+                    self.evictions += 1
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def _remove(self, key):
+        """Retire une entrée et met à jour les compteurs d'occupation (verrou déjà pris)."""
+        _, size, tag = self._entries.pop(key)
+        self._bytes -= size
+        self._tag_bytes[tag] -= size
+        if not self._tag_bytes[tag]:
+            del self._tag_bytes[tag]
+
+    def get_or_compute(self, key, builder, tag=None):
+        """Retourne la valeur en cache ou la calcule avec `builder()` et la stocke."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, builder(), tag=tag)
+        return value
+
+    def invalidate(self, tag=None):
+        """Supprime les entrées associées à l'étiquette donnée (toutes si None)."""
+        with self._lock:
+            if tag is None:
+                self._entries.clear()
+                self._bytes = 0
+                self._tag_bytes.clear()
+                return
+            for key in [k for k, (_, _, t) in self._entries.items() if t == tag]:
+                self._remove(key)
+
+    def stats(self):
+        """Retourne les compteurs du cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "tags": len(self._tag_bytes),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_tag_bytes": self.max_tag_bytes
+            }
@@ -0,0 +1,81 @@
+"""Cache des graphiques rendus (mémoire, avec un niveau optionnel sur disque)."""
+
+import os
+import hashlib
+import shutil
+import tempfile
+
+
+class ChartCache:
+    """Classe pour mettre en cache les images de graphiques déjà rendues.
+
+    Les clés sont de la forme (empreinte des données, graphique, période, ...).
+    Le niveau mémoire utilise un LRUCache (les entrées sont étiquetées par fichier
+    source et donc invalidées avec lui) ; le niveau disque, optionnel, range les
+    images par empreinte et supprime celles d'une empreinte précédente.
+    """
+
+    def __init__(self, memory_cache, disk_dir=None):
+        """Initialise le cache.
+
+        Args:
+            memory_cache: LRUCache utilisé pour le niveau mémoire.
+            disk_dir: Optionnel, dossier du niveau disque.
+        """
+        self.memory_cache = memory_cache
+        self.disk_dir = disk_dir
+
+    def get_or_render(self, key, renderer, tag=None):
+        """Retourne l'image associée à la clé, en la rendant avec `renderer()` si nécessaire."""
+        memory_key = ("chart",) + tuple(key)
+        missing = object()
+        image = self.memory_cache.get(memory_key, missing)
+        if image is not missing:
+            return image
+
+        image = self._read_disk(key, tag)
+        if image is None:
+            image = renderer()
+            self._write_disk(key, tag, image)
+        return self.memory_cache.put(memory_key, image, tag=tag)
+
+    @staticmethod
+    def _digest(value):
+        """Retourne une empreinte courte et stable d'une valeur."""
+        return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()[:16]
+
+    def _paths(self, key, tag):
+        """Retourne (dossier de la source, dossier de l'empreinte, fichier) pour une clé."""
+        fingerprint, *rest = key
+        source_dir = os.path.join(self.disk_dir, self._digest(tag))
+        fingerprint_dir = os.path.join(source_dir, self._digest(fingerprint))
+        return source_dir, fingerprint_dir, os.path.join(fingerprint_dir, self._digest(tuple(rest)))
+
+    def _read_disk(self, key, tag):
+        """Lit une image depuis le disque, ou None si absente."""
+        if not self.disk_dir:
+            return None
+        _, _, path = self._paths(key, tag)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key, tag, image):
+        """Écrit une image sur le disque et supprime celles des anciennes versions des données."""
+        if not self.disk_dir:
+            return
+        source_dir, fingerprint_dir, path = self._paths(key, tag)
+        os.makedirs(fingerprint_dir, exist_ok=True)
+
+        # Les données ont changé : les images des empreintes précédentes sont obsolètes
+        for name in os.listdir(source_dir):
+            other = os.path.join(source_dir, name)
+            if other != fingerprint_dir:
+                shutil.rmtree(other, ignore_errors=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=fingerprint_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(image)
+        os.replace(tmp_path, path)
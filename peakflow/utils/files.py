@@ -0,0 +1,45 @@
+"""Écritures de fichiers atomiques et résistantes aux interruptions."""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def sync_file(path):
+    """Force l'écriture sur disque du contenu d'un fichier déjà fermé."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(path, mode="w", **kwargs):
+    """Ouvre un fichier temporaire qui remplace `path` en une fois à la sortie du bloc.
+
+    Le contenu est écrit sur disque (fsync) avant le renommage : un lecteur voit
+    l'ancien ou le nouveau fichier complet, jamais un fichier à moitié écrit, et une
+    interruption laisse l'ancien fichier intact. En cas d'exception, le fichier
+    temporaire est supprimé et `path` n'est pas modifié.
+
+    Args:
+        path: Fichier à remplacer.
+        mode: Mode d'ouverture ("w" ou "wb").
+        **kwargs: Arguments supplémentaires de open() (encoding, newline...).
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        # mkstemp crée le fichier en 0600 : conserver les droits du fichier remplacé
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
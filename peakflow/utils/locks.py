@@ -0,0 +1,80 @@
+"""Verrous de fichiers pour sérialiser les écritures entre threads et processus."""
+
+import os
+import functools
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus courant
+    fcntl = None
+
+
+class FileLock:
+    """Verrou exclusif réentrant associé à un fichier de verrouillage.
+
+    Le verrou est pris avec flock (entre processus, ex: plusieurs workers gunicorn)
+    et un RLock (entre threads) ; un même thread peut le reprendre sans se bloquer.
+    """
+
+    def __init__(self, path):
+        """Initialise le verrou sur le fichier `path` (créé au premier verrouillage)."""
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        """Prend le verrou.
+
+        Args:
+            blocking: Attendre que le verrou soit libre (sinon retourner False aussitôt).
+
+        Returns:
+            True si le verrou a été pris.
+        """
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BaseException as e:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._lock.release()
+                if isinstance(e, BlockingIOError):
+                    # Verrou tenu par un autre processus
+                    return False
+                raise
+        self._depth += 1
+        return True
+
+    def release(self):
+        """Libère le verrou."""
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def locked(method):
+    """Décorateur exécutant une méthode sous le verrou `self.lock` de l'objet."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,181 @@
+"""Tests de cohérence des lectures de DataManager pendant des écritures concurrentes."""
+
+import threading
+import pytest
+from peakflow.models.data_manager import DataManager
+from peakflow.models.training_load import TrainingLoadEngine
+from peakflow.utils.cache import LRUCache
+
+
+def activity(activity_id, day=1):
+    """Retourne une activité minimale."""
+    return {"activity_id": activity_id, "start_date_local": f"2024-01-{day:02d}T08:00:00", "type": "Run",
+            "distance": 10.0, "moving_time": "1:00:00", "suffer_score": 50,
+            **{f"zone_{z}": 60 for z in range(6)}}
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """Fichier de données partagé par plusieurs gestionnaires (un cache chacun)."""
+    path = str(tmp_path / "activities.csv")
+    DataManager(csv_file=path, cache=LRUCache()).save_to_csv([activity(1)])
+    return path
+
+
+def write_during_freshness_check(reader, writer, activities):
+    """Fait remplacer le CSV par `writer` juste après le contrôle de fraîcheur du stockage
+    de `reader` (première lecture seulement), sans mettre à jour le stockage.
+
+    Returns:
+        Fonction terminant l'écriture (mise à jour du stockage).
+    """
+    store_write, is_older_than = writer.store.write, reader.store.is_older_than
+    pending = []
+    writer.store.write = pending.append
+
+    def interleaved(path):
+        result = is_older_than(path)
+        if not pending:
+            writer.save_to_csv(activities)
+        return result
+
+    def finish():
+        writer.store.write, reader.store.is_older_than = store_write, is_older_than
+        for data in pending:
+            store_write(data)
+
+    reader.store.is_older_than = interleaved
+    return finish
+
+
+def test_stale_read_is_not_cached_under_new_version(csv_file):
+    """Une lecture de l'ancien stockage n'est pas mise en cache pour la nouvelle version du fichier."""
+    reader = DataManager(csv_file=csv_file, cache=LRUCache())
+    writer = DataManager(csv_file=csv_file, cache=LRUCache())
+    reader.load_activities()
+
+    finish = write_during_freshness_check(reader, writer, [activity(1), activity(2, day=2)])
+    reader.load_activities()
+    finish()
+
+    assert len(reader.load_activities()) == 2
+    assert len(DataManager(csv_file=csv_file, cache=LRUCache()).load_activities()) == 2
+
+
+def test_index_is_not_rebuilt_from_stale_read(csv_file):
+    """L'index SQLite partagé n'est pas reconstruit à partir d'une lecture périmée."""
+    reader = DataManager(csv_file=csv_file, cache=LRUCache())
+    writer = DataManager(csv_file=csv_file, cache=LRUCache())
+    assert reader.count_activities() == 1
+
+    finish = write_during_freshness_check(reader, writer, [activity(1), activity(2, day=2)])
+    reader.load_activities()
+    finish()
+
+    assert reader.count_activities() == 2
+    assert DataManager(csv_file=csv_file, cache=LRUCache()).count_activities() == 2
+
+
+def test_index_is_not_rebuilt_from_read_during_write(csv_file):
+    """Une lecture de l'ancien stockage pendant une écriture ne sert pas à reconstruire l'index."""
+    reader = DataManager(csv_file=csv_file, cache=LRUCache())
+    writer = DataManager(csv_file=csv_file, cache=LRUCache())
+    reader.load_activities()
+
+    store_write, read = writer.store.write, reader.store.read
+    pending = []
+
+    def read_then_finish(columns=None):
+        # Le stockage est mis à jour (fin de l'écriture) après la lecture de l'ancienne version
+        df = read(columns=columns)
+        reader.store.read = read
+        store_write(*pending)
+        return df
+
+    with writer.lock:
+        writer.store.write = pending.append
+        writer.save_to_csv([activity(1), activity(2, day=2)])
+        writer.store.write = store_write
+        reader.store.read = read_then_finish
+        reader.activity_index()
+
+    assert DataManager(csv_file=csv_file, cache=LRUCache()).count_activities() == 2
+
+
+def test_reads_are_consistent_during_appends(csv_file):
+    """Pendant des ajouts concurrents, chaque lecture voit une version complète, et la
+    dernière lecture voit toutes les activités."""
+    writer = DataManager(csv_file=csv_file, cache=LRUCache())
+    reader = DataManager(csv_file=csv_file, cache=LRUCache())
+    errors = []
+
+    def append():
+        try:
+            for activity_id in range(2, 42):
+                writer.append_activities([activity(activity_id, day=activity_id % 28 + 1)])
+        except Exception as e:  # pragma: no cover - remonté par l'assertion ci-dessous
+            errors.append(e)
+
+    thread = threading.Thread(target=append)
+    thread.start()
+    while thread.is_alive():
+        ids = reader.load_activities(columns=["activity_id"])["activity_id"].tolist()
+        assert ids == list(range(1, len(ids) + 1))
+    thread.join()
+
+    assert not errors
+    assert reader.load_activities(columns=["activity_id"])["activity_id"].tolist() == list(range(1, 42))
+    assert reader.count_activities() == 41
+
+
+@pytest.mark.parametrize("settings", [{"weight_scheme": {"a": 1}}, {"weight_scheme": {"1": "x"}},
+                                      {"weight_scheme": "inconnu"}, {"tau_fitness": float("inf")},
+                                      {"tau_fatigue": 0}])
+def test_invalid_settings_are_rejected(csv_file, settings):
+    """Un paramètre invalide est refusé sans modifier les paramètres enregistrés."""
+    dm = DataManager(csv_file=csv_file, cache=LRUCache())
+    dm.save_settings(tau_fitness=40)
+    with pytest.raises(ValueError):
+        dm.save_settings(**settings)
+    assert dm.load_settings() == {"tau_fitness": 40.0}
+
+
+def test_weight_scheme_round_trip(csv_file):
+    """Un schéma de pondération personnalisé est relu avec des numéros de zone entiers."""
+    dm = DataManager(csv_file=csv_file, cache=LRUCache())
+    dm.save_settings(weight_scheme={"1": 1, 2: "2.5"})
+    assert dm.load_settings() == {"weight_scheme": {1: 1.0, 2: 2.5}}
+
+
+def test_mixed_date_formats(csv_file):
+    """Des dates avec et sans suffixe Z donnent une seule colonne de dates naïves, à l'écriture
+    complète comme en ajout."""
+    dm = DataManager(csv_file=csv_file, cache=LRUCache())
+    dm.save_to_csv([activity(1), {**activity(2, day=2), "start_date_local": "2024-01-02T08:00:00Z"}])
+    dm.append_activities([{**activity(3, day=3), "start_date_local": "2024-01-03T08:00:00Z"}, activity(4, day=4)])
+
+    for reader in (dm, DataManager(csv_file=csv_file, cache=LRUCache())):
+        dates = reader.load_activities()["start_date_local"]
+        assert str(dates.dtype).startswith("datetime64") and dates.dt.tz is None
+        assert dates.dt.day.tolist() == [1, 2, 3, 4]
+        assert reader.query_activities(newest_first=True, limit=1)["activity_id"].tolist() == [4]
+    assert len(TrainingLoadEngine.effort_by_day(dm.load_activities())) == 4
+
+
+def test_update_keeps_integer_columns(csv_file):
+    """Une mise à jour partielle (colonnes différentes selon les activités) conserve les
+    entiers dans le CSV et les types des colonnes relues."""
+    dm = DataManager(csv_file=csv_file, cache=LRUCache())
+    dm.save_to_csv([activity(1), activity(2, day=2)])
+    dtypes = dm.load_activities().dtypes
+
+    assert dm.update_activities({1: {"zone_1": 120}, 2: {"suffer_score": 75.5, "zone_2": 90.0}}) == 2
+
+    with open(csv_file, encoding="utf-8") as f:
+        text = f.read()
+    assert "120.0" not in text and "90.0" not in text
+    for reader in (dm, DataManager(csv_file=csv_file, cache=LRUCache())):
+        df = reader.load_activities()
+        assert df.dtypes.equals(dtypes)
+        assert df["zone_1"].tolist() == [120, 60] and df["zone_2"].tolist() == [60, 90]
+        assert df["suffer_score"].tolist() == [50.0, 75.5]
@@ -0,0 +1,28 @@
+"""Tests de la représentation JSON compacte des séries quotidiennes."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from peakflow.models.training_load import TIMESERIES_METRICS, timeseries_payload
+
+
+@pytest.fixture
+def series():
+    """Dix jours de séries quotidiennes."""
+    dates = pd.date_range("2024-01-01", periods=10).date
+    return pd.DataFrame({"date": dates, **{column: np.arange(10.0) for column in TIMESERIES_METRICS.values()}})
+
+
+@pytest.mark.parametrize("max_points", [2, 3, 9])
+def test_max_points_keeps_first_and_last_day(series, max_points):
+    """Le sous-échantillonnage garde le premier et le dernier jour."""
+    payload = timeseries_payload(series, ["form"], max_points=max_points)
+    assert len(payload["offsets"]) == max_points
+    assert payload["offsets"][0] == 0 and payload["offsets"][-1] == 9
+
+
+@pytest.mark.parametrize("max_points", [1, 0, -5])
+def test_max_points_below_two_is_rejected(series, max_points):
+    """Moins de deux points ne permet pas de garder le premier et le dernier jour."""
+    with pytest.raises(ValueError):
+        timeseries_payload(series, ["form"], max_points=max_points)
@@ -0,0 +1,38 @@
+"""Tests du calcul du temps passé par zone (puissance, fréquence cardiaque)."""
+
+from peakflow.models.activity_analyzer import ActivityAnalyzer
+from peakflow.models.power_analyzer import PowerAnalyzer
+from peakflow.models.zones import heart_rate_zones, sample_durations
+
+# 60 s à 1 Hz, pause d'une heure, puis 40 s à 1 Hz
+TIME_WITH_PAUSE = list(range(60)) + [3659 + i for i in range(1, 41)]
+
+HR_ZONES = heart_rate_zones([{"min": 0, "max": 115}, {"min": 115, "max": 150}, {"min": 150, "max": 165},
+                             {"min": 165, "max": 180}, {"min": 180, "max": -1}])
+
+
+def test_sample_durations_ignores_pause():
+    """L'échantillon qui suit une pause compte un intervalle habituel, pas la pause."""
+    durations = sample_durations(TIME_WITH_PAUSE, len(TIME_WITH_PAUSE))
+    assert durations.sum() == 100
+
+
+def test_sample_durations_keeps_regular_intervals():
+    """Un enregistrement régulier à 5 s compte tout le temps écoulé."""
+    assert sample_durations([0, 5, 10, 15], 4).tolist() == [5, 5, 5, 5]
+
+
+def test_power_zones_after_pause():
+    """40 s à 400 W après une pause d'une heure comptent 40 s en Z7."""
+    watts = [150] * 60 + [400] * 40
+    zones = PowerAnalyzer.analyze_power_data(watts, 250, time_data=TIME_WITH_PAUSE)["time_in_zones"]
+    assert zones["Z2"] == 60
+    assert zones["Z7"] == 40
+
+
+def test_hr_zones_after_pause():
+    """40 s en zone 3 après une pause d'une heure comptent 40 s."""
+    streams = {"heartrate": {"data": [120] * 60 + [175] * 40}, "time": {"data": TIME_WITH_PAUSE}}
+    zones = ActivityAnalyzer.calculate_hr_zones(streams, HR_ZONES)
+    assert zones[1] == 60
+    assert zones[3] == 40